@@ -0,0 +1,28 @@
+from argparse import ArgumentParser
+import logging
+
+from btce import config
+from btce.backtest import Backtest, load_ticks_from_csv, load_ticks_from_storage, parse_balances
+from btce.common import get_logger
+from btce.models import CURRENCY_USD
+from btce.storage import get_backend
+
+
+logger = get_logger(__name__)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Replay recorded prices through the traders')
+    parser.add_argument('--csv', help='CSV file with "time,pair,price" rows, recorded prices are used by default')
+    parser.add_argument('--balance', action='append', help='initial balance, e.g. BTC=0.5 (default USD=1000)')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    if args.csv:
+        ticks = load_ticks_from_csv(args.csv)
+    else:
+        backend = get_backend()
+        backend.init()
+        ticks = load_ticks_from_storage(backend, [str(options.pair) for options in config.TRADING])
+    report = Backtest(config.TRADING, parse_balances(args.balance or ['USD=1000']), CURRENCY_USD).run(ticks)
+    logging.disable(logging.NOTSET)
+    logger.info('%s', report)
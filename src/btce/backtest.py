@@ -0,0 +1,246 @@
+from collections import defaultdict
+import csv
+from datetime import datetime
+from decimal import Decimal
+import heapq
+from itertools import count
+import time
+
+from rx.concurrency import HistoricalScheduler
+from rx.disposables import CompositeDisposable
+from typing import Dict, Iterable, Sequence, Tuple
+
+from btce import config, commands, events
+from btce.bus import Bus
+from btce.common import get_logger
+from btce.models import Currency, CurrencyPair, Order, TradingOptions, CURRENCIES
+from btce.money import Money
+from btce.polling import PollScheduler
+from btce.trader import Trader
+
+logger = get_logger(__name__)
+
+
+def load_ticks_from_csv(path) -> Iterable[Tuple[datetime, str, Decimal]]:
+    with open(path, 'r') as source:
+        for seen, pair, price in csv.reader(source):
+            yield datetime.strptime(seen, '%Y-%m-%d %H:%M:%S'), pair, Decimal(price)
+
+
+def load_ticks_from_storage(backend, pairs: Sequence[str]) -> Iterable[Tuple[datetime, str, Decimal]]:
+    return heapq.merge(*[[(seen, pair, price) for price, seen in backend.get_prices(pair)] for pair in pairs])
+
+
+def parse_balances(values: Iterable[str]) -> Dict[Currency, Decimal]:
+    currencies = dict((currency.name, currency) for currency in CURRENCIES)
+    balances = {}
+    for value in values:
+        name, amount = value.split('=')
+        balances[currencies[name.upper()]] = Decimal(amount)
+    return balances
+
+
+def get_value(balances: Dict[Currency, Decimal], prices: Dict[CurrencyPair, Decimal], currency: Currency) -> Decimal:
+    value = balances.get(currency, Decimal(0))
+    for pair, price in prices.items():
+        if pair.second is currency:
+            value += balances.get(pair.first, Decimal(0)) * price
+    return value
+
+
+class SimulatedExchange:
+
+    def __init__(self, events: Bus, commands: Bus, scheduler, balances: Dict[Currency, Decimal],
+                 fee=config.EXCHANGE_MARGIN, resolution=0):
+        self._subscription = None
+        self._events = events
+        self._commands = commands
+        self._scheduler = scheduler
+        self._balances = defaultdict(Decimal, balances)
+        self._fee = fee
+        self._poll_scheduler = PollScheduler(commands, scheduler, resolution)
+        self._prices = {}
+        self._orders = {}
+        self._sell_orders = defaultdict(list)
+        self._buy_orders = defaultdict(list)
+        self._fills = defaultdict(list)
+        self._order_ids = count(1)
+        self.fill_count = 0
+
+    def __repr__(self):
+        return 'SimulatedExchange()'
+
+    def init(self):
+        self._poll_scheduler.init()
+        self._subscription = CompositeDisposable(
+            (self._commands.get(commands.GetServerTimeCommand)
+                .subscribe(lambda command: self._events.on_next(events.TimeEvent(self._scheduler.now)))),
+            (self._commands.get(commands.GetPriceCommand)
+                .subscribe(lambda command: self._send_price(command.pair))),
+            (self._commands.get(commands.GetBalanceCommand)
+                .subscribe(lambda command: self._send_balances())),
+            (self._commands.get(commands.GetActiveOrdersCommand)
+                .subscribe(lambda command: self._send_active_orders(command.pair))),
+            (self._commands.get(commands.GetCompletedOrdersCommand)
+                .subscribe(lambda command: self._send_completed_orders(command.pair))),
+            (self._commands.get(commands.CreateSellOrderCommand)
+                .subscribe(lambda command: self._create_order(Order.TYPE_SELL, command.pair, command.amount,
+                                                              command.price))),
+            (self._commands.get(commands.CreateBuyOrderCommand)
+                .subscribe(lambda command: self._create_order(Order.TYPE_BUY, command.pair, command.amount,
+                                                             command.price))),
+            (self._commands.get(commands.CancelOrderCommand)
+                .subscribe(lambda command: self._cancel_order(command.order_id))),
+        )
+
+    def set_price(self, pair: CurrencyPair, price: Decimal):
+        self._prices[pair] = price
+        fill_count = self.fill_count
+        sell_orders = self._sell_orders[pair]
+        while sell_orders and sell_orders[0][0] <= price:
+            self._fill_order(heapq.heappop(sell_orders)[-1])
+        buy_orders = self._buy_orders[pair]
+        while buy_orders and -buy_orders[0][0] >= price:
+            self._fill_order(heapq.heappop(buy_orders)[-1])
+        if self.fill_count != fill_count:
+            self._send_active_orders(pair)
+
+    def _send_price(self, pair):
+        price = self._prices.get(pair)
+        if price is not None:
+            self._events.on_next(events.PriceEvent(pair, Money.from_decimal(price, pair.second.places)))
+
+    def _send_balances(self):
+        for currency, balance in list(self._balances.items()):
+            self._events.on_next(events.BalanceEvent(currency, Money.from_decimal(balance, currency.places)))
+
+    def _send_active_orders(self, pair):
+        orders = sorted((order for order, order_pair in self._orders.values() if order_pair is pair),
+                        key=lambda order: order.price)
+        self._events.on_next(events.ActiveOrdersEvent(pair, orders))
+
+    def _send_completed_orders(self, pair):
+        if self._fills[pair]:
+            orders, self._fills[pair] = self._fills[pair], []
+            self._events.on_next(events.CompletedOrdersEvent(pair, orders))
+
+    def _create_order(self, order_type, pair, amount, price):
+        currency, cost = (pair.first, amount) if order_type == Order.TYPE_SELL else (pair.second, amount * price)
+        if cost > self._balances[currency]:
+            logger.debug('Cannot create order: not enough %s', currency)
+            return
+        self._balances[currency] -= cost
+        order = Order(next(self._order_ids), order_type, amount, price, self._scheduler.now, None)
+        self._orders[order.id] = (order, pair)
+        if order_type == Order.TYPE_SELL:
+            heapq.heappush(self._sell_orders[pair], (price, order.id, order))
+        else:
+            heapq.heappush(self._buy_orders[pair], (-price, order.id, order))
+        self._send_balances()
+        self._send_active_orders(pair)
+        if pair in self._prices:
+            self.set_price(pair, self._prices[pair])
+
+    def _fill_order(self, order):
+        if order.id not in self._orders:
+            return
+        _, pair = self._orders.pop(order.id)
+        if order.type == Order.TYPE_SELL:
+            self._balances[pair.second] += order.amount * order.price * (1 - self._fee)
+        else:
+            self._balances[pair.first] += order.amount * (1 - self._fee)
+        self._fills[pair].append(Order(order.id, order.type, order.amount, order.price, order.created,
+                                       self._scheduler.now))
+        self.fill_count += 1
+
+    def _cancel_order(self, order_id):
+        if order_id not in self._orders:
+            return
+        order, pair = self._orders.pop(order_id)
+        if order.type == Order.TYPE_SELL:
+            self._balances[pair.first] += order.amount
+        else:
+            self._balances[pair.second] += order.amount * order.price
+        self._send_balances()
+        self._send_active_orders(pair)
+
+    def get_value(self, currency: Currency) -> Decimal:
+        balances = defaultdict(Decimal, self._balances)
+        for order, pair in self._orders.values():
+            if order.type == Order.TYPE_SELL:
+                balances[pair.first] += order.amount
+            else:
+                balances[pair.second] += order.amount * order.price
+        return get_value(balances, self._prices, currency)
+
+    def deinit(self):
+        if self._subscription is not None:
+            self._subscription.dispose()
+        self._poll_scheduler.deinit()
+
+
+class BacktestReport:
+
+    def __init__(self, tick_count, started, finished, elapsed, fill_count, initial_value, final_value):
+        self.tick_count = tick_count
+        self.started = started
+        self.finished = finished
+        self.elapsed = elapsed
+        self.fill_count = fill_count
+        self.initial_value = initial_value
+        self.final_value = final_value
+
+    def __str__(self):
+        ticks_per_minute = self.tick_count / self.elapsed * 60 if self.elapsed else 0
+        return ('Replayed %s ticks from %s to %s in %.1f s (%.0f ticks/min), %s fills, value %s -> %s' %
+                (self.tick_count, self.started, self.finished, self.elapsed, ticks_per_minute, self.fill_count,
+                 self.initial_value, self.final_value))
+
+
+class Backtest:
+
+    RESOLUTION = Trader.POLL_PRICE_INTERVAL
+
+    def __init__(self, trading: Sequence[TradingOptions], balances: Dict[Currency, Decimal], quote_currency: Currency):
+        self._trading = trading
+        self._balances = balances
+        self._quote_currency = quote_currency
+
+    def run(self, ticks: Iterable[Tuple[datetime, str, Decimal]]) -> BacktestReport:
+        ticks = iter(ticks)
+        first_tick = next(ticks, None)
+        if first_tick is None:
+            raise Exception('no ticks to replay')
+        scheduler = HistoricalScheduler(first_tick[0])
+        event_stream = Bus()
+        command_stream = Bus()
+        exchange = SimulatedExchange(event_stream, command_stream, scheduler, self._balances,
+                                     resolution=self.RESOLUTION)
+        pairs = dict((str(options.pair), options.pair) for options in self._trading)
+        traders = [Trader(options, event_stream, command_stream, None, scheduler) for options in self._trading]
+        started = time.process_time()
+        tick_count = 0
+        first_prices = {}
+        exchange.init()
+        for trader in traders:
+            trader.init()
+        for seen, pair_name, price in self._get_ticks(first_tick, ticks):
+            pair = pairs.get(pair_name)
+            if pair is None:
+                continue
+            scheduler.advance_to(seen)
+            exchange.set_price(pair, price)
+            tick_count += 1
+            if pair not in first_prices:
+                first_prices[pair] = price
+        elapsed = time.process_time() - started
+        for trader in traders:
+            trader.deinit()
+        exchange.deinit()
+        return BacktestReport(tick_count, first_tick[0], scheduler.now, elapsed, exchange.fill_count,
+                              get_value(self._balances, first_prices, self._quote_currency),
+                              exchange.get_value(self._quote_currency))
+
+    def _get_ticks(self, first_tick, ticks):
+        yield first_tick
+        yield from ticks
@@ -0,0 +1,37 @@
+from rx import Observable
+from rx.subjects import Subject
+
+
+def _get_key(message):
+    if hasattr(message, 'pair'):
+        return message.pair
+    if hasattr(message, 'currency'):
+        return message.currency
+    return None
+
+
+class Bus:
+
+    def __init__(self, counter=None):
+        self._subjects = {}
+        self._counter = counter
+
+    def on_next(self, message):
+        message_class = type(message)
+        self._publish((message_class, None), message)
+        key = _get_key(message)
+        if self._counter is not None:
+            self._counter.inc(message_class.__name__, '' if key is None else str(key))
+        if key is not None:
+            self._publish((message_class, key), message)
+
+    def _publish(self, route, message):
+        subject = self._subjects.get(route)
+        if subject is not None:
+            subject.on_next(message)
+
+    def get(self, message_class, key=None) -> Observable:
+        route = (message_class, key)
+        if route not in self._subjects:
+            self._subjects[route] = Subject()
+        return self._subjects[route].as_observable()
@@ -1,6 +1,6 @@
 from decimal import Decimal
 
-from btce.models import Currency, CurrencyPair
+from btce.models import CurrencyPair
 
 
 class _Command:
@@ -17,10 +17,20 @@ class GetPriceCommand(_Command):
         self.pair = pair
 
 
-class GetBalanceCommand(_Command):
+class GetDepthCommand(_Command):
+
+    def __init__(self, pair: CurrencyPair):
+        self.pair = pair
+
+
+class GetTradesCommand(_Command):
+
+    def __init__(self, pair: CurrencyPair):
+        self.pair = pair
 
-    def __init__(self, currency: Currency):
-        self.currency = currency
+
+class GetBalanceCommand(_Command):
+    pass
 
 
 class GetActiveOrdersCommand(_Command):
@@ -55,3 +65,17 @@ class CancelOrderCommand(_Command):
 
     def __init__(self, order_id: str):
         self.order_id = order_id
+
+
+class PollCommand(_Command):
+
+    def __init__(self, command: _Command, interval: int, start_period: int):
+        self.command = command
+        self.interval = interval
+        self.start_period = start_period
+
+
+class CancelPollCommand(_Command):
+
+    def __init__(self, poll_command: PollCommand):
+        self.poll_command = poll_command
@@ -4,7 +4,17 @@ import logging.config
 
 from rx.concurrency import IOLoopScheduler
 
-MAIN_THREAD = IOLoopScheduler()
+from btce.money import Money
+
+
+class _IOLoopScheduler(IOLoopScheduler):
+
+    @property
+    def now(self):
+        return self.to_datetime(self.loop.time() * 1000)
+
+
+MAIN_THREAD = _IOLoopScheduler()
 
 
 def get_logger(name):
@@ -47,5 +57,13 @@ def get_logger(name):
     return logging.getLogger(name)
 
 
+_QUANTUMS = {}
+
+
 def normalize_value(value, precision):
-    return value.quantize(Decimal('10') ** -precision)
+    if type(value) is Money:
+        return value.round(precision)
+    quantum = _QUANTUMS.get(precision)
+    if quantum is None:
+        quantum = _QUANTUMS[precision] = Decimal('10') ** -precision
+    return value.quantize(quantum)
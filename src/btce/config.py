@@ -10,15 +10,39 @@ SRC_DIR = os.path.join(BASE_DIR, 'src')
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 TEST_DIR = os.path.join(SRC_DIR, 'tests')
 
+DB_BACKEND = 'sqlite'
+DB_PATH = os.path.join(DATA_DIR, 'btce.sqlite')
 DB_HOST = 'localhost'
 DB_PORT = 5432
 DB_USER = 'postgres'
 DB_PASSWORD = ''
+DB_NAME = 'btce'
+
+GATEWAY_PATH = os.path.join(DATA_DIR, 'gateway.sock')
+
+METRICS_ADDRESS = '127.0.0.1'
+METRICS_PORT = 9170
 
 EXCHANGE_SITE = 'https://btc-e.nz'
 
+HTTP_MAX_CLIENTS = 10
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_DNS_CACHE_TIMEOUT = 600
+HTTP_TCP_KEEPALIVE_IDLE = 30
+HTTP_TCP_KEEPALIVE_INTERVAL = 10
+HTTP_KEEPALIVE_PING_INTERVAL = 15000
+
+API_PUBLIC_RATE = 3
+API_PUBLIC_BURST = 10
+API_PRIVATE_RATE = 1
+API_PRIVATE_BURST = 10
+API_PRIVATE_ORDER_RESERVE = 5
+API_POLL_BUDGET_SHARE = 0.7
+API_POLL_BUDGET_CHECK_INTERVAL = 10000
+
 API_KEY = None
 API_SECRET = None
+API_CREDENTIALS = None
 
 EXCHANGE_MARGIN = Decimal('0.002')
 DEFAULT_OVERALL_MARGIN = EXCHANGE_MARGIN + Decimal('0.05')
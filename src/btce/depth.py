@@ -0,0 +1,60 @@
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+
+from typing import Iterable, Optional, Sequence
+
+
+class _BookSide:
+
+    def __init__(self, is_descending: bool):
+        self._is_descending = is_descending
+        self._levels = {}
+        self._prices = []
+        self.depth = Decimal(0)
+
+    def __len__(self):
+        return len(self._prices)
+
+    @property
+    def best(self) -> Optional[Decimal]:
+        if not self._prices:
+            return None
+        return self._prices[-1] if self._is_descending else self._prices[0]
+
+    def update(self, levels: Iterable[Sequence[Decimal]]) -> int:
+        levels = dict(levels)
+        removed = self._levels.keys() - levels.keys()
+        changed = levels.items() - self._levels.items()
+        for price in removed:
+            self.depth -= self._levels.pop(price)
+            del self._prices[bisect_left(self._prices, price)]
+        for price, amount in changed:
+            previous = self._levels.get(price)
+            if previous is None:
+                insort(self._prices, price)
+                self.depth += amount
+            else:
+                self.depth += amount - previous
+            self._levels[price] = amount
+        return len(removed) + len(changed)
+
+    def get_depth(self, price: Decimal) -> Decimal:
+        if self._is_descending:
+            prices = self._prices[bisect_left(self._prices, price):]
+        else:
+            prices = self._prices[:bisect_right(self._prices, price)]
+        return sum((self._levels[level] for level in prices), Decimal(0))
+
+
+class OrderBook:
+
+    def __init__(self):
+        self.bids = _BookSide(True)
+        self.asks = _BookSide(False)
+
+    def __repr__(self):
+        return 'OrderBook(bid=%s,ask=%s,bids=%s,asks=%s)' % (self.bids.best, self.asks.best, len(self.bids),
+                                                             len(self.asks))
+
+    def update(self, bids: Iterable[Sequence[Decimal]], asks: Iterable[Sequence[Decimal]]) -> int:
+        return self.bids.update(bids) + self.asks.update(asks)
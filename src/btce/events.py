@@ -1,9 +1,9 @@
-from datetime import datetime
-from decimal import Decimal
+from datetime import datetime, timedelta
 
-from typing import Sequence
+from typing import Optional, Sequence
 
-from btce.models import CurrencyPair, Currency, Order
+from btce.models import Candle, CurrencyPair, Currency, Order, Trade
+from btce.money import Money
 
 
 class _Event:
@@ -18,18 +18,29 @@ class TimeEvent(_Event):
 
 class BalanceEvent(_Event):
 
-    def __init__(self, currency: Currency, value: Decimal):
+    def __init__(self, currency: Currency, value: Money):
         self.currency = currency
         self.value = value
 
 
 class PriceEvent(_Event):
 
-    def __init__(self, pair: CurrencyPair, value: Decimal):
+    def __init__(self, pair: CurrencyPair, value: Money):
         self.pair = pair
         self.value = value
 
 
+class DepthEvent(_Event):
+
+    def __init__(self, pair: CurrencyPair, bid: Optional[Money], ask: Optional[Money], bid_depth: Money,
+                 ask_depth: Money):
+        self.pair = pair
+        self.bid = bid
+        self.ask = ask
+        self.bid_depth = bid_depth
+        self.ask_depth = ask_depth
+
+
 class ActiveOrdersEvent(_Event):
 
     def __init__(self, pair: CurrencyPair, orders: Sequence[Order]):
@@ -42,3 +53,19 @@ class CompletedOrdersEvent(_Event):
     def __init__(self, pair: CurrencyPair, orders: Sequence[Order]):
         self.pair = pair
         self.orders = orders
+
+
+class TradesEvent(_Event):
+
+    def __init__(self, pair: CurrencyPair, trades: Sequence[Trade]):
+        self.pair = pair
+        self.trades = trades
+
+
+class CandleEvent(_Event):
+
+    def __init__(self, pair: CurrencyPair, period: timedelta, candle: Candle, is_closed: bool):
+        self.pair = pair
+        self.period = period
+        self.candle = candle
+        self.is_closed = is_closed
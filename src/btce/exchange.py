@@ -1,10 +1,16 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
+from functools import partial
 import hashlib
+import heapq
 import hmac
+from itertools import count
 import json
-import os.path
+import os
+from random import uniform
+import re
 
+import pycurl
 from rx import Observable
 from rx.disposables import CompositeDisposable
 from tornado.concurrent import TracebackFuture
@@ -12,113 +18,309 @@ from tornado.curl_httpclient import CurlAsyncHTTPClient
 from tornado.gen import coroutine
 from tornado.httpclient import HTTPRequest
 from tornado.ioloop import IOLoop
-
-from btce import config, commands, events
-from btce.common import get_logger, normalize_value
-from btce.models import CurrencyPair, Order, CURRENCIES
+from tornado.locks import Condition
+
+from btce import config, commands, events, metrics
+from btce.bus import Bus
+from btce.common import get_logger, MAIN_THREAD
+from btce.depth import OrderBook
+from btce.history import CompletedTradeTracker
+from btce.ledger import BalanceLedger
+from btce.models import CurrencyPair, Order, Trade, CURRENCIES
+from btce.money import Money
+from btce.orders import ActiveOrderIndex
+from btce.polling import PollScheduler
+from btce.ratelimit import create_bucket
 
 logger = get_logger(__name__)
 
+INVALID_NONCE_PATTERN = re.compile(r'invalid nonce parameter.*you should send:(\d+)')
+
+
+_ORDER_TYPES = {'sell': Order.TYPE_SELL, 'buy': Order.TYPE_BUY}
+_TRADE_TYPES = {'ask': Order.TYPE_SELL, 'bid': Order.TYPE_BUY}
+
 
 def _currency_pair_to_string(pair: CurrencyPair):
     return '%s_%s' % (pair.first.name.lower(), pair.second.name.lower())
 
 
-class _PublicApiConnector:
+def _parse_response(body: bytes):
+    return json.loads(body, parse_float=Decimal)
+
+
+def _parse_expected_nonce(error):
+    match = INVALID_NONCE_PATTERN.match(error or '')
+    return None if match is None else int(match.group(1))
+
+
+def _observe_request_duration(api, method, started, result):
+    metrics.API_REQUEST_DURATION.observe(IOLoop.current().time() - started, api, method, result)
+
+
+def _observe_connection(api, method, response):
+    is_reused = response.time_info.get('connect') == 0
+    metrics.API_CONNECTIONS.inc(api, method, 'reused' if is_reused else 'new')
+
 
-    API_URL = config.EXCHANGE_SITE + '/api/3'
+def _prepare_curl(share, curl):
+    if getattr(curl, 'curl_share', None) is not share:
+        curl.setopt(pycurl.SHARE, share)
+        curl.curl_share = share
+    curl.setopt(pycurl.DNS_CACHE_TIMEOUT, config.HTTP_DNS_CACHE_TIMEOUT)
+    curl.setopt(pycurl.SSL_SESSIONID_CACHE, 1)
+    curl.setopt(pycurl.TCP_KEEPALIVE, 1)
+    curl.setopt(pycurl.TCP_KEEPIDLE, config.HTTP_TCP_KEEPALIVE_IDLE)
+    curl.setopt(pycurl.TCP_KEEPINTVL, config.HTTP_TCP_KEEPALIVE_INTERVAL)
 
-    def __init__(self):
-        self._http_client = CurlAsyncHTTPClient()
+
+def _create_http_client(max_clients):
+    share = pycurl.CurlShare()
+    share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+    share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+    return CurlAsyncHTTPClient(force_instance=True, max_clients=max_clients, defaults={
+        'connect_timeout': config.HTTP_CONNECT_TIMEOUT,
+        'prepare_curl_callback': partial(_prepare_curl, share),
+    })
+
+
+class _ApiConnector:
+
+    API = None
+    API_PATH = None
+    MAX_CLIENTS = None
+
+    def __init__(self, site, bucket=None):
+        self._api_url = site + self.API_PATH
+        self._http_client = _create_http_client(self.MAX_CLIENTS)
+        self._bucket = bucket
+        self._last_used = None
 
     @coroutine
-    def _make_request(self, method, pair):
-        response = yield self._http_client.fetch('%s/%s/%s' % (self.API_URL, method, pair))
-        return json.loads(response.body.decode())
+    def _fetch(self, method, request, raise_error=True):
+        started = IOLoop.current().time()
+        try:
+            response = yield self._http_client.fetch(request, raise_error=raise_error)
+        except Exception:
+            _observe_request_duration(self.API, method, started, 'failure')
+            raise
+        finally:
+            self._last_used = IOLoop.current().time()
+        if response.code != 599:
+            _observe_connection(self.API, method, response)
+        return response
 
     @coroutine
-    def get_price(self, pair):
-        response = yield self._make_request('ticker', pair)
-        return Decimal(response[pair]['last'])
+    def connect(self):
+        response = yield self._fetch('ping', HTTPRequest(self._api_url, method='HEAD'), False)
+        if response.code == 599:
+            logger.warn('Cannot connect to %s: %s', self._api_url, response.error)
 
+    def is_idle(self, period):
+        return self._last_used is None or IOLoop.current().time() - self._last_used >= period
 
-class _RequestQueue:
+    def get_rate(self):
+        return None if self._bucket is None else self._bucket.rate
+
+
+class _PublicApiConnector(_ApiConnector):
+
+    API = 'public'
+    API_PATH = '/api/3'
+    MAX_CLIENTS = config.HTTP_MAX_CLIENTS
+    DEPTH_LIMIT = 50
+    TRADES_LIMIT = 150
+
+    @coroutine
+    def _make_request(self, method, pairs, query=''):
+        if self._bucket is not None:
+            metrics.API_RATE_LIMIT_WAIT.observe((yield self._bucket.acquire()), self.API)
+        started = IOLoop.current().time()
+        response = yield self._fetch(method, '%s/%s/%s%s' % (self._api_url, method, '-'.join(pairs), query))
+        _observe_request_duration(self.API, method, started, 'success')
+        return _parse_response(response.body)
+
+    @coroutine
+    def get_prices(self, pairs):
+        response = yield self._make_request('ticker', pairs)
+        return dict((pair, data['last']) for pair, data in response.items())
+
+    @coroutine
+    def get_depths(self, pairs):
+        response = yield self._make_request('depth', pairs, '?limit=%s' % self.DEPTH_LIMIT)
+        return dict((pair, (data['bids'], data['asks'])) for pair, data in response.items())
+
+    @coroutine
+    def get_trades(self, pairs):
+        return (yield self._make_request('trades', pairs, '?limit=%s' % self.TRADES_LIMIT))
+
+
+class _Request:
+
+    def __init__(self, method, params, priority, deadline):
+        self.method = method
+        self.params = params
+        self.priority = priority
+        self.deadline = deadline
+        self.future = TracebackFuture()
+        self.try_count = 1
+        self.queued = None
+        self.throttled = 0
+
+
+class _RequestScheduler:
+
+    PRIORITY_ORDER = 0
+    PRIORITY_READ = 1
 
     TRY_MAX_COUNT = 5
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 30
 
-    def __init__(self, request_handler):
+    def __init__(self, request_handler, name='0', bucket=None):
+        self._name = name
         self._queue = []
+        self._sequence = count()
+        self._pending_reads = {}
         self._is_working = False
         self._request_handler = request_handler
-
-    def put(self, *args):
-        future = TracebackFuture()
-        self._queue.append((args, future, 1))
+        self._bucket = bucket
+        self._wakeup = Condition()
+
+    def __len__(self):
+        return len(self._queue) + (1 if self._is_working else 0)
+
+    def put(self, method, params=None, priority=PRIORITY_READ, timeout=None):
+        key = self._get_read_key(method, params) if priority == self.PRIORITY_READ else None
+        if key in self._pending_reads:
+            return self._pending_reads[key].future
+        deadline = None if timeout is None else IOLoop.current().time() + timeout
+        request = _Request(method, params, priority, deadline)
+        if key is not None:
+            self._pending_reads[key] = request
+            request.future.add_done_callback(lambda future: self._pending_reads.pop(key, None))
+        self._push(request)
+        return request.future
+
+    def _get_read_key(self, method, params):
+        return method, tuple(sorted((params or {}).items()))
+
+    def _push(self, request):
+        request.queued = IOLoop.current().time()
+        heapq.heappush(self._queue, (request.priority, next(self._sequence), request))
+        metrics.REQUEST_QUEUE_DEPTH.set(len(self._queue), self._name)
         if not self._is_working:
-            self._execute_next_request()
-        return future
+            self._execute_requests()
+        else:
+            self._wakeup.notify_all()
+
+    def _get_delay(self):
+        if self._bucket is None:
+            return 0
+        return self._bucket.get_delay(self._queue[0][0] == self.PRIORITY_ORDER)
 
     @coroutine
-    def _execute_next_request(self):
+    def _execute_requests(self):
         self._is_working = True
-        request, future, try_count = self._queue.pop(0)
-        try:
-            result = yield self._request_handler(*request)
-            future.set_result(result)
-        except Exception as e:
-            try_count += 1
-            if try_count > self.TRY_MAX_COUNT:
-                logger.warn('Cannot execute request after %s tries: %s', self.TRY_MAX_COUNT, e)
-                future.set_exception(e)
+        while self._queue:
+            delay = self._get_delay()
+            if delay:
+                _, _, request = self._queue[0]
+                started = IOLoop.current().time()
+                yield self._wakeup.wait(timedelta(seconds=delay))
+                request.throttled += IOLoop.current().time() - started
+                continue
+            _, _, request = heapq.heappop(self._queue)
+            metrics.REQUEST_QUEUE_DEPTH.set(len(self._queue), self._name)
+            metrics.REQUEST_QUEUE_WAIT.observe(IOLoop.current().time() - request.queued, request.method)
+            if request.deadline is not None and IOLoop.current().time() > request.deadline:
+                metrics.API_REQUEST_FAILURES.inc(request.method, 'outdated')
+                request.future.set_exception(Exception('request %s is outdated' % request.method))
+                continue
+            if self._bucket is not None:
+                self._bucket.take(request.priority == self.PRIORITY_ORDER)
+                metrics.API_RATE_LIMIT_WAIT.observe(request.throttled, 'trade')
+            try:
+                result = yield self._request_handler(request.method, request.params)
+            except Exception as e:
+                self._retry(request, e)
             else:
-                self._queue.append((request, future, try_count))
+                request.future.set_result(result)
         self._is_working = False
-        if self._queue:
-            self._execute_next_request()
+
+    def _retry(self, request, error):
+        request.try_count += 1
+        if request.try_count > self.TRY_MAX_COUNT:
+            logger.warn('Cannot execute request after %s tries: %s', self.TRY_MAX_COUNT, error)
+            metrics.API_REQUEST_FAILURES.inc(request.method, 'tries')
+            request.future.set_exception(error)
+        else:
+            metrics.API_REQUEST_RETRIES.inc(request.method)
+            delay = min(self.RETRY_BASE_DELAY * 2 ** (request.try_count - 2), self.RETRY_MAX_DELAY)
+            IOLoop.current().call_later(uniform(delay / 2, delay), self._push, request)
 
 
-class _TradeApiConnector:
+class _TradeApiConnector(_ApiConnector):
 
-    API_URL = config.EXCHANGE_SITE + '/tapi'
+    API = 'trade'
+    API_PATH = '/tapi'
+    MAX_CLIENTS = 1
 
     ORDER_TYPE_SELL = 'sell'
     ORDER_TYPE_BUY = 'buy'
 
-    def __init__(self, key, secret):
+    READ_TIMEOUT = 10
+    TRADE_HISTORY_PAGE_SIZE = 100
+
+    def __init__(self, site, key, secret, nonce_file=None, name='0', bucket=None):
+        super().__init__(site, bucket)
         self._key = key
         self._secret = secret
-        self._http_client = CurlAsyncHTTPClient(max_clients=1)
-        self._nonce_keeper = _NonceKeeper()
-        self._request_queue = _RequestQueue(self._make_request)
+        self._name = name
+        self._nonce_keeper = _NonceKeeper(nonce_file or _get_nonce_file(key))
+        self._request_scheduler = _RequestScheduler(self._make_request, name, bucket)
+
+    def get_load(self):
+        return len(self._request_scheduler)
 
     @coroutine
-    def _add_request(self, method, params=None):
-        return (yield self._request_queue.put(method, params))
+    def _add_request(self, method, params=None, priority=_RequestScheduler.PRIORITY_READ, timeout=READ_TIMEOUT):
+        return (yield self._request_scheduler.put(method, params, priority, timeout))
 
     @coroutine
     def _make_request(self, method, params=None):
+        result, error = yield self._send_request(method, params)
+        nonce = _parse_expected_nonce(error)
+        if nonce is not None:
+            logger.warn('Cannot use stored nonce for key %s, resyncing to %s', self._name, nonce)
+            self._nonce_keeper.resync(nonce)
+            result, error = yield self._send_request(method, params)
+        return result, error
+
+    @coroutine
+    def _send_request(self, method, params):
         request_body = self._get_request_body(method, params or {})
         sign = hmac.new(self._secret.encode(), request_body.encode(), hashlib.sha512).hexdigest()
-        request = HTTPRequest(self.API_URL, method='POST', headers={'Key': self._key, 'Sign': sign}, body=request_body)
-        response = yield self._http_client.fetch(request)
-        response_body = json.loads(response.body.decode())
+        request = HTTPRequest(self._api_url, method='POST', headers={'Key': self._key, 'Sign': sign}, body=request_body)
+        started = IOLoop.current().time()
+        response = yield self._fetch(method, request)
+        response_body = _parse_response(response.body)
         if response_body.get('success'):
+            _observe_request_duration(self.API, method, started, 'success')
             return response_body['return'], None
+        _observe_request_duration(self.API, method, started, 'error')
         return None, response_body['error']
 
     def _get_request_body(self, method, params):
-        params.update({
-            'method': method,
-            'nonce': self._nonce_keeper.get(),
-        })
+        params = dict(params, method=method, nonce=self._nonce_keeper.get())
         return '&'.join('%s=%s' % item for item in params.items())
 
     @coroutine
-    def get_balance(self, currency):
+    def get_balances(self):
         result, error = yield self._add_request('getInfo')
         if error is not None:
             raise Exception('cannot make request: %s' % error)
-        return Decimal(result['funds'][currency])
+        return result['funds']
 
     @coroutine
     def create_order(self, order_type, pair, amount, price):
@@ -127,67 +329,181 @@ class _TradeApiConnector:
             'type': order_type,
             'rate': str(price),
             'amount': str(amount),
-        })
+        }, _RequestScheduler.PRIORITY_ORDER, None)
         if error is not None:
             raise Exception('cannot make request: %s' % error)
-        return dict((currency, Decimal(value)) for currency, value in result['funds'].items())
+        return result
 
     @coroutine
-    def get_active_orders(self, pair):
-        result, error = yield self._add_request('ActiveOrders', {'pair': pair})
+    def get_active_orders(self, pair: CurrencyPair):
+        result, error = yield self._add_request('ActiveOrders', {'pair': _currency_pair_to_string(pair)})
         if error is not None:
             if error == 'no orders':
-                return ()
+                return []
             raise Exception('cannot make request: %s' % error)
-        return ({
-            'id': order_id,
-            'type': data['type'],
-            'amount': Decimal(data['amount']),
-            'price': Decimal(data['rate']),
-            'created': datetime.utcfromtimestamp(data['timestamp_created']),
-        } for order_id, data in result.items())
+        return [Order(int(order_id), _ORDER_TYPES[data['type']], Money.from_decimal(data['amount'], pair.first.places),
+                      Money.from_decimal(data['rate'], pair.second.places),
+                      datetime.utcfromtimestamp(data['timestamp_created']), None)
+                for order_id, data in result.items()]
 
     @coroutine
-    def get_completed_orders(self, pair):
-        result, error = yield self._add_request('TradeHistory', {'pair': pair, 'count': 20})
+    def get_completed_orders(self, pair: CurrencyPair, from_id=None):
+        params = {'pair': _currency_pair_to_string(pair), 'count': self.TRADE_HISTORY_PAGE_SIZE}
+        if from_id is not None:
+            params.update(from_id=from_id, order='ASC')
+        result, error = yield self._add_request('TradeHistory', params)
         if error is not None:
             if error == 'no trades':
-                return ()
+                return []
             raise Exception('cannot make request: %s' % error)
-        return ({
-            'id': data['order_id'],
-            'type': data['type'],
-            'amount': Decimal(data['amount']),
-            'price': Decimal(data['rate']),
-            'completed': datetime.utcfromtimestamp(data['timestamp']),
-        } for data in result.values())
+        return [(int(trade_id), Order(int(data['order_id']), _ORDER_TYPES[data['type']],
+                                      Money.from_decimal(data['amount'], pair.first.places),
+                                      Money.from_decimal(data['rate'], pair.second.places), None,
+                                      datetime.utcfromtimestamp(data['timestamp'])))
+                for trade_id, data in result.items()]
 
     @coroutine
     def cancel_order(self, order_id):
-        result, error = yield self._add_request('CancelOrder', {'order_id': order_id})
+        result, error = yield self._add_request('CancelOrder', {'order_id': order_id}, _RequestScheduler.PRIORITY_ORDER,
+                                                None)
         if error is not None:
             raise Exception('cannot make request: %s' % error)
-        return dict((currency, Decimal(value)) for currency, value in result['funds'].items())
+        return result['funds']
 
 
 class _NonceKeeper:
 
+    RESERVE_SIZE = 1000
+
+    def __init__(self, store_file):
+        self._store_file = store_file
+        self._nonce = None
+        self._reserved = None
+
     def get(self):
-        store_file = os.path.join(config.DATA_DIR, 'nonce')
-        with open(store_file, 'r') as store:
-            nonce = int(store.read())
-            nonce += 1
-        with open(store_file, 'w') as store:
+        if self._nonce is None:
+            self._nonce = self._reserved = self._load()
+        if self._nonce >= self._reserved:
+            self._reserve(self._nonce + self.RESERVE_SIZE)
+        self._nonce += 1
+        metrics.NONCES.inc()
+        return self._nonce
+
+    def resync(self, nonce):
+        self._nonce = max(self._nonce or 0, nonce - 1)
+        self._reserve(self._nonce + self.RESERVE_SIZE)
+
+    def _load(self):
+        if not os.path.exists(self._store_file):
+            return 0
+        with open(self._store_file, 'r') as store:
+            return int(store.read())
+
+    def _reserve(self, nonce):
+        temp_file = self._store_file + '.tmp'
+        with open(temp_file, 'w') as store:
             store.write(str(nonce))
-        return nonce
+            store.flush()
+            os.fsync(store.fileno())
+        os.replace(temp_file, self._store_file)
+        directory = os.open(os.path.dirname(self._store_file) or '.', os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        self._reserved = nonce
+
+
+def _get_nonce_file(key):
+    return os.path.join(config.DATA_DIR, 'nonce-%s' % hashlib.sha256((key or '').encode()).hexdigest()[:16])
+
+
+def _migrate_nonce_file(nonce_file):
+    legacy_file = os.path.join(config.DATA_DIR, 'nonce')
+    if os.path.exists(legacy_file) and not os.path.exists(nonce_file):
+        os.replace(legacy_file, nonce_file)
+
+
+class _TradeApiRouter:
+
+    def __init__(self, connectors):
+        self._connectors = connectors
+        self._pinned_connectors = {}
+
+    def __repr__(self):
+        return '_TradeApiRouter(connectors=%s)' % len(self._connectors)
+
+    @classmethod
+    def from_credentials(cls, site, credentials):
+        if len(credentials) == 1:
+            _migrate_nonce_file(_get_nonce_file(credentials[0][0]))
+        return cls([_TradeApiConnector(site, key, secret, _get_nonce_file(key), str(number),
+                                       create_bucket(config.API_PRIVATE_RATE, config.API_PRIVATE_BURST,
+                                                     config.API_PRIVATE_ORDER_RESERVE))
+                    for number, (key, secret) in enumerate(credentials)])
+
+    def _get_least_loaded(self):
+        return min(self._connectors, key=lambda connector: connector.get_load())
+
+    def _get_pinned(self, pair):
+        connector = self._pinned_connectors.get(pair)
+        if connector is None:
+            pinned_counts = dict((connector, 0) for connector in self._connectors)
+            for pinned_connector in self._pinned_connectors.values():
+                pinned_counts[pinned_connector] += 1
+            connector = self._pinned_connectors[pair] = min(self._connectors, key=pinned_counts.get)
+        return connector
+
+    def connect(self):
+        return [connector.connect() for connector in self._connectors]
+
+    def connect_idle(self, period):
+        return [connector.connect() for connector in self._connectors if connector.is_idle(period)]
+
+    def get_rate(self):
+        rates = [connector.get_rate() for connector in self._connectors]
+        return None if None in rates else sum(rates)
+
+    def get_balances(self):
+        return self._get_least_loaded().get_balances()
+
+    def create_order(self, order_type, pair, amount, price):
+        return self._get_pinned(pair).create_order(order_type, pair, amount, price)
+
+    def get_active_orders(self, pair: CurrencyPair):
+        return self._get_pinned(_currency_pair_to_string(pair)).get_active_orders(pair)
+
+    def get_completed_orders(self, pair: CurrencyPair, from_id=None):
+        return self._get_pinned(_currency_pair_to_string(pair)).get_completed_orders(pair, from_id)
+
+    def cancel_order(self, order_id):
+        return self._get_least_loaded().cancel_order(order_id)
 
 
 class ExchangeConnector:
 
-    def __init__(self, events: Observable, commands: Observable):
+    BATCH_WINDOW = 100
+    KEEPALIVE_PING_INTERVAL = config.HTTP_KEEPALIVE_PING_INTERVAL
+    POLL_BUDGET_SHARE = config.API_POLL_BUDGET_SHARE
+    POLL_BUDGET_CHECK_INTERVAL = config.API_POLL_BUDGET_CHECK_INTERVAL
+    PUBLIC_POLL_COMMANDS = (commands.GetPriceCommand, commands.GetDepthCommand, commands.GetTradesCommand)
+    TRADE_POLL_COMMANDS = (commands.GetBalanceCommand, commands.GetActiveOrdersCommand,
+                           commands.GetCompletedOrdersCommand)
+
+    def __init__(self, events: Bus, commands: Bus):
         self._subscription = None
-        self._public_api = _PublicApiConnector()
-        self._trade_api = _TradeApiConnector(config.API_KEY, config.API_SECRET)
+        self._balance_request = None
+        self._public_api = _PublicApiConnector(config.EXCHANGE_SITE,
+                                               create_bucket(config.API_PUBLIC_RATE, config.API_PUBLIC_BURST))
+        self._trade_api = _TradeApiRouter.from_credentials(
+            config.EXCHANGE_SITE, config.API_CREDENTIALS or [(config.API_KEY, config.API_SECRET)])
+        self._trade_tracker = CompletedTradeTracker(os.path.join(config.DATA_DIR, 'trades'))
+        self._order_books = {}
+        self._active_orders = {}
+        self._ledger = BalanceLedger()
+        self._public_trade_cursors = {}
+        self._poll_stretches = {}
+        self._poll_scheduler = PollScheduler(commands)
         self._events = events
         self._commands = commands
 
@@ -196,9 +512,16 @@ class ExchangeConnector:
 
     def init(self):
         logger.info('Starting %s', self)
+        self._poll_scheduler.init()
+        self._public_api.connect()
+        self._trade_api.connect()
         self._subscription = CompositeDisposable(
+            self._subscribe_for_keepalive_ping(),
+            self._subscribe_for_poll_budget_check(),
             self._subscribe_for_get_server_time_command(),
             self._subscribe_for_get_price_command(),
+            self._subscribe_for_get_depth_command(),
+            self._subscribe_for_get_trades_command(),
             self._subscribe_for_get_balance_command(),
             self._subscribe_for_get_active_orders_command(),
             self._subscribe_for_get_completed_orders_command(),
@@ -210,44 +533,86 @@ class ExchangeConnector:
     def run(self):
         IOLoop.instance().start()
 
+    def _subscribe_for_keepalive_ping(self):
+        if self.KEEPALIVE_PING_INTERVAL is None:
+            return CompositeDisposable()
+        return (Observable
+            .interval(self.KEEPALIVE_PING_INTERVAL, MAIN_THREAD)
+            .subscribe(lambda count: self._trade_api.connect_idle(self.KEEPALIVE_PING_INTERVAL / 1000)))
+
+    def _subscribe_for_poll_budget_check(self):
+        return (Observable
+            .interval(self.POLL_BUDGET_CHECK_INTERVAL, MAIN_THREAD)
+            .subscribe(lambda count: self._check_poll_budgets()))
+
+    def _check_poll_budgets(self):
+        self._check_poll_budget(_PublicApiConnector.API, self.PUBLIC_POLL_COMMANDS, self._public_api.get_rate())
+        self._check_poll_budget(_TradeApiConnector.API, self.TRADE_POLL_COMMANDS, self._trade_api.get_rate())
+
+    def _check_poll_budget(self, api, command_types, rate):
+        if rate is None:
+            return
+        budget = rate * self.POLL_BUDGET_SHARE
+        poll_rate = self._poll_scheduler.get_rate(command_types)
+        stretch = max(1, poll_rate / budget)
+        metrics.POLL_STRETCH.set(stretch, api)
+        if stretch == self._poll_stretches.get(api, 1):
+            return
+        if stretch > 1:
+            logger.warn('Cannot poll %s API at %.2f requests/s within %.2f, stretching poll intervals %.2f times',
+                        api, poll_rate, budget, stretch)
+        else:
+            logger.info('Polling %s API at %.2f requests/s within %.2f', api, poll_rate, budget)
+        self._poll_stretches[api] = stretch
+        self._poll_scheduler.set_stretch(command_types, stretch)
+
     def _subscribe_for_get_server_time_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.GetServerTimeCommand))
+        return (self._commands.get(commands.GetServerTimeCommand)
             .subscribe(lambda command: self._get_server_time()))
 
+    def _get_batched_pairs(self, command_type):
+        pair_commands = self._commands.get(command_type)
+        return (pair_commands
+            .buffer(pair_commands
+                .throttle_first(self.BATCH_WINDOW, MAIN_THREAD)
+                .delay(self.BATCH_WINDOW, MAIN_THREAD))
+            .map(lambda batch: set(command.pair for command in batch))
+            .filter(lambda pairs: pairs))
+
     def _subscribe_for_get_price_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.GetPriceCommand))
-            .subscribe(lambda command: self._get_price(command.pair)))
+        return (self._get_batched_pairs(commands.GetPriceCommand)
+            .subscribe(self._get_prices))
+
+    def _subscribe_for_get_depth_command(self):
+        return (self._get_batched_pairs(commands.GetDepthCommand)
+            .subscribe(self._get_depths))
+
+    def _subscribe_for_get_trades_command(self):
+        return (self._get_batched_pairs(commands.GetTradesCommand)
+            .subscribe(self._get_trades))
 
     def _subscribe_for_get_balance_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.GetBalanceCommand))
-            .subscribe(lambda command: self._get_balance(command.currency)))
+        return (self._commands.get(commands.GetBalanceCommand)
+            .subscribe(lambda command: self._get_balances()))
 
     def _subscribe_for_get_active_orders_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.GetActiveOrdersCommand))
+        return (self._commands.get(commands.GetActiveOrdersCommand)
             .subscribe(lambda command: self._get_active_orders(command.pair)))
 
     def _subscribe_for_get_completed_orders_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.GetCompletedOrdersCommand))
+        return (self._commands.get(commands.GetCompletedOrdersCommand)
             .subscribe(lambda command: self._get_completed_orders(command.pair)))
 
     def _subscribe_for_create_sell_order_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.CreateSellOrderCommand))
+        return (self._commands.get(commands.CreateSellOrderCommand)
             .subscribe(lambda command: self._create_sell_order(command.pair, command.amount, command.price)))
 
     def _subscribe_for_create_buy_order_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.CreateBuyOrderCommand))
+        return (self._commands.get(commands.CreateBuyOrderCommand)
             .subscribe(lambda command: self._create_buy_order(command.pair, command.amount, command.price)))
 
     def _subscribe_for_cancel_order_command(self):
-        return (self._commands
-            .filter(lambda command: isinstance(command, commands.CancelOrderCommand))
+        return (self._commands.get(commands.CancelOrderCommand)
             .subscribe(lambda command: self._cancel_order(command.order_id)))
 
     @coroutine
@@ -256,70 +621,214 @@ class ExchangeConnector:
         self._events.on_next(events.TimeEvent(server_time))
 
     @coroutine
-    def _get_price(self, pair):
+    def _get_prices(self, pairs):
         try:
-            price = yield self._public_api.get_price(_currency_pair_to_string(pair))
+            prices = yield self._public_api.get_prices([_currency_pair_to_string(pair) for pair in pairs])
         except Exception as e:
-            logger.warn('Cannot get price: %s', e)
+            logger.warn('Cannot get prices: %s', e)
         else:
-            self._events.on_next(events.PriceEvent(pair, normalize_value(price, pair.second.places)))
+            for pair in pairs:
+                price = prices.get(_currency_pair_to_string(pair))
+                if price is None:
+                    logger.warn('Cannot get price for %s', pair)
+                else:
+                    self._events.on_next(events.PriceEvent(pair, Money.from_decimal(price, pair.second.places)))
 
     @coroutine
-    def _get_balance(self, currency):
+    def _get_depths(self, pairs):
         try:
-            balance = yield self._trade_api.get_balance(currency.name.lower())
+            depths = yield self._public_api.get_depths([_currency_pair_to_string(pair) for pair in pairs])
         except Exception as e:
-            logger.warn('Cannot get balance: %s', e)
+            logger.warn('Cannot get depths: %s', e)
         else:
-            amount = normalize_value(balance, currency.places)
-            self._events.on_next(events.BalanceEvent(currency, amount))
+            for pair in pairs:
+                depth = depths.get(_currency_pair_to_string(pair))
+                if depth is None:
+                    logger.warn('Cannot get depth for %s', pair)
+                else:
+                    self._update_order_book(pair, *depth)
+
+    def _update_order_book(self, pair, bids, asks):
+        pair_name = _currency_pair_to_string(pair)
+        order_book = self._order_books.get(pair_name)
+        if order_book is None:
+            order_book = self._order_books[pair_name] = OrderBook()
+        if order_book.update(bids, asks):
+            bid, ask = order_book.bids.best, order_book.asks.best
+            self._events.on_next(events.DepthEvent(
+                pair,
+                None if bid is None else Money.from_decimal(bid, pair.second.places),
+                None if ask is None else Money.from_decimal(ask, pair.second.places),
+                Money.from_decimal(order_book.bids.depth, pair.first.places),
+                Money.from_decimal(order_book.asks.depth, pair.first.places)))
+
+    @coroutine
+    def _get_trades(self, pairs):
+        try:
+            trades = yield self._public_api.get_trades([_currency_pair_to_string(pair) for pair in pairs])
+        except Exception as e:
+            logger.warn('Cannot get trades: %s', e)
+        else:
+            for pair in pairs:
+                pair_trades = trades.get(_currency_pair_to_string(pair))
+                if pair_trades is None:
+                    logger.warn('Cannot get trades for %s', pair)
+                else:
+                    self._send_trades(pair, pair_trades)
+
+    def _send_trades(self, pair, trades):
+        pair_name = _currency_pair_to_string(pair)
+        cursor = self._public_trade_cursors.get(pair_name)
+        new_trades = sorted((trade for trade in trades if cursor is None or trade['tid'] > cursor),
+                            key=lambda trade: trade['tid'])
+        if not new_trades:
+            return
+        if cursor is not None and len(new_trades) >= _PublicApiConnector.TRADES_LIMIT:
+            logger.warn('Cannot get all trades for %s after %s, some may be missed', pair, cursor)
+        self._public_trade_cursors[pair_name] = new_trades[-1]['tid']
+        self._events.on_next(events.TradesEvent(pair, [
+            Trade(trade['tid'], _TRADE_TYPES[trade['type']], Money.from_decimal(trade['amount'], pair.first.places),
+                  Money.from_decimal(trade['price'], pair.second.places), datetime.utcfromtimestamp(trade['timestamp']))
+            for trade in new_trades]))
+
+    def _get_balances(self):
+        if self._balance_request is None:
+            self._balance_request = self._request_balances()
+            IOLoop.current().add_future(self._balance_request, lambda future: self._reset_balance_request())
+        return self._balance_request
+
+    def _reset_balance_request(self):
+        self._balance_request = None
+
+    @coroutine
+    def _request_balances(self):
+        version = self._ledger.version
+        try:
+            balances = yield self._trade_api.get_balances()
+        except Exception as e:
+            logger.warn('Cannot get balances: %s', e)
+        else:
+            balances = self._parse_balances(balances)
+            for currency in self._ledger.reconcile(balances, version):
+                logger.warn('Balance of %s drifted to %s, corrected', currency, balances[currency])
+                metrics.BALANCE_DRIFT.inc(currency.name)
+            for currency in balances:
+                self._events.on_next(events.BalanceEvent(currency, self._ledger.get_balance(currency)))
+
+    def _parse_balances(self, balances):
+        return dict((currency, Money.from_decimal(balances[currency.name.lower()], currency.places))
+                    for currency in CURRENCIES if balances.get(currency.name.lower()) is not None)
+
+    def _get_active_order_index(self, pair):
+        pair_name = _currency_pair_to_string(pair)
+        entry = self._active_orders.get(pair_name)
+        if entry is None:
+            entry = self._active_orders[pair_name] = (pair, ActiveOrderIndex())
+        return entry[1]
+
+    def _find_active_order_pair(self, order_id):
+        for pair, active_orders in self._active_orders.values():
+            if order_id in active_orders:
+                return pair
+        return None
+
+    def _send_active_orders(self, pair):
+        self._events.on_next(events.ActiveOrdersEvent(pair, self._get_active_order_index(pair).get_orders()))
 
     @coroutine
     def _get_active_orders(self, pair):
+        active_orders = self._get_active_order_index(pair)
+        version = active_orders.version
         try:
-            orders = yield self._trade_api.get_active_orders(_currency_pair_to_string(pair))
-            orders = sorted((Order(int(order['id']), Order.TYPE_SELL if order['type'] == 'sell' else Order.TYPE_BUY,
-                                   normalize_value(order['amount'], pair.first.places),
-                                   normalize_value(order['price'], pair.second.places), order['created'], None)
-                             for order in orders), key=lambda order: order.price)
+            orders = yield self._trade_api.get_active_orders(pair)
         except Exception as e:
             logger.warn('Cannot get active orders: %s', e)
         else:
-            self._events.on_next(events.ActiveOrdersEvent(pair, orders))
+            drift = active_orders.reconcile(orders, version)
+            if drift:
+                logger.warn('Active orders of %s drifted by %s orders, corrected', pair, drift)
+                metrics.ACTIVE_ORDER_DRIFT.inc(str(pair), amount=drift)
+            self._send_active_orders(pair)
+
+    @coroutine
+    def _get_new_trades(self, pair, on_trades):
+        pair_name = _currency_pair_to_string(pair)
+        cursor = self._trade_tracker.get_cursor(pair_name)
+        if cursor is None:
+            trades = yield self._trade_api.get_completed_orders(pair)
+            on_trades(self._trade_tracker.add(pair_name, trades))
+            return
+        while True:
+            trades = yield self._trade_api.get_completed_orders(pair, cursor + 1)
+            on_trades(self._trade_tracker.add(pair_name, trades))
+            next_cursor = self._trade_tracker.get_cursor(pair_name)
+            if len(trades) < _TradeApiConnector.TRADE_HISTORY_PAGE_SIZE or next_cursor == cursor:
+                return
+            cursor = next_cursor
 
     @coroutine
     def _get_completed_orders(self, pair):
         try:
-            orders = yield self._trade_api.get_completed_orders(_currency_pair_to_string(pair))
-            orders = sorted((Order(int(order['id']), Order.TYPE_SELL if order['type'] == 'sell' else Order.TYPE_BUY,
-                                   normalize_value(order['amount'], pair.first.places),
-                                   normalize_value(order['price'], pair.second.places), None, order['completed'])
-                             for order in orders), key=lambda order: order.completed, reverse=True)
+            yield self._get_new_trades(pair, lambda trades: self._send_completed_orders(pair, trades))
         except Exception as e:
             logger.warn('Cannot get completed orders: %s', e)
-        else:
-            self._events.on_next(events.CompletedOrdersEvent(pair, orders))
+
+    def _send_completed_orders(self, pair, trades):
+        orders = sorted((order for _, order in trades), key=lambda order: order.completed, reverse=True)
+        active_orders = self._get_active_order_index(pair)
+        filled = [order for order in orders if active_orders.fill(order.id, order.amount)]
+        if filled:
+            self._send_active_orders(pair)
+        self._events.on_next(events.CompletedOrdersEvent(pair, orders))
 
     @coroutine
     def _create_sell_order(self, pair, amount, price):
         logger.debug('Creating sell order (%s %s for %s %s)', amount, pair.first, price, pair.second)
+        if not self._reserve_funds(pair, pair.first, amount):
+            return
         try:
-            balance = yield self._trade_api.create_order(_TradeApiConnector.ORDER_TYPE_SELL,
-                                                         _currency_pair_to_string(pair), amount, price)
+            result = yield self._trade_api.create_order(_TradeApiConnector.ORDER_TYPE_SELL,
+                                                        _currency_pair_to_string(pair), amount, price)
         except Exception as e:
             logger.debug('Cannot create sell order: %s', e)
         else:
-            self._send_balance_events(balance)
+            self._add_active_order(pair, Order.TYPE_SELL, price, result)
+            self._send_balance_events(result['funds'])
+        finally:
+            self._ledger.release(pair.first, amount)
 
     @coroutine
     def _create_buy_order(self, pair, amount, price):
         logger.debug('Creating buy order (%s %s for %s %s)', amount, pair.first, price, pair.second)
+        if not self._reserve_funds(pair, pair.second, amount * price):
+            return
         try:
-            balance = yield self._trade_api.create_order(_TradeApiConnector.ORDER_TYPE_BUY, _currency_pair_to_string(pair), amount, price)
+            result = yield self._trade_api.create_order(_TradeApiConnector.ORDER_TYPE_BUY, _currency_pair_to_string(pair), amount, price)
         except Exception as e:
             logger.debug('Cannot create buy order: %s', e)
         else:
-            self._send_balance_events(balance)
+            self._add_active_order(pair, Order.TYPE_BUY, price, result)
+            self._send_balance_events(result['funds'])
+        finally:
+            self._ledger.release(pair.second, amount * price)
+
+    def _reserve_funds(self, pair, currency, amount):
+        if not self._ledger.can_afford(currency, amount):
+            logger.debug('Cannot create order for %s: %s %s available, %s needed', pair,
+                         self._ledger.get_available(currency), currency, amount)
+            metrics.ORDERS_UNAFFORDABLE.inc(str(pair))
+            return False
+        self._ledger.reserve(currency, amount)
+        return True
+
+    def _add_active_order(self, pair, order_type, price, result):
+        order_id = int(result['order_id'])
+        if not order_id:
+            return
+        order = Order(order_id, order_type, Money.from_decimal(result['remains'], pair.first.places),
+                      Money.from_decimal(price, pair.second.places), datetime.utcnow(), None)
+        self._get_active_order_index(pair).add(order, Money.from_decimal(result['received'], pair.first.places))
+        self._send_active_orders(pair)
 
     @coroutine
     def _cancel_order(self, order_id):
@@ -329,15 +838,22 @@ class ExchangeConnector:
         except Exception as e:
             logger.debug('Cannot cancel order: %s', e)
         else:
+            self._remove_active_order(order_id)
             self._send_balance_events(balance)
 
+    def _remove_active_order(self, order_id):
+        pair = self._find_active_order_pair(order_id)
+        if pair is not None:
+            self._get_active_order_index(pair).remove(order_id)
+            self._send_active_orders(pair)
+
     def _send_balance_events(self, balance):
-        for currency in CURRENCIES:
-            amount = balance.get(currency.name.lower())
-            if amount is not None:
-                self._commands.on_next(events.BalanceEvent(currency, normalize_value(amount, currency.places)))
+        for currency, value in self._parse_balances(balance).items():
+            if self._ledger.update(currency, value):
+                self._events.on_next(events.BalanceEvent(currency, value))
 
     def deinit(self):
         logger.info('Stopping %s', self)
         if self._subscription is not None:
             self._subscription.dispose()
+        self._poll_scheduler.deinit()
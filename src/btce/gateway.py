@@ -0,0 +1,273 @@
+from collections import defaultdict
+import multiprocessing
+import os
+import socket
+
+from rx import Observable
+from rx.disposables import CompositeDisposable
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream, StreamClosedError
+from tornado.netutil import bind_unix_socket
+from tornado.tcpserver import TCPServer
+from typing import Sequence
+
+from btce import config, commands
+from btce.bus import Bus
+from btce.common import get_logger, MAIN_THREAD
+from btce.ipc import Codec, FrameReader, FrameWriter, COMMAND_TYPES, EVENT_TYPES
+from btce.models import CurrencyPair
+from btce.snapshot import SnapshotKeeper
+from btce.trader import Trader
+
+logger = get_logger(__name__)
+
+
+def _get_poll_key(poll_command):
+    return type(poll_command.command), str(getattr(poll_command.command, 'pair', None)), poll_command.interval
+
+
+class _GatewayServer(TCPServer):
+
+    def __init__(self, on_stream):
+        super().__init__()
+        self._on_stream = on_stream
+
+    def handle_stream(self, stream, address):
+        self._on_stream(stream)
+
+
+class _WorkerConnection:
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = FrameWriter(stream)
+        self.pairs = []
+        self.polls = defaultdict(list)
+
+    def __repr__(self):
+        return '_WorkerConnection(pairs=%s)' % ','.join(self.pairs)
+
+
+class Gateway:
+
+    def __init__(self, path, events: Bus, commands: Bus, pairs: Sequence[CurrencyPair]=()):
+        self._subscription = None
+        self._server = None
+        self._path = path
+        self._events = events
+        self._commands = commands
+        self._codec = Codec(pairs)
+        self._connections = set()
+        self._pair_connections = {}
+
+    def __repr__(self):
+        return 'Gateway(path=%s)' % self._path
+
+    def init(self):
+        logger.info('Starting %s', self)
+        self._server = _GatewayServer(self._serve)
+        self._server.add_socket(bind_unix_socket(self._path))
+        self._subscription = CompositeDisposable(*[self._events.get(event_type).subscribe(self._send_event)
+                                                   for event_type, _ in EVENT_TYPES])
+
+    def _send_event(self, event):
+        pair = getattr(event, 'pair', None)
+        if pair is None:
+            connections = self._connections
+        else:
+            connection = self._pair_connections.get(str(pair))
+            connections = () if connection is None else (connection,)
+        if connections:
+            data = self._codec.encode(event)
+            for connection in connections:
+                connection.writer.write(data)
+
+    @coroutine
+    def _serve(self, stream):
+        connection = _WorkerConnection(stream)
+        reader = FrameReader(stream)
+        try:
+            frames = yield reader.read()
+            self._connect(connection, self._codec.decode(frames[0]))
+            for frame in frames[1:]:
+                self._handle_command(connection, self._codec.decode(frame))
+            while True:
+                for frame in (yield reader.read()):
+                    self._handle_command(connection, self._codec.decode(frame))
+        except StreamClosedError:
+            pass
+        except Exception as e:
+            logger.warn('Cannot handle %s: %s', connection, e)
+            stream.close()
+        finally:
+            self._disconnect(connection)
+
+    def _connect(self, connection, pairs):
+        connection.pairs = pairs
+        self._connections.add(connection)
+        for pair in pairs:
+            self._pair_connections[pair] = connection
+        logger.info('Connected %s', connection)
+
+    def _handle_command(self, connection, command):
+        if isinstance(command, commands.PollCommand):
+            connection.polls[_get_poll_key(command)].append(command)
+        elif isinstance(command, commands.CancelPollCommand):
+            poll_commands = connection.polls.get(_get_poll_key(command.poll_command))
+            if not poll_commands:
+                return
+            command = commands.CancelPollCommand(poll_commands.pop())
+        self._commands.on_next(command)
+
+    def _disconnect(self, connection):
+        if connection not in self._connections:
+            return
+        logger.warn('Disconnected %s', connection)
+        self._connections.discard(connection)
+        for pair in connection.pairs:
+            if self._pair_connections.get(pair) is connection:
+                del self._pair_connections[pair]
+        for poll_commands in connection.polls.values():
+            for poll_command in poll_commands:
+                self._commands.on_next(commands.CancelPollCommand(poll_command))
+        connection.polls.clear()
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
+        if self._server is not None:
+            self._server.stop()
+        connections, self._connections = self._connections, set()
+        for connection in connections:
+            connection.stream.close()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+
+class GatewayClient:
+
+    def __init__(self, path, pairs: Sequence[CurrencyPair], events: Bus, commands: Bus, on_close=None):
+        self._subscription = None
+        self._stream = None
+        self._writer = None
+        self._path = path
+        self._pairs = pairs
+        self._events = events
+        self._commands = commands
+        self._on_close = on_close
+        self._codec = Codec(pairs)
+
+    def __repr__(self):
+        return 'GatewayClient(path=%s)' % self._path
+
+    @coroutine
+    def init(self):
+        logger.info('Starting %s', self)
+        self._stream = IOStream(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM))
+        yield self._stream.connect(self._path)
+        self._writer = FrameWriter(self._stream)
+        self._writer.write(self._codec.encode([str(pair) for pair in self._pairs]))
+        self._subscription = CompositeDisposable(*[self._commands.get(command_type).subscribe(self._send_command)
+                                                   for command_type, _ in COMMAND_TYPES])
+        self._read_events()
+
+    def _send_command(self, command):
+        self._writer.write(self._codec.encode(command))
+
+    @coroutine
+    def _read_events(self):
+        reader = FrameReader(self._stream)
+        try:
+            while True:
+                for frame in (yield reader.read()):
+                    self._events.on_next(self._codec.decode(frame))
+        except StreamClosedError:
+            logger.warn('Cannot read events: gateway connection closed')
+        except Exception as e:
+            logger.warn('Cannot read events: %s', e)
+            self._stream.close()
+        if self._on_close is not None:
+            self._on_close()
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
+        if self._stream is not None:
+            self._stream.close()
+
+
+def run_worker(path, number, pair_names):
+    trading = [options for options in config.TRADING if str(options.pair) in pair_names]
+    event_stream = Bus()
+    command_stream = Bus()
+    io_loop = IOLoop.current()
+    client = GatewayClient(path, [options.pair for options in trading], event_stream, command_stream, io_loop.stop)
+    io_loop.run_sync(client.init)
+    snapshot_keeper = SnapshotKeeper(os.path.join(config.DATA_DIR, 'snapshot-%s' % number))
+    states = snapshot_keeper.load()
+    traders = []
+    for options in trading:
+        trader = Trader(options, event_stream, command_stream, states.get(str(options.pair)))
+        trader.init()
+        traders.append(trader)
+    snapshot_keeper.init(dict((str(options.pair), trader.get_state()) for options, trader in zip(trading, traders)))
+    try:
+        io_loop.start()
+    finally:
+        for trader in traders:
+            trader.deinit()
+        snapshot_keeper.deinit()
+        client.deinit()
+
+
+class WorkerPool:
+
+    CHECK_INTERVAL = 1000
+
+    def __init__(self, path, shards: Sequence[Sequence[str]], target=run_worker):
+        self._subscription = None
+        self._path = path
+        self._shards = shards
+        self._target = target
+        self._context = multiprocessing.get_context('spawn')
+        self._processes = [None] * len(shards)
+
+    def __repr__(self):
+        return 'WorkerPool(workers=%s)' % len(self._shards)
+
+    def init(self):
+        logger.info('Starting %s', self)
+        for number in range(len(self._shards)):
+            self._start(number)
+        self._subscription = (Observable
+            .interval(self.CHECK_INTERVAL, MAIN_THREAD)
+            .subscribe(lambda count: self._restart_stopped()))
+
+    def _start(self, number):
+        process = self._context.Process(target=self._target, args=(self._path, number, self._shards[number]),
+                                        name='worker-%s' % number, daemon=True)
+        process.start()
+        self._processes[number] = process
+
+    def _restart_stopped(self):
+        for number, process in enumerate(self._processes):
+            if not process.is_alive():
+                logger.warn('Worker %s exited with code %s, restarting', number, process.exitcode)
+                self._start(number)
+
+    def get_pids(self):
+        return [process.pid for process in self._processes]
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join()
@@ -0,0 +1,52 @@
+from collections import deque
+import json
+import os
+
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+class CompletedTradeTracker:
+
+    SEEN_TRADES_MAX_COUNT = 1000
+
+    def __init__(self, store_file):
+        self._store_file = store_file
+        self._cursors = None
+        self._seen_trades = {}
+
+    def get_cursor(self, pair: str) -> Optional[int]:
+        if self._cursors is None:
+            self._cursors = self._load()
+        return self._cursors.get(pair)
+
+    def _load(self):
+        if not os.path.exists(self._store_file):
+            return {}
+        with open(self._store_file, 'r') as store:
+            return json.load(store)
+
+    def add(self, pair: str, trades: Iterable[Tuple[int, Any]]) -> List[Tuple[int, Any]]:
+        is_started = self.get_cursor(pair) is not None
+        new_trades = [trade for trade in trades if self._mark_seen(pair, trade[0])]
+        if new_trades or not is_started:
+            self._cursors[pair] = max([self._cursors.get(pair, 0)] + [trade_id for trade_id, _ in new_trades])
+            self._save()
+        return new_trades if is_started else []
+
+    def _mark_seen(self, pair, trade_id):
+        if pair not in self._seen_trades:
+            self._seen_trades[pair] = (set(), deque())
+        seen_ids, seen_order = self._seen_trades[pair]
+        if trade_id in seen_ids:
+            return False
+        seen_ids.add(trade_id)
+        seen_order.append(trade_id)
+        if len(seen_order) > self.SEEN_TRADES_MAX_COUNT:
+            seen_ids.discard(seen_order.popleft())
+        return True
+
+    def _save(self):
+        temp_file = self._store_file + '.tmp'
+        with open(temp_file, 'w') as store:
+            json.dump(self._cursors, store)
+        os.replace(temp_file, self._store_file)
@@ -0,0 +1,286 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import struct
+
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream
+from typing import Sequence
+
+from btce import commands, events
+from btce.models import Candle, Currency, CurrencyPair, Order, Trade, CURRENCIES
+from btce.money import Money
+
+EPOCH = datetime(1970, 1, 1)
+FRAME_HEADER = struct.Struct('>I')
+FRAME_MAX_SIZE = 64 * 2 ** 20
+
+_TAG_NONE = 0
+_TAG_TRUE = 1
+_TAG_FALSE = 2
+_TAG_INT = 3
+_TAG_STR = 4
+_TAG_DECIMAL = 5
+_TAG_MONEY = 6
+_TAG_DATETIME = 7
+_TAG_TIMEDELTA = 8
+_TAG_LIST = 9
+_TAG_CURRENCY = 10
+_TAG_PAIR = 11
+_TAG_OBJECT = 12
+
+COMMAND_TYPES = (
+    (commands.GetServerTimeCommand, ()),
+    (commands.GetPriceCommand, ('pair',)),
+    (commands.GetDepthCommand, ('pair',)),
+    (commands.GetTradesCommand, ('pair',)),
+    (commands.GetBalanceCommand, ()),
+    (commands.GetActiveOrdersCommand, ('pair',)),
+    (commands.GetCompletedOrdersCommand, ('pair',)),
+    (commands.CreateSellOrderCommand, ('pair', 'amount', 'price')),
+    (commands.CreateBuyOrderCommand, ('pair', 'amount', 'price')),
+    (commands.CancelOrderCommand, ('order_id',)),
+    (commands.PollCommand, ('command', 'interval', 'start_period')),
+    (commands.CancelPollCommand, ('poll_command',)),
+)
+EVENT_TYPES = (
+    (events.TimeEvent, ('value',)),
+    (events.BalanceEvent, ('currency', 'value')),
+    (events.PriceEvent, ('pair', 'value')),
+    (events.DepthEvent, ('pair', 'bid', 'ask', 'bid_depth', 'ask_depth')),
+    (events.ActiveOrdersEvent, ('pair', 'orders')),
+    (events.CompletedOrdersEvent, ('pair', 'orders')),
+    (events.TradesEvent, ('pair', 'trades')),
+    (events.CandleEvent, ('pair', 'period', 'candle', 'is_closed')),
+)
+MODEL_TYPES = (
+    (Order, ('id', 'type', 'amount', 'price', 'created', 'completed')),
+    (Trade, ('id', 'type', 'amount', 'price', 'time')),
+    (Candle, ('started', 'open', 'high', 'low', 'close', 'volume')),
+)
+
+
+def _write_varint(buffer, value):
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    while value > 0x7f:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (value >> 1 if not value & 1 else -((value + 1) >> 1)), position
+
+
+def _write_str(buffer, value):
+    value = value.encode()
+    _write_varint(buffer, len(value))
+    buffer.extend(value)
+
+
+def _read_str(data, position):
+    size, position = _read_varint(data, position)
+    return bytes(data[position:position + size]).decode(), position + size
+
+
+class Codec:
+
+    TYPES = COMMAND_TYPES + EVENT_TYPES + MODEL_TYPES
+
+    def __init__(self, pairs: Sequence[CurrencyPair]=()):
+        self._currencies = dict((currency.name, currency) for currency in CURRENCIES)
+        self._pairs = {}
+        for pair in pairs:
+            self._currencies.setdefault(pair.first.name, pair.first)
+            self._currencies.setdefault(pair.second.name, pair.second)
+            self._pairs[str(pair)] = pair
+        self._type_numbers = dict((message_type, (number, fields))
+                                  for number, (message_type, fields) in enumerate(self.TYPES))
+
+    def encode(self, value) -> bytes:
+        buffer = bytearray()
+        self._write(buffer, value)
+        return bytes(buffer)
+
+    def decode(self, data: bytes):
+        value, position = self._read(memoryview(data), 0)
+        if position != len(data):
+            raise ValueError('unexpected %s trailing bytes' % (len(data) - position))
+        return value
+
+    def _write(self, buffer, value):
+        value_type = type(value)
+        if value is None:
+            buffer.append(_TAG_NONE)
+        elif value_type is bool:
+            buffer.append(_TAG_TRUE if value else _TAG_FALSE)
+        elif value_type is int:
+            buffer.append(_TAG_INT)
+            _write_varint(buffer, value)
+        elif value_type is Money:
+            buffer.append(_TAG_MONEY)
+            _write_varint(buffer, value.units)
+            _write_varint(buffer, value.places)
+        elif value_type is str:
+            buffer.append(_TAG_STR)
+            _write_str(buffer, value)
+        elif value_type is Decimal:
+            buffer.append(_TAG_DECIMAL)
+            _write_str(buffer, str(value))
+        elif value_type is datetime:
+            buffer.append(_TAG_DATETIME)
+            _write_varint(buffer, (value - EPOCH) // timedelta(microseconds=1))
+        elif value_type is timedelta:
+            buffer.append(_TAG_TIMEDELTA)
+            _write_varint(buffer, value // timedelta(microseconds=1))
+        elif value_type in (list, tuple):
+            buffer.append(_TAG_LIST)
+            _write_varint(buffer, len(value))
+            for item in value:
+                self._write(buffer, item)
+        elif value_type is Currency:
+            buffer.append(_TAG_CURRENCY)
+            self._write_currency(buffer, value)
+        elif value_type is CurrencyPair:
+            buffer.append(_TAG_PAIR)
+            self._write_currency(buffer, value.first)
+            self._write_currency(buffer, value.second)
+        elif value_type in self._type_numbers:
+            number, fields = self._type_numbers[value_type]
+            buffer.append(_TAG_OBJECT)
+            _write_varint(buffer, number)
+            for field in fields:
+                self._write(buffer, getattr(value, field))
+        else:
+            raise TypeError('cannot encode %r' % (value,))
+
+    def _write_currency(self, buffer, currency):
+        _write_str(buffer, currency.name)
+        _write_varint(buffer, currency.places)
+
+    def _read(self, data, position):
+        tag = data[position]
+        position += 1
+        if tag == _TAG_NONE:
+            return None, position
+        if tag == _TAG_TRUE:
+            return True, position
+        if tag == _TAG_FALSE:
+            return False, position
+        if tag == _TAG_INT:
+            return _read_varint(data, position)
+        if tag == _TAG_MONEY:
+            units, position = _read_varint(data, position)
+            places, position = _read_varint(data, position)
+            return Money(units, places), position
+        if tag == _TAG_STR:
+            return _read_str(data, position)
+        if tag == _TAG_DECIMAL:
+            value, position = _read_str(data, position)
+            return Decimal(value), position
+        if tag == _TAG_DATETIME:
+            value, position = _read_varint(data, position)
+            return EPOCH + timedelta(microseconds=value), position
+        if tag == _TAG_TIMEDELTA:
+            value, position = _read_varint(data, position)
+            return timedelta(microseconds=value), position
+        if tag == _TAG_LIST:
+            size, position = _read_varint(data, position)
+            items = []
+            for _ in range(size):
+                item, position = self._read(data, position)
+                items.append(item)
+            return items, position
+        if tag == _TAG_CURRENCY:
+            return self._read_currency(data, position)
+        if tag == _TAG_PAIR:
+            first, position = self._read_currency(data, position)
+            second, position = self._read_currency(data, position)
+            return self._get_pair(first, second), position
+        if tag == _TAG_OBJECT:
+            number, position = _read_varint(data, position)
+            value_type, fields = self.TYPES[number]
+            value = value_type.__new__(value_type)
+            for field in fields:
+                field_value, position = self._read(data, position)
+                setattr(value, field, field_value)
+            return value, position
+        raise ValueError('unknown tag %s' % tag)
+
+    def _read_currency(self, data, position):
+        name, position = _read_str(data, position)
+        places, position = _read_varint(data, position)
+        currency = self._currencies.get(name)
+        if currency is None:
+            currency = self._currencies[name] = Currency(name, places)
+        return currency, position
+
+    def _get_pair(self, first, second):
+        name = '%s/%s' % (first, second)
+        pair = self._pairs.get(name)
+        if pair is None:
+            pair = self._pairs[name] = CurrencyPair(first, second)
+        return pair
+
+
+class FrameWriter:
+
+    def __init__(self, stream: IOStream):
+        self._stream = stream
+        self._buffer = bytearray()
+        self._is_flush_scheduled = False
+
+    def write(self, data: bytes):
+        if self._stream.closed():
+            return
+        self._buffer += FRAME_HEADER.pack(len(data))
+        self._buffer += data
+        if not self._is_flush_scheduled:
+            self._is_flush_scheduled = True
+            IOLoop.current().add_callback(self._flush)
+
+    def _flush(self):
+        self._is_flush_scheduled = False
+        if self._buffer and not self._stream.closed():
+            self._stream.write(bytes(self._buffer))
+        self._buffer.clear()
+
+
+class FrameReader:
+
+    CHUNK_SIZE = 2 ** 16
+
+    def __init__(self, stream: IOStream):
+        self._stream = stream
+        self._buffer = bytearray()
+
+    @coroutine
+    def read(self):
+        while True:
+            frames = self._get_frames()
+            if frames:
+                return frames
+            self._buffer += yield self._stream.read_bytes(self.CHUNK_SIZE, partial=True)
+
+    def _get_frames(self):
+        frames = []
+        position = 0
+        while len(self._buffer) - position >= FRAME_HEADER.size:
+            size, = FRAME_HEADER.unpack_from(self._buffer, position)
+            if size > FRAME_MAX_SIZE:
+                raise ValueError('frame of %s bytes is too large' % size)
+            end = position + FRAME_HEADER.size + size
+            if end > len(self._buffer):
+                break
+            frames.append(bytes(self._buffer[position + FRAME_HEADER.size:end]))
+            position = end
+        del self._buffer[:position]
+        return frames
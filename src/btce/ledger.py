@@ -0,0 +1,60 @@
+from typing import Dict, List, Optional
+
+from btce.models import Currency
+from btce.money import Money
+
+
+class BalanceLedger:
+
+    def __init__(self):
+        self._balances = {}
+        self._reserved = {}
+        self._changes = {}
+        self.version = 0
+
+    def __repr__(self):
+        return 'BalanceLedger(currencies=%s)' % len(self._balances)
+
+    def get_balance(self, currency: Currency) -> Optional[Money]:
+        return self._balances.get(currency.name)
+
+    def get_reserved(self, currency: Currency) -> Money:
+        return self._reserved.get(currency.name, Money(0, currency.places))
+
+    def get_available(self, currency: Currency) -> Optional[Money]:
+        balance = self.get_balance(currency)
+        return None if balance is None else balance - self.get_reserved(currency)
+
+    def can_afford(self, currency: Currency, amount) -> bool:
+        available = self.get_available(currency)
+        return available is not None and amount <= available
+
+    def reserve(self, currency: Currency, amount):
+        self._reserved[currency.name] = self.get_reserved(currency) + amount
+
+    def release(self, currency: Currency, amount):
+        reserved = self.get_reserved(currency) - amount
+        if reserved:
+            self._reserved[currency.name] = reserved
+        else:
+            self._reserved.pop(currency.name, None)
+
+    def update(self, currency: Currency, value: Money) -> bool:
+        self.version += 1
+        self._changes[currency.name] = self.version
+        if self._balances.get(currency.name) == value:
+            return False
+        self._balances[currency.name] = value
+        return True
+
+    def reconcile(self, balances: Dict[Currency, Money], version: int) -> List[Currency]:
+        drifted = []
+        for currency, value in balances.items():
+            if self._changes.get(currency.name, 0) > version:
+                continue
+            balance = self._balances.get(currency.name)
+            if balance is not None and balance != value:
+                drifted.append(currency)
+            self._balances[currency.name] = value
+        self._changes = dict((name, changed) for name, changed in self._changes.items() if changed > version)
+        return drifted
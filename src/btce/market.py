@@ -0,0 +1,164 @@
+from array import array
+from datetime import datetime, timedelta
+
+from rx.disposables import AnonymousDisposable, CompositeDisposable
+from typing import Iterator, Optional, Sequence
+
+from btce import commands, events
+from btce.bus import Bus
+from btce.common import get_logger
+from btce.models import Candle, CurrencyPair, Trade
+from btce.money import Money
+
+logger = get_logger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class TradeBuffer:
+
+    def __init__(self, capacity: int, amount_places: int, price_places: int):
+        self._capacity = capacity
+        self._amount_places = amount_places
+        self._price_places = price_places
+        self._ids = array('q', [0]) * capacity
+        self._types = array('b', [0]) * capacity
+        self._amounts = array('q', [0]) * capacity
+        self._prices = array('q', [0]) * capacity
+        self._times = array('q', [0]) * capacity
+        self._start = 0
+        self._size = 0
+
+    def __repr__(self):
+        return 'TradeBuffer(size=%s,capacity=%s)' % (self._size, self._capacity)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self) -> Iterator[Trade]:
+        for offset in range(self._size):
+            yield self._get((self._start + offset) % self._capacity)
+
+    @property
+    def last_id(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return self._ids[(self._start + self._size - 1) % self._capacity]
+
+    def append(self, trade: Trade):
+        if self._size < self._capacity:
+            index = (self._start + self._size) % self._capacity
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self._capacity
+        self._ids[index] = trade.id
+        self._types[index] = trade.type
+        self._amounts[index] = Money.from_number(trade.amount).round(self._amount_places).units
+        self._prices[index] = Money.from_number(trade.price).round(self._price_places).units
+        self._times[index] = (trade.time - EPOCH) // timedelta(seconds=1)
+
+    def _get(self, index):
+        return Trade(self._ids[index], self._types[index], Money(self._amounts[index], self._amount_places),
+                     Money(self._prices[index], self._price_places), EPOCH + timedelta(seconds=self._times[index]))
+
+    def get_volume(self, since: datetime) -> Money:
+        timestamp = (since - EPOCH) // timedelta(seconds=1)
+        units = 0
+        for offset in range(self._size - 1, -1, -1):
+            index = (self._start + offset) % self._capacity
+            if self._times[index] < timestamp:
+                break
+            units += self._amounts[index]
+        return Money(units, self._amount_places)
+
+
+class CandleBuilder:
+
+    def __init__(self, period: timedelta):
+        self.period = period
+        self._started = None
+        self._open = self._high = self._low = self._close = self._volume = None
+
+    def __repr__(self):
+        return 'CandleBuilder(period=%s)' % self.period
+
+    def get_candle(self) -> Optional[Candle]:
+        if self._started is None:
+            return None
+        return Candle(self._started, self._open, self._high, self._low, self._close, self._volume)
+
+    def add(self, trade: Trade) -> Optional[Candle]:
+        started = EPOCH + self.period * ((trade.time - EPOCH) // self.period)
+        if self._started is not None and started < self._started:
+            return None
+        if self._started is not None and started == self._started:
+            self._high = max(self._high, trade.price)
+            self._low = min(self._low, trade.price)
+            self._close = trade.price
+            self._volume += trade.amount
+            return None
+        closed = self.get_candle()
+        self._started = started
+        self._open = self._high = self._low = self._close = trade.price
+        self._volume = trade.amount
+        return closed
+
+
+class MarketData:
+
+    BUFFER_SIZE = 10000
+    CANDLE_PERIODS = (timedelta(minutes=1), timedelta(minutes=5), timedelta(hours=1))
+    POLL_TRADES_INTERVAL = 10000
+
+    def __init__(self, pairs: Sequence[CurrencyPair], events: Bus, commands: Bus):
+        self._subscription = None
+        self._pairs = pairs
+        self._events = events
+        self._commands = commands
+        self._buffers = dict((str(pair), TradeBuffer(self.BUFFER_SIZE, pair.first.places, pair.second.places))
+                             for pair in pairs)
+        self._candle_builders = dict((str(pair), [CandleBuilder(period) for period in self.CANDLE_PERIODS])
+                                     for pair in pairs)
+
+    def __repr__(self):
+        return 'MarketData(pairs=%s)' % len(self._pairs)
+
+    def get_trades(self, pair: CurrencyPair) -> TradeBuffer:
+        return self._buffers[str(pair)]
+
+    def init(self):
+        logger.info('Starting %s', self)
+        self._subscription = CompositeDisposable(
+            *[self._subscribe_for_poll_trades(pair) for pair in self._pairs] +
+            [self._subscribe_for_trades(pair) for pair in self._pairs]
+        )
+
+    def _subscribe_for_poll_trades(self, pair):
+        poll_command = commands.PollCommand(commands.GetTradesCommand(pair), self.POLL_TRADES_INTERVAL,
+                                            self.POLL_TRADES_INTERVAL)
+        self._commands.on_next(poll_command)
+        return AnonymousDisposable(lambda: self._commands.on_next(commands.CancelPollCommand(poll_command)))
+
+    def _subscribe_for_trades(self, pair):
+        return (self._events.get(events.TradesEvent, pair)
+            .subscribe(lambda event: self._add_trades(pair, event.trades)))
+
+    def _add_trades(self, pair, trades):
+        trade_buffer = self._buffers[str(pair)]
+        candle_builders = self._candle_builders[str(pair)]
+        for trade in trades:
+            trade_buffer.append(trade)
+            for candle_builder in candle_builders:
+                candle = candle_builder.add(trade)
+                if candle is not None:
+                    self._events.on_next(events.CandleEvent(pair, candle_builder.period, candle, True))
+        if trades:
+            for candle_builder in candle_builders:
+                self._events.on_next(events.CandleEvent(pair, candle_builder.period, candle_builder.get_candle(),
+                                                        False))
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
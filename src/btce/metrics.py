@@ -0,0 +1,202 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import defaultdict
+
+from tornado.httpserver import HTTPServer
+from tornado.web import Application, RequestHandler
+from typing import Sequence
+
+from btce import config
+from btce.common import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape_label_value(value)) for name, value in zip(names, values))
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def format(self) -> str:
+        return ''.join(metric.format() for metric in self._metrics)
+
+
+REGISTRY = Registry()
+
+
+class _Metric(ABC):
+
+    TYPE = None
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str]=(), registry=REGISTRY):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        if registry is not None:
+            registry.add(self)
+
+    def __repr__(self):
+        return '%s(name=%s)' % (type(self).__name__, self.name)
+
+    def format(self):
+        lines = ['# HELP %s %s' % (self.name, self.description), '# TYPE %s %s' % (self.name, self.TYPE)]
+        lines.extend(self._format_samples())
+        return '\n'.join(lines) + '\n'
+
+    @abstractmethod
+    def _format_samples(self):
+        pass
+
+
+class Counter(_Metric):
+
+    TYPE = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = defaultdict(int)
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] += amount
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def _format_samples(self):
+        return ['%s%s %s' % (self.name, _format_labels(self.label_names, labels), _format_value(value))
+                for labels, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+
+    TYPE = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def _format_samples(self):
+        return ['%s%s %s' % (self.name, _format_labels(self.label_names, labels), _format_value(value))
+                for labels, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str]=(), buckets=LATENCY_BUCKETS,
+                 registry=REGISTRY):
+        super().__init__(name, description, label_names, registry)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value, *labels):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * len(self.buckets)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def get_count(self, *labels):
+        return sum(self._counts.get(labels, ()))
+
+    def _format_samples(self):
+        samples = []
+        for labels, counts in sorted(self._counts.items()):
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                bucket_labels = _format_labels(self.label_names + ('le',), labels + (_format_value(bound),))
+                samples.append('%s_bucket%s %s' % (self.name, bucket_labels, total))
+            samples.append('%s_sum%s %s' % (self.name, _format_labels(self.label_names, labels),
+                                            _format_value(self._sums[labels])))
+            samples.append('%s_count%s %s' % (self.name, _format_labels(self.label_names, labels), total))
+        return samples
+
+
+API_REQUEST_DURATION = Histogram('btce_api_request_duration_seconds', 'Exchange API request duration',
+                                 ('api', 'method', 'result'))
+API_CONNECTIONS = Counter('btce_api_connections_total', 'Exchange API requests by connection reuse',
+                          ('api', 'method', 'connection'))
+API_REQUEST_RETRIES = Counter('btce_api_request_retries_total', 'Exchange API requests retried', ('method',))
+API_REQUEST_FAILURES = Counter('btce_api_request_failures_total', 'Exchange API requests given up',
+                               ('method', 'reason'))
+REQUEST_QUEUE_DEPTH = Gauge('btce_request_queue_depth', 'Trade API requests waiting to be sent', ('key',))
+REQUEST_QUEUE_WAIT = Histogram('btce_request_queue_wait_seconds', 'Time trade API requests spend in the queue',
+                               ('method',))
+API_RATE_LIMIT_WAIT = Histogram('btce_api_rate_limit_wait_seconds', 'Time requests wait for rate limit tokens',
+                                ('api',))
+POLL_STRETCH = Gauge('btce_poll_stretch', 'Poll interval multiplier keeping polls within the API rate budget',
+                     ('api',))
+ACTIVE_ORDER_DRIFT = Counter('btce_active_order_drift_total', 'Local active orders corrected by ActiveOrders polls',
+                             ('pair',))
+BALANCE_DRIFT = Counter('btce_balance_drift_total', 'Local balances corrected by getInfo polls', ('currency',))
+ORDERS_UNAFFORDABLE = Counter('btce_orders_unaffordable_total', 'Orders not sent because available funds were short',
+                              ('pair',))
+NONCES = Counter('btce_nonces_total', 'Trade API nonces issued')
+EVENTS = Counter('btce_events_total', 'Events emitted', ('type', 'key'))
+
+
+class _MetricsHandler(RequestHandler):
+
+    def initialize(self, registry):
+        self._registry = registry
+
+    def get(self):
+        self.set_header('Content-Type', CONTENT_TYPE)
+        self.finish(self._registry.format())
+
+
+class MetricsServer:
+
+    def __init__(self, port=config.METRICS_PORT, address=config.METRICS_ADDRESS, registry=REGISTRY):
+        self._server = None
+        self._port = port
+        self._address = address
+        self._registry = registry
+
+    def __repr__(self):
+        return 'MetricsServer(address=%s,port=%s)' % (self._address, self._port)
+
+    def get_application(self) -> Application:
+        return Application([(r'/metrics', _MetricsHandler, {'registry': self._registry})])
+
+    def init(self):
+        logger.info('Starting %s', self)
+        self._server = HTTPServer(self.get_application())
+        self._server.listen(self._port, self._address)
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._server is not None:
+            self._server.stop()
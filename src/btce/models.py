@@ -1,7 +1,9 @@
 from datetime import datetime
 from decimal import Decimal
 
-from typing import Optional
+from typing import Dict, Optional
+
+from btce.money import Money
 
 
 class Currency:
@@ -49,12 +51,24 @@ class TradingOptions:
         self.price_jump_value = price_jump_value
 
 
+class TraderState:
+
+    def __init__(self, price: Optional[Decimal]=None, jump_price: Optional[Decimal]=None,
+                 balances: Optional[Dict[str, Decimal]]=None):
+        self.price = price
+        self.jump_price = jump_price
+        self.balances = balances or {}
+
+    def is_empty(self):
+        return self.price is None and self.jump_price is None and not self.balances
+
+
 class Order:
 
     TYPE_SELL = 0
     TYPE_BUY = 1
 
-    def __init__(self, order_id: int, order_type: int, amount: Decimal, price: Decimal, created: Optional[datetime],
+    def __init__(self, order_id: int, order_type: int, amount: Money, price: Money, created: Optional[datetime],
                  completed: Optional[datetime]):
         self.id = order_id
         self.type = order_type
@@ -71,3 +85,32 @@ class Order:
 
     def __eq__(self, other):
         return isinstance(other, Order) and other.id == self.id
+
+
+class Trade:
+
+    def __init__(self, trade_id: int, trade_type: int, amount: Money, price: Money, time: datetime):
+        self.id = trade_id
+        self.type = trade_type
+        self.amount = amount
+        self.price = price
+        self.time = time
+
+    def __repr__(self):
+        return 'Trade(type=%s,amount=%s,price=%s)' % ('sell' if self.type == Order.TYPE_SELL else 'buy', self.amount,
+                                                      self.price)
+
+
+class Candle:
+
+    def __init__(self, started: datetime, open: Money, high: Money, low: Money, close: Money, volume: Money):
+        self.started = started
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __repr__(self):
+        return 'Candle(started=%s,open=%s,high=%s,low=%s,close=%s,volume=%s)' % (
+            self.started, self.open, self.high, self.low, self.close, self.volume)
@@ -0,0 +1,201 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+import sys
+
+_POWERS = [10 ** places for places in range(64)]
+_HASH_MODULUS = sys.hash_info.modulus
+_HASH_INVERSES = [pow(10, -places, _HASH_MODULUS) for places in range(64)]
+_DECIMALS_MAX_COUNT = 4096
+
+_decimals = {}
+
+
+def _get_power(places):
+    return _POWERS[places] if places < len(_POWERS) else 10 ** places
+
+
+def _get_hash_inverse(places):
+    return _HASH_INVERSES[places] if places < len(_HASH_INVERSES) else pow(10, -places, _HASH_MODULUS)
+
+
+def _round_half_even(numerator, denominator):
+    quotient, remainder = divmod(numerator, denominator)
+    doubled = 2 * remainder
+    if doubled > denominator or (doubled == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+class Money:
+
+    __slots__ = ('units', 'places')
+
+    def __init__(self, units: int, places: int):
+        self.units = units
+        self.places = places
+
+    @classmethod
+    def from_decimal(cls, value, places: int) -> 'Money':
+        if type(value) is Money:
+            return value.round(places)
+        if not isinstance(value, Decimal):
+            value = Decimal(value)
+        return cls(int(value.scaleb(places).to_integral_value(ROUND_HALF_EVEN)), places)
+
+    @classmethod
+    def from_number(cls, value) -> 'Money':
+        money = _coerce(value)
+        if money is NotImplemented:
+            raise TypeError('cannot convert %r to money' % (value,))
+        return money
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.units).scaleb(-self.places)
+
+    def round(self, places: int) -> 'Money':
+        if places == self.places:
+            return self
+        if places > self.places:
+            return Money(self.units * _get_power(places - self.places), places)
+        return Money(_round_half_even(self.units, _get_power(self.places - places)), places)
+
+    def __str__(self):
+        return str(self.to_decimal())
+
+    def __repr__(self):
+        return 'Money(%s)' % self
+
+    def __hash__(self):
+        value = abs(self.units) * _get_hash_inverse(self.places) % _HASH_MODULUS
+        if self.units < 0:
+            value = -value
+        return -2 if value == -1 else value
+
+    def __bool__(self):
+        return self.units != 0
+
+    def __float__(self):
+        return self.units / _get_power(self.places)
+
+    def __neg__(self):
+        return Money(-self.units, self.places)
+
+    def __abs__(self):
+        return self if self.units >= 0 else Money(-self.units, self.places)
+
+    def __add__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        if other.places == self.places:
+            return Money(self.units + other.units, self.places)
+        units, other_units, places = _align(self, other)
+        return Money(units + other_units, places)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        if other.places == self.places:
+            return Money(self.units - other.units, self.places)
+        units, other_units, places = _align(self, other)
+        return Money(units - other_units, places)
+
+    def __rsub__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return other - self
+
+    def __mul__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money(self.units * other.units, self.places + other.places)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return self.to_decimal() / other.to_decimal()
+
+    def __rtruediv__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return other.to_decimal() / self.to_decimal()
+
+    def _compare(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        if other.places == self.places:
+            return self.units - other.units
+        units, other_units, _ = _align(self, other)
+        return units - other_units
+
+    def __eq__(self, other):
+        difference = self._compare(other)
+        return difference if difference is NotImplemented else difference == 0
+
+    def __ne__(self, other):
+        difference = self._compare(other)
+        return difference if difference is NotImplemented else difference != 0
+
+    def __lt__(self, other):
+        difference = self._compare(other)
+        return difference if difference is NotImplemented else difference < 0
+
+    def __le__(self, other):
+        difference = self._compare(other)
+        return difference if difference is NotImplemented else difference <= 0
+
+    def __gt__(self, other):
+        difference = self._compare(other)
+        return difference if difference is NotImplemented else difference > 0
+
+    def __ge__(self, other):
+        difference = self._compare(other)
+        return difference if difference is NotImplemented else difference >= 0
+
+
+def _coerce(value):
+    if type(value) is Money:
+        return value
+    if isinstance(value, int):
+        return Money(value, 0)
+    if isinstance(value, Decimal) and value.is_finite():
+        money = _decimals.get(value)
+        if money is None:
+            exponent = value.as_tuple().exponent
+            money = Money(int(value), 0) if exponent >= 0 else Money(int(value.scaleb(-exponent)), -exponent)
+            if len(_decimals) < _DECIMALS_MAX_COUNT:
+                _decimals[value] = money
+        return money
+    return NotImplemented
+
+
+def _align(first, second):
+    if first.places > second.places:
+        return first.units, second.units * _get_power(first.places - second.places), first.places
+    return first.units * _get_power(second.places - first.places), second.units, second.places
+
+
+def is_price_jumped(previous, price, ratio: Money) -> bool:
+    if type(previous) is not Money or type(price) is not Money or previous.places != price.places:
+        previous, price = Money.from_number(previous), Money.from_number(price)
+        previous_units, units, places = _align(previous, price)
+        previous, price = Money(previous_units, places), Money(units, places)
+    return abs(price.units - previous.units) * _POWERS[ratio.places] >= previous.units * ratio.units
+
+
+def add_margin(price, margin, places: int) -> Money:
+    price, margin = Money.from_number(price), Money.from_number(margin)
+    units = price.units * (_get_power(margin.places) + margin.units)
+    exponent = price.places + margin.places - places
+    if exponent < 0:
+        return Money(units * _get_power(-exponent), places)
+    return Money(_round_half_even(units, _get_power(exponent)), places)
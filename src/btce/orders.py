@@ -0,0 +1,117 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from typing import Iterable, List, Optional
+
+from btce.models import Order
+from btce.money import Money
+
+
+class ActiveOrderIndex:
+
+    def __init__(self, orders: Iterable[Order]=()):
+        self._orders = {}
+        self._prices = []
+        self._credits = {}
+        self._changes = {}
+        self.version = 0
+        for order in orders:
+            self._insert(order)
+
+    def __repr__(self):
+        return 'ActiveOrderIndex(orders=%s)' % len(self._orders)
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __iter__(self):
+        return (self._orders[order_id] for _, order_id in self._prices)
+
+    def __contains__(self, order_id):
+        return order_id in self._orders
+
+    def get(self, order_id) -> Optional[Order]:
+        return self._orders.get(order_id)
+
+    def get_orders(self) -> List[Order]:
+        return list(self)
+
+    def _insert(self, order):
+        self._delete(order.id)
+        self._orders[order.id] = order
+        insort(self._prices, (order.price, order.id))
+
+    def _delete(self, order_id):
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            del self._prices[bisect_left(self._prices, (order.price, order_id))]
+        return order
+
+    def _mark_changed(self, order_id):
+        self.version += 1
+        self._changes[order_id] = self.version
+
+    def add(self, order: Order, filled: Optional[Money]=None):
+        self._insert(order)
+        if filled:
+            self._credits[order.id] = filled
+        self._mark_changed(order.id)
+
+    def remove(self, order_id) -> Optional[Order]:
+        self._credits.pop(order_id, None)
+        order = self._delete(order_id)
+        if order is not None:
+            self._mark_changed(order_id)
+        return order
+
+    def fill(self, order_id, amount: Money) -> bool:
+        order = self._orders.get(order_id)
+        if order is None:
+            return False
+        credit = self._credits.pop(order_id, None)
+        if credit is not None:
+            if credit > amount:
+                self._credits[order_id] = credit - amount
+                return False
+            amount -= credit
+            if not amount:
+                return False
+        if amount >= order.amount:
+            self.remove(order_id)
+        else:
+            self._orders[order_id] = Order(order.id, order.type, order.amount - amount, order.price, order.created,
+                                           order.completed)
+            self._mark_changed(order_id)
+        return True
+
+    def reconcile(self, orders: Iterable[Order], version: int) -> int:
+        orders = dict((order.id, order) for order in orders)
+        drift = 0
+        for order_id in self._orders.keys() | orders.keys():
+            if self._changes.get(order_id, 0) > version:
+                continue
+            order = orders.get(order_id)
+            current = self._orders.get(order_id)
+            if order is None:
+                self._credits.pop(order_id, None)
+                self._delete(order_id)
+            elif current is None or (current.amount, current.price) != (order.amount, order.price):
+                self._insert(order)
+            else:
+                continue
+            drift += 1
+        self._changes = dict((order_id, changed) for order_id, changed in self._changes.items() if changed > version)
+        return drift
+
+    def find(self, order_type: int, price: Money) -> Optional[Order]:
+        index = bisect_left(self._prices, (price,))
+        while index < len(self._prices) and self._prices[index][0] == price:
+            order = self._orders[self._prices[index][1]]
+            if order.type == order_type:
+                return order
+            index += 1
+        return None
+
+    def get_outdated(self, created_before: datetime) -> List[Order]:
+        return [order for order in self._orders.values()
+                if order.created is not None and order.created < created_before]
@@ -0,0 +1,163 @@
+from datetime import timedelta
+import heapq
+from itertools import count
+
+from rx.disposables import CompositeDisposable, SerialDisposable
+
+from btce import commands
+from btce.bus import Bus
+from btce.common import get_logger, MAIN_THREAD
+
+logger = get_logger(__name__)
+
+GOLDEN_RATIO_FRACTION = 0.6180339887498949
+
+
+def _get_poll_key(command):
+    return type(command), getattr(command, 'pair', None)
+
+
+class _Poll:
+
+    def __init__(self, command, phase):
+        self.command = command
+        self.phase = phase
+        self.registrations = []
+        self.due = None
+
+    @property
+    def interval(self):
+        return min(registration.interval for registration in self.registrations)
+
+    @property
+    def start_period(self):
+        return min(registration.start_period for registration in self.registrations)
+
+
+class PollScheduler:
+
+    POLL_IMMEDIATELY = 1
+    TIMER_PRECISION = timedelta(milliseconds=1)
+    BATCHED_COMMANDS = (commands.GetPriceCommand, commands.GetDepthCommand, commands.GetTradesCommand)
+
+    def __init__(self, commands: Bus, scheduler=MAIN_THREAD, min_interval=0):
+        self._subscription = None
+        self._commands = commands
+        self._scheduler = scheduler
+        self._min_interval = min_interval
+        self._polls = {}
+        self._queue = []
+        self._sequence = count()
+        self._phase_counters = {}
+        self._batch_phases = {}
+        self._stretches = {}
+        self._timer = SerialDisposable()
+        self._timer_due = None
+        self._origin = None
+
+    def __repr__(self):
+        return 'PollScheduler(polls=%s)' % len(self._polls)
+
+    def init(self):
+        logger.info('Starting %s', self)
+        self._subscription = CompositeDisposable(
+            self._subscribe_for_poll_command(),
+            self._subscribe_for_cancel_poll_command(),
+            self._timer,
+        )
+
+    def _subscribe_for_poll_command(self):
+        return (self._commands.get(commands.PollCommand)
+            .subscribe(self.register))
+
+    def _subscribe_for_cancel_poll_command(self):
+        return (self._commands.get(commands.CancelPollCommand)
+            .subscribe(lambda command: self.unregister(command.poll_command)))
+
+    def register(self, poll_command: commands.PollCommand):
+        now = self._scheduler.now
+        if self._origin is None:
+            self._origin = now
+        key = _get_poll_key(poll_command.command)
+        poll = self._polls.get(key)
+        if poll is None:
+            poll = self._polls[key] = _Poll(poll_command.command,
+                                            self._get_phase(poll_command.command, poll_command.interval))
+        poll.registrations.append(poll_command)
+        due = now + timedelta(milliseconds=self.POLL_IMMEDIATELY + int(poll.phase * poll.start_period))
+        if poll.due is None or due < poll.due:
+            self._schedule(poll, due)
+
+    def _get_phase(self, command, interval):
+        if not isinstance(command, self.BATCHED_COMMANDS):
+            return self._get_next_phase(interval)
+        batch_key = (type(command), interval)
+        if batch_key not in self._batch_phases:
+            self._batch_phases[batch_key] = self._get_next_phase(interval)
+        return self._batch_phases[batch_key]
+
+    def _get_next_phase(self, interval):
+        number = self._phase_counters.get(interval, 0)
+        self._phase_counters[interval] = number + 1
+        return number * GOLDEN_RATIO_FRACTION % 1
+
+    def unregister(self, poll_command: commands.PollCommand):
+        key = _get_poll_key(poll_command.command)
+        poll = self._polls.get(key)
+        if poll is not None and poll_command in poll.registrations:
+            poll.registrations.remove(poll_command)
+            if not poll.registrations:
+                del self._polls[key]
+
+    def get_rate(self, command_types) -> float:
+        batches = set()
+        rate = 0
+        for poll in self._polls.values():
+            if not isinstance(poll.command, command_types):
+                continue
+            if isinstance(poll.command, self.BATCHED_COMMANDS):
+                batch_key = (type(poll.command), poll.interval)
+                if batch_key in batches:
+                    continue
+                batches.add(batch_key)
+            rate += 1000 / poll.interval
+        return rate
+
+    def set_stretch(self, command_types, stretch):
+        for command_type in command_types:
+            self._stretches[command_type] = stretch
+
+    def _schedule(self, poll, due):
+        self._push(poll, due)
+        self._update_timer()
+
+    def _push(self, poll, due):
+        poll.due = due
+        heapq.heappush(self._queue, (due, next(self._sequence), poll))
+
+    def _update_timer(self):
+        if self._queue and self._queue[0][0] != self._timer_due:
+            self._timer_due = self._queue[0][0]
+            self._timer.disposable = self._scheduler.schedule_absolute(self._timer_due,
+                                                                       lambda scheduler, state: self._on_timer())
+
+    def _on_timer(self):
+        self._timer_due = None
+        now = self._scheduler.now + self.TIMER_PRECISION
+        while self._queue and self._queue[0][0] <= now:
+            due, _, poll = heapq.heappop(self._queue)
+            if poll.due == due and self._polls.get(_get_poll_key(poll.command)) is poll:
+                self._push(poll, self._get_next_due(poll, now))
+                self._commands.on_next(poll.command)
+        self._update_timer()
+
+    def _get_next_due(self, poll, now):
+        stretch = self._stretches.get(type(poll.command), 1)
+        interval = timedelta(milliseconds=max(int(poll.interval * stretch), self._min_interval))
+        slot = self._origin + poll.phase * interval
+        return slot + ((now - slot) // interval + 1) * interval
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
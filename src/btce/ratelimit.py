@@ -0,0 +1,50 @@
+from tornado.gen import coroutine, sleep
+from tornado.ioloop import IOLoop
+
+
+class TokenBucket:
+
+    def __init__(self, rate, capacity, reserve=0, clock=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = reserve
+        self._clock = clock or (lambda: IOLoop.current().time())
+        self._tokens = capacity
+        self._updated = None
+
+    def __repr__(self):
+        return 'TokenBucket(rate=%s,capacity=%s,reserve=%s)' % (self.rate, self.capacity, self.reserve)
+
+    def _refill(self):
+        now = self._clock()
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def get_tokens(self):
+        self._refill()
+        return self._tokens
+
+    def get_delay(self, is_reserved=False):
+        floor = 0 if is_reserved else self.reserve
+        missing = floor + 1 - self.get_tokens()
+        return max(0, missing / self.rate)
+
+    def take(self, is_reserved=False):
+        if self.get_delay(is_reserved):
+            return False
+        self._tokens -= 1
+        return True
+
+    @coroutine
+    def acquire(self, is_reserved=False):
+        waited = 0
+        while not self.take(is_reserved):
+            delay = self.get_delay(is_reserved)
+            waited += delay
+            yield sleep(delay)
+        return waited
+
+
+def create_bucket(rate, capacity, reserve=0):
+    return None if rate is None else TokenBucket(rate, capacity, reserve)
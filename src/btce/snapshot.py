@@ -0,0 +1,69 @@
+from decimal import Decimal
+import json
+import os
+
+from rx import Observable
+from typing import Dict
+
+from btce.common import get_logger, MAIN_THREAD
+from btce.models import TraderState
+
+logger = get_logger(__name__)
+
+
+def _to_string(value):
+    return None if value is None else str(value)
+
+
+def _to_decimal(value):
+    return None if value is None else Decimal(value)
+
+
+class SnapshotKeeper:
+
+    SAVE_INTERVAL = 60000
+
+    def __init__(self, store_file):
+        self._subscription = None
+        self._store_file = store_file
+        self._states = {}
+
+    def __repr__(self):
+        return 'SnapshotKeeper(store_file=%s)' % self._store_file
+
+    def load(self) -> Dict[str, TraderState]:
+        if not os.path.exists(self._store_file):
+            return {}
+        try:
+            with open(self._store_file, 'r') as store:
+                snapshot = json.load(store)
+        except ValueError as e:
+            logger.warn('Cannot load snapshot: %s', e)
+            return {}
+        return dict((pair, TraderState(_to_decimal(state['price']), _to_decimal(state['jump_price']),
+                                       dict((currency, Decimal(value)) for currency, value in state['balances'].items())))
+                    for pair, state in snapshot.items())
+
+    def init(self, states: Dict[str, TraderState]):
+        logger.info('Starting %s', self)
+        self._states = states
+        self._subscription = (Observable
+            .interval(self.SAVE_INTERVAL, MAIN_THREAD)
+            .subscribe(lambda count: self._save()))
+
+    def _save(self):
+        snapshot = dict((pair, {
+            'price': _to_string(state.price),
+            'jump_price': _to_string(state.jump_price),
+            'balances': dict((currency, str(value)) for currency, value in state.balances.items()),
+        }) for pair, state in self._states.items())
+        temp_file = self._store_file + '.tmp'
+        with open(temp_file, 'w') as store:
+            json.dump(snapshot, store)
+        os.replace(temp_file, self._store_file)
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
+        self._save()
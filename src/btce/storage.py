@@ -0,0 +1,215 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+import sqlite3
+
+from rx import Observable
+from rx.disposables import CompositeDisposable
+from tornado.ioloop import IOLoop
+
+from btce import config, events
+from btce.bus import Bus
+from btce.common import get_logger, MAIN_THREAD
+
+logger = get_logger(__name__)
+
+
+def _to_string(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return str(value)
+
+
+class _Backend(ABC):
+
+    DECIMAL_TYPE = None
+    PLACEHOLDER = None
+
+    TABLES = {
+        'orders': (('pair', 'TEXT'), ('id', 'BIGINT'), ('type', 'SMALLINT'), ('amount', 'DECIMAL'),
+                   ('price', 'DECIMAL'), ('created', 'TIMESTAMP'), ('completed', 'TIMESTAMP'), ('seen', 'TIMESTAMP')),
+        'prices': (('pair', 'TEXT'), ('value', 'DECIMAL'), ('seen', 'TIMESTAMP')),
+        'balances': (('currency', 'TEXT'), ('value', 'DECIMAL'), ('seen', 'TIMESTAMP')),
+    }
+    INDEXES = {
+        'orders_pair_completed': ('orders', ('pair', 'completed')),
+        'orders_pair_id': ('orders', ('pair', 'id')),
+        'prices_pair_seen': ('prices', ('pair', 'seen')),
+    }
+
+    def __init__(self):
+        self._connection = None
+
+    @abstractmethod
+    def _connect(self):
+        pass
+
+    def init(self):
+        self._connection = self._connect()
+        cursor = self._connection.cursor()
+        for table, columns in self.TABLES.items():
+            cursor.execute('CREATE TABLE IF NOT EXISTS %s (%s)' % (table, ', '.join(
+                '%s %s' % (name, self.DECIMAL_TYPE if column_type == 'DECIMAL' else column_type)
+                for name, column_type in columns)))
+        for index, (table, columns) in self.INDEXES.items():
+            cursor.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (index, table, ', '.join(columns)))
+        self._connection.commit()
+
+    def write(self, rows):
+        cursor = self._connection.cursor()
+        for table, table_rows in rows.items():
+            if table_rows:
+                placeholders = ', '.join([self.PLACEHOLDER] * len(self.TABLES[table]))
+                cursor.executemany('INSERT INTO %s VALUES (%s)' % (table, placeholders),
+                                   [tuple(map(_to_string, row)) for row in table_rows])
+        self._connection.commit()
+
+    def get_prices(self, pair: str, since: datetime=None):
+        query = 'SELECT value, seen FROM prices WHERE pair = %s' % self.PLACEHOLDER
+        params = [pair]
+        if since is not None:
+            query += ' AND seen >= %s' % self.PLACEHOLDER
+            params.append(_to_string(since))
+        cursor = self._connection.cursor()
+        cursor.execute(query + ' ORDER BY seen', params)
+        return [(Decimal(value), self._to_datetime(seen)) for value, seen in cursor]
+
+    def get_completed_orders(self, pair: str, since: datetime=None):
+        query = ('SELECT DISTINCT id, type, amount, price, completed FROM orders '
+                 'WHERE pair = %s AND completed IS NOT NULL' % self.PLACEHOLDER)
+        params = [pair]
+        if since is not None:
+            query += ' AND completed >= %s' % self.PLACEHOLDER
+            params.append(_to_string(since))
+        cursor = self._connection.cursor()
+        cursor.execute(query + ' ORDER BY completed', params)
+        return [(order_id, order_type, Decimal(amount), Decimal(price), self._to_datetime(completed))
+                for order_id, order_type, amount, price, completed in cursor]
+
+    def _to_datetime(self, value):
+        return value
+
+    def deinit(self):
+        if self._connection is not None:
+            self._connection.close()
+
+
+class SqliteBackend(_Backend):
+
+    DECIMAL_TYPE = 'TEXT'
+    PLACEHOLDER = '?'
+
+    def __init__(self, path):
+        super().__init__()
+        self._path = path
+
+    def _connect(self):
+        return sqlite3.connect(self._path, check_same_thread=False)
+
+    def _to_datetime(self, value):
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f' if '.' in value else '%Y-%m-%d %H:%M:%S')
+
+
+class PostgresBackend(_Backend):
+
+    DECIMAL_TYPE = 'NUMERIC'
+    PLACEHOLDER = '%s'
+
+    def __init__(self, host, port, user, password, name):
+        super().__init__()
+        self._params = {'host': host, 'port': port, 'user': user, 'password': password, 'dbname': name}
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(**self._params)
+
+
+def get_backend():
+    if config.DB_BACKEND == 'sqlite':
+        return SqliteBackend(config.DB_PATH)
+    if config.DB_BACKEND == 'postgres':
+        return PostgresBackend(config.DB_HOST, config.DB_PORT, config.DB_USER, config.DB_PASSWORD, config.DB_NAME)
+    raise Exception('unknown storage backend %s' % config.DB_BACKEND)
+
+
+class Storage:
+
+    FLUSH_INTERVAL = 5000
+
+    def __init__(self, backend: _Backend, events: Bus):
+        self._subscription = None
+        self._backend = backend
+        self._events = events
+        self._executor = ThreadPoolExecutor(1)
+        self._rows = self._get_empty_rows()
+        self._active_orders = {}
+
+    def __repr__(self):
+        return 'Storage(backend=%s)' % type(self._backend).__name__
+
+    def _get_empty_rows(self):
+        return dict((table, []) for table in _Backend.TABLES)
+
+    def init(self):
+        logger.info('Starting %s', self)
+        self._backend.init()
+        self._subscription = CompositeDisposable(
+            self._subscribe_for_active_orders(),
+            self._subscribe_for_completed_orders(),
+            self._subscribe_for_price(),
+            self._subscribe_for_balance(),
+            self._subscribe_for_flush(),
+        )
+
+    def _subscribe_for_active_orders(self):
+        return (self._events.get(events.ActiveOrdersEvent)
+            .subscribe(lambda event: self._add_orders(event.pair, self._get_changed_orders(event.pair, event.orders))))
+
+    def _subscribe_for_completed_orders(self):
+        return (self._events.get(events.CompletedOrdersEvent)
+            .subscribe(lambda event: self._add_orders(event.pair, event.orders)))
+
+    def _subscribe_for_price(self):
+        return (self._events.get(events.PriceEvent)
+            .subscribe(lambda event: self._rows['prices'].append((event.pair, event.value, datetime.utcnow()))))
+
+    def _subscribe_for_balance(self):
+        return (self._events.get(events.BalanceEvent)
+            .subscribe(lambda event: self._rows['balances'].append((event.currency, event.value, datetime.utcnow()))))
+
+    def _subscribe_for_flush(self):
+        return (Observable
+            .interval(self.FLUSH_INTERVAL, MAIN_THREAD)
+            .subscribe(lambda count: self._flush()))
+
+    def _get_changed_orders(self, pair, orders):
+        previous = self._active_orders.get(str(pair), {})
+        current = self._active_orders[str(pair)] = dict((order.id, (order.amount, order.price)) for order in orders)
+        return [order for order in orders if previous.get(order.id) != current[order.id]]
+
+    def _add_orders(self, pair, orders):
+        seen = datetime.utcnow()
+        self._rows['orders'].extend((pair, order.id, order.type, order.amount, order.price, order.created,
+                                     order.completed, seen) for order in orders)
+
+    def _flush(self):
+        if any(self._rows.values()):
+            rows, self._rows = self._rows, self._get_empty_rows()
+            IOLoop.current().add_future(self._executor.submit(self._backend.write, rows), self._on_flushed)
+
+    def _on_flushed(self, future):
+        if future.exception() is not None:
+            logger.warn('Cannot write to storage: %s', future.exception())
+
+    def deinit(self):
+        logger.info('Stopping %s', self)
+        if self._subscription is not None:
+            self._subscription.dispose()
+        if any(self._rows.values()):
+            self._executor.submit(self._backend.write, self._rows).result()
+            self._rows = self._get_empty_rows()
+        self._executor.submit(self._backend.deinit).result()
+        self._executor.shutdown()
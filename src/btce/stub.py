@@ -0,0 +1,266 @@
+from collections import defaultdict, deque, OrderedDict
+from decimal import Decimal
+import hashlib
+import hmac
+from itertools import count
+import json
+from random import random, uniform
+import time
+from urllib.parse import parse_qsl
+
+from tornado.gen import coroutine, sleep
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+from tornado.web import Application, HTTPError, RequestHandler
+
+from btce.common import get_logger
+
+logger = get_logger(__name__)
+
+
+class _ExchangeHandler(RequestHandler):
+
+    def initialize(self, exchange):
+        self._exchange = exchange
+
+    @coroutine
+    def _prepare_response(self):
+        self._exchange.request_count += 1
+        latency = self._exchange.get_latency()
+        if latency:
+            yield sleep(latency)
+        if random() < self._exchange.error_rate:
+            raise HTTPError(503)
+
+    def _write_json(self, data):
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(data, default=float))
+
+
+class _TickerHandler(_ExchangeHandler):
+
+    @coroutine
+    def get(self, pairs):
+        yield self._prepare_response()
+        self._write_json(self._exchange.get_ticker(pairs.split('-')))
+
+
+class _DepthHandler(_ExchangeHandler):
+
+    @coroutine
+    def get(self, pairs):
+        yield self._prepare_response()
+        self._write_json(self._exchange.get_depth(pairs.split('-'), int(self.get_argument('limit', 150))))
+
+
+class _TradesHandler(_ExchangeHandler):
+
+    @coroutine
+    def get(self, pairs):
+        yield self._prepare_response()
+        self._write_json(self._exchange.get_trades(pairs.split('-'), int(self.get_argument('limit', 150))))
+
+
+class _TradeApiHandler(_ExchangeHandler):
+
+    @coroutine
+    def post(self):
+        yield self._prepare_response()
+        params = dict(parse_qsl(self.request.body.decode()))
+        result, error = self._exchange.call(params.pop('method', None), params, self.request.headers.get('Key'),
+                                            self.request.headers.get('Sign'), self.request.body)
+        if error is None:
+            self._write_json({'success': 1, 'return': result})
+        else:
+            self._write_json({'success': 0, 'error': error})
+
+
+class StubExchange:
+
+    API_METHODS = ('getInfo', 'Trade', 'ActiveOrders', 'TradeHistory', 'CancelOrder')
+    DEPTH_STEP = Decimal('0.001')
+    PUBLIC_TRADES_MAX_COUNT = 5000
+
+    def __init__(self, prices=None, balances=None, latency=0, error_rate=0, no_orders=False, no_trades=False,
+                 secret=None, fee=Decimal(0)):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.no_orders = no_orders
+        self.no_trades = no_trades
+        self.request_count = 0
+        self._secret = secret
+        self._fee = fee
+        self._prices = dict(prices or {})
+        self._depths = {}
+        self._public_trades = defaultdict(lambda: deque(maxlen=self.PUBLIC_TRADES_MAX_COUNT))
+        self._public_trade_ids = count(1)
+        self._funds = defaultdict(Decimal, balances or {})
+        self._orders = OrderedDict()
+        self._trades = OrderedDict()
+        self._order_ids = count(1)
+        self._trade_ids = count(1)
+        self._nonces = {}
+        self._server = None
+
+    def __repr__(self):
+        return 'StubExchange(latency=%s,error_rate=%s)' % (self.latency, self.error_rate)
+
+    def get_application(self) -> Application:
+        return Application([
+            (r'/api/3/ticker/([a-z0-9_\-]+)', _TickerHandler, {'exchange': self}),
+            (r'/api/3/depth/([a-z0-9_\-]+)', _DepthHandler, {'exchange': self}),
+            (r'/api/3/trades/([a-z0-9_\-]+)', _TradesHandler, {'exchange': self}),
+            (r'/tapi', _TradeApiHandler, {'exchange': self}),
+        ])
+
+    def listen(self, port=0, address='127.0.0.1') -> int:
+        sockets = bind_sockets(port, address)
+        self._server = HTTPServer(self.get_application())
+        self._server.add_sockets(sockets)
+        logger.info('Starting %s on %s:%s', self, address, sockets[0].getsockname()[1])
+        return sockets[0].getsockname()[1]
+
+    def stop(self):
+        if self._server is not None:
+            self._server.stop()
+            self._server = None
+
+    def get_latency(self):
+        if isinstance(self.latency, tuple):
+            return uniform(*self.latency)
+        return self.latency
+
+    def get_funds(self):
+        return dict((currency, amount) for currency, amount in self._funds.items())
+
+    def set_price(self, pair, price):
+        self._prices[pair] = price
+        for order_id, order in list(self._orders.items()):
+            if order['pair'] == pair and self._is_crossed(order['type'], order['rate'], price):
+                del self._orders[order_id]
+                self._fill(order_id, order['pair'], order['type'], order['amount'], order['rate'])
+
+    def set_depth(self, pair, bids, asks):
+        self._depths[pair] = (bids, asks)
+
+    def add_public_trade(self, pair, trade_type, amount, price, timestamp=None):
+        self._public_trades[pair].appendleft({
+            'type': trade_type,
+            'price': price,
+            'amount': amount,
+            'tid': next(self._public_trade_ids),
+            'timestamp': int(time.time()) if timestamp is None else timestamp,
+        })
+
+    def _is_crossed(self, order_type, rate, price):
+        return price >= rate if order_type == 'sell' else price <= rate
+
+    def _fill(self, order_id, pair, order_type, amount, rate):
+        first, second = pair.split('_')
+        if order_type == 'sell':
+            self._funds[second] += amount * rate * (1 - self._fee)
+        else:
+            self._funds[first] += amount * (1 - self._fee)
+        self.add_public_trade(pair, 'bid' if order_type == 'sell' else 'ask', amount, rate)
+        self._trades[next(self._trade_ids)] = {
+            'pair': pair,
+            'type': order_type,
+            'amount': amount,
+            'rate': rate,
+            'order_id': order_id,
+            'is_your_order': 1,
+            'timestamp': int(time.time()),
+        }
+
+    def get_ticker(self, pairs):
+        return dict((pair, {'last': self._prices[pair], 'updated': int(time.time())})
+                    for pair in pairs if pair in self._prices)
+
+    def get_trades(self, pairs, limit):
+        return dict((pair, list(self._public_trades[pair])[:limit]) for pair in pairs
+                    if pair in self._public_trades or pair in self._prices)
+
+    def get_depth(self, pairs, limit):
+        return dict((pair, dict(zip(('bids', 'asks'), self._get_depth(pair, limit)))) for pair in pairs
+                    if pair in self._depths or pair in self._prices)
+
+    def _get_depth(self, pair, limit):
+        if pair in self._depths:
+            bids, asks = self._depths[pair]
+            return bids[:limit], asks[:limit]
+        price = self._prices[pair]
+        step = price * self.DEPTH_STEP
+        return ([[price - step * (level + 1), Decimal(1)] for level in range(limit)],
+                [[price + step * (level + 1), Decimal(1)] for level in range(limit)])
+
+    def call(self, method, params, key=None, sign=None, body=b''):
+        if method not in self.API_METHODS:
+            return None, 'invalid method'
+        if self._secret is not None and sign != hmac.new(self._secret.encode(), body, hashlib.sha512).hexdigest():
+            return None, 'invalid sign'
+        nonce = int(params.pop('nonce', 0))
+        if nonce <= self._nonces.get(key, 0):
+            return None, 'invalid nonce parameter; on key:%s, you sent:%s, you should send:%s' % (
+                self._nonces.get(key, 0), nonce, self._nonces.get(key, 0) + 1)
+        self._nonces[key] = nonce
+        return getattr(self, '_call_%s' % method)(params)
+
+    def _call_getInfo(self, params):
+        return {
+            'funds': self.get_funds(),
+            'rights': {'info': 1, 'trade': 1, 'withdraw': 0},
+            'transaction_count': 0,
+            'open_orders': len(self._orders),
+            'server_time': int(time.time()),
+        }, None
+
+    def _call_Trade(self, params):
+        pair, order_type = params['pair'], params['type']
+        amount, rate = Decimal(params['amount']), Decimal(params['rate'])
+        first, second = pair.split('_')
+        currency, cost = (first, amount) if order_type == 'sell' else (second, amount * rate)
+        if cost > self._funds[currency]:
+            return None, 'It is not enough %s in the account for %s.' % (currency.upper(), order_type)
+        self._funds[currency] -= cost
+        order_id = next(self._order_ids)
+        if pair in self._prices and self._is_crossed(order_type, rate, self._prices[pair]):
+            self._fill(order_id, pair, order_type, amount, rate)
+            return {'received': amount, 'remains': 0, 'order_id': 0, 'funds': self.get_funds()}, None
+        self._orders[order_id] = {
+            'pair': pair,
+            'type': order_type,
+            'amount': amount,
+            'rate': rate,
+            'timestamp_created': int(time.time()),
+            'status': 0,
+        }
+        return {'received': 0, 'remains': amount, 'order_id': order_id, 'funds': self.get_funds()}, None
+
+    def _call_ActiveOrders(self, params):
+        orders = dict((order_id, order) for order_id, order in self._orders.items()
+                      if 'pair' not in params or order['pair'] == params['pair'])
+        if self.no_orders or not orders:
+            return None, 'no orders'
+        return orders, None
+
+    def _call_TradeHistory(self, params):
+        trades = [(trade_id, trade) for trade_id, trade in self._trades.items()
+                  if ('pair' not in params or trade['pair'] == params['pair']) and
+                  trade_id >= int(params.get('from_id', 0))]
+        if params.get('order', 'DESC') == 'DESC':
+            trades.reverse()
+        trades = trades[:int(params.get('count', 1000))]
+        if self.no_trades or not trades:
+            return None, 'no trades'
+        return OrderedDict(trades), None
+
+    def _call_CancelOrder(self, params):
+        order = self._orders.pop(int(params['order_id']), None)
+        if order is None:
+            return None, 'bad status'
+        first, second = order['pair'].split('_')
+        if order['type'] == 'sell':
+            self._funds[first] += order['amount']
+        else:
+            self._funds[second] += order['amount'] * order['rate']
+        return {'order_id': int(params['order_id']), 'funds': self.get_funds()}, None
@@ -0,0 +1,216 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import heapq
+from itertools import count, product
+import os
+
+import numpy
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from btce import config
+from btce.models import Currency, Order, TradingOptions
+
+SEARCH_CHUNK_SIZE = 64
+JITTER_BLOCK_SIZE = 1024
+
+_EVENT_FILL = 0
+_EVENT_CANCEL = 1
+_OUTDATE_PERIOD = config.ORDER_OUTDATE_PERIOD.total_seconds()
+
+_prices = None
+
+
+def get_price_arrays(ticks: Iterable[Tuple], pair_names: Sequence[str]) -> Dict[str, Tuple[numpy.ndarray,
+                                                                                          numpy.ndarray]]:
+    times = dict((name, []) for name in pair_names)
+    prices = dict((name, []) for name in pair_names)
+    for seen, pair_name, price in ticks:
+        if pair_name in times:
+            times[pair_name].append(seen.timestamp())
+            prices[pair_name].append(float(price))
+    return dict((name, (numpy.array(times[name]), numpy.array(prices[name]))) for name in pair_names if times[name])
+
+
+def _find_first(prices, start, is_matched):
+    chunk_size = SEARCH_CHUNK_SIZE
+    while start < len(prices):
+        end = min(start + chunk_size, len(prices))
+        matched = numpy.flatnonzero(is_matched(prices[start:end]))
+        if matched.size:
+            return start + int(matched[0])
+        start = end
+        chunk_size *= 2
+    return None
+
+
+def get_jumping_price_indexes(prices: numpy.ndarray, price_jump_value: float) -> List[int]:
+    indexes = []
+    base = 0
+    while True:
+        low, high = prices[base] * (1 - price_jump_value), prices[base] * (1 + price_jump_value)
+        base = _find_first(prices, base + 1, lambda chunk: (chunk <= low) | (chunk >= high))
+        if base is None:
+            return indexes
+        indexes.append(base)
+
+
+def get_new_prices(order_type: int, prices: numpy.ndarray, margin: float, jitters: numpy.ndarray,
+                   places: int) -> numpy.ndarray:
+    margins = margin + numpy.round(jitters, 4)
+    if order_type == Order.TYPE_SELL:
+        return numpy.round(prices + prices * margins, places)
+    if order_type == Order.TYPE_BUY:
+        return numpy.round(prices - prices * margins, places)
+    raise Exception('unknown order type %s' % order_type)
+
+
+class SweepResult:
+
+    def __init__(self, margin, margin_jitter, price_jump_value, pnl, fill_count, inventory_drift):
+        self.margin = margin
+        self.margin_jitter = margin_jitter
+        self.price_jump_value = price_jump_value
+        self.pnl = pnl
+        self.fill_count = fill_count
+        self.inventory_drift = inventory_drift
+
+    def __repr__(self):
+        return 'SweepResult(margin=%s,jitter=%s,jump=%s,pnl=%s,fills=%s,drift=%s)' % (
+            self.margin, self.margin_jitter, self.price_jump_value, self.pnl, self.fill_count, self.inventory_drift)
+
+
+class _PairSimulation:
+
+    def __init__(self, options, times, prices, margin, margin_jitter, price_jump_value, random):
+        self.options = options
+        self.times = times
+        self.prices = prices
+        self.margin = margin
+        self.margin_jitter = margin_jitter
+        self.jumps = get_jumping_price_indexes(prices, price_jump_value)
+        jump_prices = prices[self.jumps]
+        places = options.pair.second.places
+        self.sell_prices = get_new_prices(Order.TYPE_SELL, jump_prices, margin, self._get_jitters(random), places)
+        self.buy_prices = get_new_prices(Order.TYPE_BUY, jump_prices, margin, self._get_jitters(random), places)
+        self._random = random
+        self._jitters = []
+
+    def _get_jitters(self, random, size=None):
+        return random.uniform(-self.margin_jitter, self.margin_jitter, len(self.jumps) if size is None else size)
+
+    def get_new_price(self, order_type, price):
+        if not self._jitters:
+            self._jitters = numpy.round(self._get_jitters(self._random, JITTER_BLOCK_SIZE), 4).tolist()
+        margin = self.margin + self._jitters.pop()
+        if order_type == Order.TYPE_SELL:
+            return round(price + price * margin, self.options.pair.second.places)
+        return round(price - price * margin, self.options.pair.second.places)
+
+    def find_fill(self, order_type, index, price):
+        if order_type == Order.TYPE_SELL:
+            return _find_first(self.prices, index + 1, lambda chunk: chunk >= price)
+        return _find_first(self.prices, index + 1, lambda chunk: chunk <= price)
+
+
+def _simulate(trading, balances, quote_currency, margin, margin_jitter, price_jump_value, seed):
+    random = numpy.random.RandomState(seed)
+    initial_balances = balances
+    balances = defaultdict(float, balances)
+    fee = float(config.EXCHANGE_MARGIN)
+    simulations = []
+    queue = []
+    sequence = count()
+    for options in trading:
+        if str(options.pair) not in _prices:
+            continue
+        times, prices = _prices[str(options.pair)]
+        simulations.append(_PairSimulation(options, times, prices, margin, margin_jitter, price_jump_value, random))
+        for number, index in enumerate(simulations[-1].jumps):
+            queue.append((times[index], next(sequence), len(simulations) - 1, index, None, number))
+    heapq.heapify(queue)
+    fill_count = 0
+    while queue:
+        _, _, simulation_number, index, event, number = heapq.heappop(queue)
+        simulation = simulations[simulation_number]
+        pair = simulation.options.pair
+        if event is None:
+            amount = float(simulation.options.deal_amount)
+            orders = ((Order.TYPE_SELL, simulation.sell_prices[number]),
+                      (Order.TYPE_BUY, simulation.buy_prices[number]))
+        elif event[0] == _EVENT_CANCEL:
+            balances[event[1]] += event[2]
+            continue
+        else:
+            _, order_type, amount, price = event
+            if order_type == Order.TYPE_SELL:
+                balances[pair.second] += amount * price * (1 - fee)
+                counter_type = Order.TYPE_BUY
+            else:
+                balances[pair.first] += amount * (1 - fee)
+                counter_type = Order.TYPE_SELL
+            fill_count += 1
+            if amount < float(simulation.options.min_amount):
+                continue
+            orders = ((counter_type, simulation.get_new_price(counter_type, price)),)
+        for order_type, price in orders:
+            currency, cost = (pair.first, amount) if order_type == Order.TYPE_SELL else (pair.second, amount * price)
+            if cost > balances[currency]:
+                continue
+            balances[currency] -= cost
+            fill = simulation.find_fill(order_type, index, price)
+            outdate = simulation.times[index] + _OUTDATE_PERIOD
+            if fill is None or simulation.times[fill] > outdate:
+                event = (_EVENT_CANCEL, currency, cost)
+                heapq.heappush(queue, (outdate, next(sequence), simulation_number, index, event, 0))
+            else:
+                event = (_EVENT_FILL, order_type, amount, price)
+                heapq.heappush(queue, (simulation.times[fill], next(sequence), simulation_number, fill, event, 0))
+    pnl = _get_value(balances, simulations, quote_currency, -1) - _get_value(initial_balances, simulations,
+                                                                             quote_currency, 0)
+    drift = sum(abs(balances[currency] - initial_balances.get(currency, 0)) for currency in set(balances)
+                if currency is not quote_currency)
+    return SweepResult(margin, margin_jitter, price_jump_value, float(pnl), fill_count, drift)
+
+
+def _get_value(balances, simulations, quote_currency, index):
+    value = balances.get(quote_currency, 0)
+    for simulation in simulations:
+        if simulation.options.pair.second is quote_currency:
+            value += balances.get(simulation.options.pair.first, 0) * simulation.prices[index]
+    return value
+
+
+def _init_worker(prices):
+    global _prices
+    _prices = prices
+
+
+def _run_configuration(args):
+    return _simulate(*args)
+
+
+def get_grid(margins: Sequence[Decimal], margin_jitters: Sequence[Decimal],
+             price_jump_values: Sequence[Decimal]) -> List[Tuple[float, float, float]]:
+    return [(float(margin), float(jitter), float(jump))
+            for margin, jitter, jump in product(margins, margin_jitters, price_jump_values)]
+
+
+def run_sweep(trading: Sequence[TradingOptions], prices: Dict[str, Tuple[numpy.ndarray, numpy.ndarray]],
+              balances: Dict[Currency, Decimal], quote_currency: Currency, grid: Sequence[Tuple[float, float, float]],
+              seed=0, workers=None) -> List[SweepResult]:
+    balances = dict((currency, float(amount)) for currency, amount in balances.items())
+    tasks = [(trading, balances, quote_currency, margin, jitter, jump, seed) for margin, jitter, jump in grid]
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(prices,)) as executor:
+        results = list(executor.map(_run_configuration, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    return sorted(results, key=lambda result: result.pnl, reverse=True)
+
+
+def format_results(results: Sequence[SweepResult]) -> str:
+    lines = ['%4s %8s %8s %8s %14s %6s %14s' % ('rank', 'margin', 'jitter', 'jump', 'pnl', 'fills', 'drift')]
+    for rank, result in enumerate(results, 1):
+        lines.append('%4s %8.4f %8.4f %8.4f %14.4f %6s %14.6f' % (rank, result.margin, result.margin_jitter,
+                                                                   result.price_jump_value, result.pnl,
+                                                                   result.fill_count, result.inventory_drift))
+    return '\n'.join(lines)
@@ -1,15 +1,17 @@
-from datetime import datetime
 from decimal import Decimal
 from functools import partial
 
 from random import uniform
 
 from rx import Observable
-from rx.disposables import CompositeDisposable
+from rx.disposables import AnonymousDisposable, CompositeDisposable
 
 from btce import config, commands, events
+from btce.bus import Bus
 from btce.common import normalize_value, get_logger, MAIN_THREAD
-from btce.models import TradingOptions, Order
+from btce.models import TradingOptions, Order, TraderState
+from btce.money import Money, add_margin, is_price_jumped
+from btce.orders import ActiveOrderIndex
 from btce.utils import get_data_packed as d
 
 logger = get_logger(__name__)
@@ -17,79 +19,102 @@ logger = get_logger(__name__)
 
 class Trader:
 
-    POLL_IMMEDIATELY = 1
     POLL_SERVER_TIME_INTERVAL = 1000
     POLL_PRICE_INTERVAL = 10000
+    POLL_DEPTH_INTERVAL = 10000
     POLL_BALANCE_INTERVAL = 600000
     POLL_ACTIVE_ORDERS_INTERVAL = 3600000
     POLL_COMPLETED_ORDERS_INTERVAL = 10000
+    CHECK_OUTDATED_ORDERS_INTERVAL = 60000
     SHOW_TIME_AND_PRICE_INTERVAL = 600000
+    STARTUP_SPREAD = 10000
 
     REASON_PRICE_JUMP = 0
     REASON_ORDER_COMPLETED = 1
 
-    def __init__(self, options: TradingOptions, events: Observable, commands: Observable):
+    def __init__(self, options: TradingOptions, events: Bus, commands: Bus, state: TraderState=None,
+                 scheduler=MAIN_THREAD):
         self._subscription = None
         self._options = options
         self._events = events
         self._commands = commands
+        self._state = state or TraderState()
+        self._scheduler = scheduler
+        self._depth = None
+        self._active_orders = ActiveOrderIndex()
+        self._price_jump_ratio = (None if options is None or options.price_jump_value is None
+                                  else Money.from_number(options.price_jump_value))
 
     def __repr__(self):
         return 'Trader(pair=%s)' % self._options.pair
 
     def _get_time(self):
-        return (self._events
-            .filter(lambda event: isinstance(event, events.TimeEvent))
+        return (self._events.get(events.TimeEvent)
             .map(lambda event: event.value))
 
     def _get_price(self):
-        return (self._events
-            .filter(lambda event: isinstance(event, events.PriceEvent))
-            .filter(lambda event: event.pair == self._options.pair)
+        return (self._events.get(events.PriceEvent, self._options.pair)
             .map(lambda event: event.value))
 
-    def _get_balance(self, event_stream, currency):
-        return (event_stream
-            .filter(lambda event: isinstance(event, events.BalanceEvent))
-            .filter(lambda event: event.currency == currency)
+    def _get_depth(self):
+        return self._events.get(events.DepthEvent, self._options.pair)
+
+    def _get_last_price(self):
+        prices = self._get_price()
+        return prices if self._state.price is None else prices.start_with(self._state.price)
+
+    def _get_balance(self, balance_events):
+        return (balance_events
             .map(lambda event: event.value)
             .scan(lambda p, balance: d(balance=balance, change=(Decimal(0) if p.balance is None else balance - p.balance)),
                   d(balance=None, change=None)))
 
+    def _get_balance_events(self, currency):
+        balance_events = self._events.get(events.BalanceEvent, currency)
+        balance = self._state.balances.get(currency.name)
+        if balance is not None:
+            balance_events = balance_events.start_with(events.BalanceEvent(currency, balance))
+        return balance_events
+
     def _get_first_currency_balance(self):
-        return self._get_balance(self._events, self._options.pair.first)
+        return self._get_balance(self._get_balance_events(self._options.pair.first))
 
     def _get_second_currency_balance(self):
-        return self._get_balance(self._events, self._options.pair.second)
+        return self._get_balance(self._get_balance_events(self._options.pair.second))
 
     def _get_active_orders(self):
-        return (self._events
-            .filter(lambda event: isinstance(event, events.ActiveOrdersEvent))
-            .filter(lambda event: event.pair == self._options.pair)
+        return (self._events.get(events.ActiveOrdersEvent, self._options.pair)
             .map(lambda event: event.orders))
 
-    def _get_completed_orders_singly(self, event_stream, pair):
-        return (event_stream
-            .filter(lambda event: isinstance(event, events.CompletedOrdersEvent))
-            .filter(lambda event: event.pair == pair)
+    def _get_completed_orders(self):
+        return self._get_completed_orders_singly(self._events.get(events.CompletedOrdersEvent, self._options.pair))
+
+    def _get_completed_orders_singly(self, completed_orders_events):
+        return (completed_orders_events
             .map(lambda event: event.orders)
-            .scan(lambda p, orders: d(orders=orders, change=(set() if p.orders is None else set(orders) - set(p.orders))),
-                  d(orders=None, change=None))
-            .map(lambda p: p.change)
             .switch_map(Observable.from_iterable))
 
+    def _get_jump_base_price(self, prices):
+        if self._state.jump_price is not None:
+            prices = prices.start_with(self._state.jump_price)
+        return (prices
+            .scan(lambda prev, price: prev if prev and not is_price_jumped(prev, price, self._price_jump_ratio)
+                                      else price))
+
     def _get_jumping_price(self):
-        return (self._get_price()
-            .scan(lambda prev, price: prev if prev and abs(price - prev) / prev < self._options.price_jump_value
-                                      else price)
+        return (self._get_jump_base_price(self._get_price())
             .distinct_until_changed()
             .skip(1))
 
+    def get_state(self) -> TraderState:
+        return self._state
+
     def init(self):
         logger.info('Starting %s', self)
         self._subscription = CompositeDisposable(
             self._subscribe_for_poll_server_time(),
             self._subscribe_for_poll_price(),
+            self._subscribe_for_poll_depth(),
             self._subscribe_for_poll_balance(),
             self._subscribe_for_poll_active_orders(),
             self._subscribe_for_poll_completed_orders(),
@@ -97,47 +122,47 @@ class Trader:
             self._subscribe_for_balance(),
             self._subscribe_for_active_orders(),
             self._subscribe_for_completed_orders(),
-            self._subscribe_for_jumping_price()
+            self._subscribe_for_jumping_price(),
+            self._subscribe_for_depth(),
+            self._subscribe_for_state()
         )
 
+    def _get_start_period(self, interval):
+        return min(interval, self.STARTUP_SPREAD) if self._state.is_empty() else interval
+
+    def _subscribe_for_poll(self, interval, command):
+        poll_command = commands.PollCommand(command, interval, self._get_start_period(interval))
+        self._commands.on_next(poll_command)
+        return AnonymousDisposable(lambda: self._commands.on_next(commands.CancelPollCommand(poll_command)))
+
     def _subscribe_for_poll_server_time(self):
-        return (Observable
-            .timer(self.POLL_IMMEDIATELY, self.POLL_SERVER_TIME_INTERVAL, MAIN_THREAD)
-            .subscribe(lambda count: self._commands.on_next(commands.GetServerTimeCommand())))
+        return self._subscribe_for_poll(self.POLL_SERVER_TIME_INTERVAL, commands.GetServerTimeCommand())
 
     def _subscribe_for_poll_price(self):
-        return (Observable
-            .timer(self.POLL_IMMEDIATELY, self.POLL_PRICE_INTERVAL, MAIN_THREAD)
-            .subscribe(lambda count: self._commands.on_next(commands.GetPriceCommand(self._options.pair))))
+        return self._subscribe_for_poll(self.POLL_PRICE_INTERVAL, commands.GetPriceCommand(self._options.pair))
+
+    def _subscribe_for_poll_depth(self):
+        return self._subscribe_for_poll(self.POLL_DEPTH_INTERVAL, commands.GetDepthCommand(self._options.pair))
 
     def _subscribe_for_poll_balance(self):
-        return CompositeDisposable(
-            (Observable
-                .timer(self.POLL_IMMEDIATELY, self.POLL_BALANCE_INTERVAL, MAIN_THREAD)
-                .subscribe(lambda count: self._commands.on_next(commands.GetBalanceCommand(self._options.pair.first)))),
-            (Observable
-                .timer(self.POLL_IMMEDIATELY, self.POLL_BALANCE_INTERVAL, MAIN_THREAD)
-                .subscribe(lambda count: self._commands.on_next(commands.GetBalanceCommand(self._options.pair.second))))
-        )
+        return self._subscribe_for_poll(self.POLL_BALANCE_INTERVAL, commands.GetBalanceCommand())
 
     def _subscribe_for_poll_active_orders(self):
-        return (Observable
-            .timer(self.POLL_IMMEDIATELY, self.POLL_ACTIVE_ORDERS_INTERVAL, MAIN_THREAD)
-            .subscribe(lambda count: self._commands.on_next(commands.GetActiveOrdersCommand(self._options.pair))))
+        return self._subscribe_for_poll(self.POLL_ACTIVE_ORDERS_INTERVAL,
+                                        commands.GetActiveOrdersCommand(self._options.pair))
 
     def _subscribe_for_poll_completed_orders(self):
-        return (Observable
-            .timer(self.POLL_IMMEDIATELY, self.POLL_COMPLETED_ORDERS_INTERVAL, MAIN_THREAD)
-            .subscribe(lambda count: self._commands.on_next(commands.GetCompletedOrdersCommand(self._options.pair))))
+        return self._subscribe_for_poll(self.POLL_COMPLETED_ORDERS_INTERVAL,
+                                        commands.GetCompletedOrdersCommand(self._options.pair))
 
     def _subscribe_for_time_and_price(self):
         return (Observable
             .combine_latest(
                 self._get_time(),
-                self._get_price(),
+                self._get_last_price(),
                 d('time', 'price')
             )
-            .throttle_first(self.SHOW_TIME_AND_PRICE_INTERVAL, MAIN_THREAD)
+            .throttle_first(self.SHOW_TIME_AND_PRICE_INTERVAL, self._scheduler)
             .subscribe(lambda p: logger.info('[%s] Time now is %s, price is %s', self._options.pair, p.time, p.price)))
 
     def _subscribe_for_balance(self):
@@ -158,9 +183,10 @@ class Trader:
                 .subscribe(lambda orders: logger.info('[%s] Active orders: %s', self._options.pair, ', '.join(map(repr, orders))) if orders
                                           else logger.info('[%s] No active orders found', self._options.pair))),
             (self._get_active_orders()
-                .switch_map(Observable.from_iterable)
-                .filter(lambda order: datetime.utcnow() - order.created > config.ORDER_OUTDATE_PERIOD)
-                .subscribe(self._cancel_order))
+                .subscribe(lambda orders: setattr(self, '_active_orders', ActiveOrderIndex(orders)))),
+            (self._get_time()
+                .throttle_first(self.CHECK_OUTDATED_ORDERS_INTERVAL, self._scheduler)
+                .subscribe(self._cancel_outdated_orders))
         )
 
     def _get_new_orders(self, completed_orders, min_amount):
@@ -169,10 +195,10 @@ class Trader:
             .map(d('order_type', 'amount', 'price'))
             .filter(lambda p: p.amount >= min_amount))
 
-    def _get_new_sell_orders(self, event_stream, pair, min_amount):
+    def _get_new_sell_orders(self, completed_orders, min_amount):
         return (Observable
             .combine_latest(
-                (self._get_new_orders(self._get_completed_orders_singly(event_stream, pair), min_amount)
+                (self._get_new_orders(completed_orders, min_amount)
                     .filter(lambda p: p.order_type == Order.TYPE_SELL)),
                 self._get_first_currency_balance().map(lambda p: p.balance),
                 d('amount', 'price', 'balance')
@@ -180,10 +206,10 @@ class Trader:
             .distinct_until_changed(lambda p: (p.amount, p.price))
             .filter(lambda p: p.amount <= p.balance))
 
-    def _get_new_buy_orders(self, event_stream, pair, min_amount):
+    def _get_new_buy_orders(self, completed_orders, min_amount):
         return (Observable
             .combine_latest(
-                (self._get_new_orders(self._get_completed_orders_singly(event_stream, pair), min_amount)
+                (self._get_new_orders(completed_orders, min_amount)
                     .filter(lambda p: p.order_type == Order.TYPE_BUY)),
                 self._get_second_currency_balance().map(lambda p: p.balance),
                 d('amount', 'price', 'balance')
@@ -193,11 +219,11 @@ class Trader:
 
     def _subscribe_for_completed_orders(self):
         return CompositeDisposable(
-            (self._get_completed_orders_singly(self._events, self._options.pair)
+            (self._get_completed_orders()
                 .subscribe(lambda order: logger.info('[%s] %s completed', self._options.pair, order))),
-            (self._get_new_sell_orders(self._events, self._options.pair, self._options.min_amount)
+            (self._get_new_sell_orders(self._get_completed_orders(), self._options.min_amount)
                 .subscribe(lambda p: self._create_sell_order(p.amount, p.price, self.REASON_ORDER_COMPLETED))),
-            (self._get_new_buy_orders(self._events, self._options.pair, self._options.min_amount)
+            (self._get_new_buy_orders(self._get_completed_orders(), self._options.min_amount)
                 .subscribe(lambda p: self._create_buy_order(p.amount, p.price, self.REASON_ORDER_COMPLETED)))
         )
 
@@ -223,6 +249,20 @@ class Trader:
                 .subscribe(lambda p: self._create_buy_order(self._options.deal_amount, p.price, self.REASON_PRICE_JUMP))),
         )
 
+    def _subscribe_for_depth(self):
+        return self._get_depth().subscribe(lambda event: setattr(self, '_depth', event))
+
+    def _subscribe_for_state(self):
+        return CompositeDisposable(
+            self._get_price().subscribe(lambda price: setattr(self._state, 'price', price)),
+            (self._get_jump_base_price(self._get_price())
+                .subscribe(lambda price: setattr(self._state, 'jump_price', price))),
+            (self._get_first_currency_balance()
+                .subscribe(lambda p: self._state.balances.update({self._options.pair.first.name: p.balance}))),
+            (self._get_second_currency_balance()
+                .subscribe(lambda p: self._state.balances.update({self._options.pair.second.name: p.balance})))
+        )
+
     def _get_type_and_amount_and_price_for_new_order(self, order):
         if order.type == Order.TYPE_SELL:
             return Order.TYPE_BUY, order.amount, self._get_new_price(Order.TYPE_BUY, order.price)
@@ -232,26 +272,54 @@ class Trader:
 
     def _get_new_price(self, order_type, price):
         margin = self._options.margin + self._get_random_margin_jitter(self._options.margin_jitter)
+        places = self._options.pair.second.places
         if order_type == Order.TYPE_SELL:
-            return normalize_value(price + price * margin, self._options.pair.second.places)
+            return self._get_price_outside_spread(order_type, add_margin(price, margin, places))
         if order_type == Order.TYPE_BUY:
-            return normalize_value(price - price * margin, self._options.pair.second.places)
+            return self._get_price_outside_spread(order_type, add_margin(price, -margin, places))
         raise Exception('unknown order type %s' % order_type)
 
+    def _get_price_outside_spread(self, order_type, price):
+        if self._depth is None:
+            return price
+        tick = Money(1, self._options.pair.second.places)
+        if order_type == Order.TYPE_SELL and self._depth.bid is not None and price <= self._depth.bid:
+            return self._depth.bid + tick
+        if order_type == Order.TYPE_BUY and self._depth.ask is not None and price >= self._depth.ask:
+            return self._depth.ask - tick
+        return price
+
+    def _is_duplicate_order(self, order_type, amount, price):
+        order = self._active_orders.find(order_type, price)
+        if order is None:
+            return False
+        logger.info('[%s] Skip %s order: %s for %s, same as active %s', self._options.pair,
+                    'sell' if order_type == Order.TYPE_SELL else 'buy', amount, price, order)
+        return True
+
     def _create_sell_order(self, amount, price, reason):
+        if self._is_duplicate_order(Order.TYPE_SELL, amount, price):
+            return
         logger.info('[%s] Create sell order: %s for %s, reason is %s', self._options.pair, amount, price, reason)
         self._commands.on_next(commands.CreateSellOrderCommand(self._options.pair, amount, price))
 
     def _create_buy_order(self, amount, price, reason):
+        if self._is_duplicate_order(Order.TYPE_BUY, amount, price):
+            return
         logger.info('[%s] Create buy order: %s for %s, reason is %s', self._options.pair, amount, price, reason)
         self._commands.on_next(commands.CreateBuyOrderCommand(self._options.pair, amount, price))
 
     def _get_random_margin_jitter(self, jitter):
         return normalize_value(Decimal(uniform(-float(jitter), float(jitter))), 4)
 
-    def _cancel_order(self, order):
+    def _cancel_outdated_orders(self, time):
+        for order in self._active_orders.get_outdated(time - config.ORDER_OUTDATE_PERIOD):
+            self._active_orders.remove(order.id)
+            self._cancel_order(order, time)
+
+    def _cancel_order(self, order, time):
         logger.info('[%s] Cancel outdated order %s created %s (%s ago)', self._options.pair, order, order.created,
-                    datetime.utcnow() - order.created)
+                    time - order.created)
         self._commands.on_next(commands.CancelOrderCommand(order.id))
 
     def deinit(self):
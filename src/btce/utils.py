@@ -1,10 +1,15 @@
 from collections import namedtuple
 
+_data_classes = {}
+
 
 def get_data_packed(*spec, **kwargs):
     if not spec:
-        return _get_data_class(**kwargs)(is_packed=True, **kwargs)
+        return _pack(kwargs)
+    data_class = _get_data_class(spec)
     def _wrapper(*args):
+        if len(args) == len(spec) and not any(isinstance(arg, tuple) for arg in args):
+            return data_class(True, **dict(zip(spec, args)))
         names = list(spec)
         params = list(args)
         kwargs = {}
@@ -24,10 +29,17 @@ def get_data_packed(*spec, **kwargs):
                 params.insert(0, arg[1:])
             else:
                 kwargs[name] = arg
-        return get_data_packed(**kwargs)
+        return _pack(kwargs)
     return _wrapper
 
 
-def _get_data_class(**kwargs):
-    properties = ('is_packed',) + tuple(sorted(kwargs.keys()))
-    return namedtuple('Data', properties)
+def _pack(kwargs):
+    return _get_data_class(kwargs)(True, **kwargs)
+
+
+def _get_data_class(names):
+    key = frozenset(names)
+    data_class = _data_classes.get(key)
+    if data_class is None:
+        data_class = _data_classes[key] = namedtuple('Data', ('is_packed',) + tuple(sorted(key)))
+    return data_class
@@ -0,0 +1,38 @@
+from argparse import ArgumentParser
+from decimal import Decimal
+
+from btce import config
+from btce.backtest import load_ticks_from_csv, load_ticks_from_storage, parse_balances
+from btce.common import get_logger
+from btce.models import CURRENCY_USD
+from btce.storage import get_backend
+from btce.sweep import format_results, get_grid, get_price_arrays, run_sweep
+
+
+logger = get_logger(__name__)
+
+
+def _get_values(value):
+    return [Decimal(item) for item in value.split(',')]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Replay recorded prices over a grid of trading options')
+    parser.add_argument('--csv', help='CSV file with "time,pair,price" rows, recorded prices are used by default')
+    parser.add_argument('--balance', action='append', help='initial balance, e.g. BTC=0.5 (default USD=1000)')
+    parser.add_argument('--margins', type=_get_values, default='0.01,0.02,0.05,0.1', help='comma separated margins')
+    parser.add_argument('--jitters', type=_get_values, default='0,0.005,0.01', help='comma separated margin jitters')
+    parser.add_argument('--jumps', type=_get_values, default='0.01,0.02,0.05', help='comma separated price jumps')
+    parser.add_argument('--workers', type=int, help='worker process count, CPU count by default')
+    args = parser.parse_args()
+    pair_names = [str(options.pair) for options in config.TRADING]
+    if args.csv:
+        ticks = load_ticks_from_csv(args.csv)
+    else:
+        backend = get_backend()
+        backend.init()
+        ticks = load_ticks_from_storage(backend, pair_names)
+    balances = parse_balances(args.balance or ['USD=1000'])
+    results = run_sweep(config.TRADING, get_price_arrays(ticks, pair_names), balances, CURRENCY_USD,
+                        get_grid(args.margins, args.jitters, args.jumps), workers=args.workers)
+    logger.info('Sweep results:\n%s', format_results(results))
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import TestCase
+
+from rx.concurrency import HistoricalScheduler
+
+from btce import commands, events
+from btce.backtest import Backtest, SimulatedExchange, parse_balances
+from btce.bus import Bus
+from btce.models import CurrencyPair, Order, TradingOptions, CURRENCY_BTC, CURRENCY_USD
+
+
+class SimulatedExchangeTest(TestCase):
+
+    def setUp(self):
+        self._pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        self._events = Bus()
+        self._commands = Bus()
+        self._exchange = SimulatedExchange(self._events, self._commands, HistoricalScheduler(datetime(2017, 1, 1)),
+                                           {CURRENCY_BTC: Decimal(1), CURRENCY_USD: Decimal(100)}, Decimal(0))
+        self._exchange.init()
+        self._exchange.set_price(self._pair, Decimal(100))
+
+    def tearDown(self):
+        self._exchange.deinit()
+
+    def _get_completed_orders(self):
+        orders = []
+        self._events.get(events.CompletedOrdersEvent, self._pair).subscribe(lambda event: orders.extend(event.orders))
+        self._commands.on_next(commands.GetCompletedOrdersCommand(self._pair))
+        return orders
+
+    def test_create_order(self):
+        self._commands.on_next(commands.CreateSellOrderCommand(self._pair, Decimal('0.5'), Decimal(110)))
+        self._exchange.set_price(self._pair, Decimal(105))
+        self.assertEqual(self._get_completed_orders(), [])
+        self._exchange.set_price(self._pair, Decimal(110))
+        self.assertEqual([(order.type, order.amount) for order in self._get_completed_orders()],
+                         [(Order.TYPE_SELL, Decimal('0.5'))])
+        self.assertEqual(self._exchange.get_value(CURRENCY_USD), Decimal(210))
+
+    def test_create_order_if_not_enough_balance(self):
+        self._commands.on_next(commands.CreateBuyOrderCommand(self._pair, Decimal(2), Decimal(90)))
+        self._exchange.set_price(self._pair, Decimal(80))
+        self.assertEqual(self._get_completed_orders(), [])
+
+    def test_cancel_order(self):
+        self._commands.on_next(commands.CreateBuyOrderCommand(self._pair, Decimal(1), Decimal(90)))
+        self._commands.on_next(commands.CancelOrderCommand(1))
+        self._exchange.set_price(self._pair, Decimal(80))
+        self.assertEqual(self._get_completed_orders(), [])
+
+
+class BacktestTest(TestCase):
+
+    def test_run(self):
+        pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        options = TradingOptions(pair, Decimal('0.01'), Decimal(0), Decimal('0.01'), Decimal('0.1'), Decimal('0.05'))
+        started = datetime(2017, 1, 1)
+        prices = [100] * 10 + [110] * 10 + [95] * 10 + [120] * 10
+        ticks = [(started + timedelta(seconds=10 * i), str(pair), Decimal(price)) for i, price in enumerate(prices)]
+        report = Backtest([options], {CURRENCY_BTC: Decimal(1), CURRENCY_USD: Decimal(1000)}, CURRENCY_USD).run(ticks)
+        self.assertEqual(report.tick_count, len(prices))
+        self.assertGreater(report.fill_count, 0)
+        self.assertEqual(report.initial_value, Decimal(1100))
+
+
+class ParseBalancesTest(TestCase):
+
+    def test_parse_balances(self):
+        self.assertEqual(parse_balances(['USD=1000', 'btc=0.5']), {CURRENCY_USD: Decimal(1000), CURRENCY_BTC: Decimal('0.5')})
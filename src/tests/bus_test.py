@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from btce import commands, events
+from btce.bus import Bus
+
+
+class BusTest(TestCase):
+
+    def _get_messages(self, bus, message_class, key=None):
+        messages = []
+        bus.get(message_class, key).subscribe(messages.append)
+        return messages
+
+    def test_get(self):
+        bus = Bus()
+        messages = self._get_messages(bus, events.TimeEvent)
+        event = events.TimeEvent('value')
+        bus.on_next(event)
+        bus.on_next(events.PriceEvent('pair', 'value'))
+        self.assertEqual(messages, [event])
+
+    def test_get_if_key(self):
+        bus = Bus()
+        messages = self._get_messages(bus, events.PriceEvent, 'pair')
+        event = events.PriceEvent('pair', 'value')
+        bus.on_next(event)
+        bus.on_next(events.PriceEvent('other pair', 'value'))
+        bus.on_next(events.ActiveOrdersEvent('pair', ()))
+        self.assertEqual(messages, [event])
+
+    def test_get_if_currency_key(self):
+        bus = Bus()
+        messages = self._get_messages(bus, events.BalanceEvent, 'currency')
+        event = events.BalanceEvent('currency', 'value')
+        bus.on_next(event)
+        bus.on_next(events.BalanceEvent('other currency', 'value'))
+        self.assertEqual(messages, [event])
+
+    def test_get_if_no_key(self):
+        bus = Bus()
+        messages = self._get_messages(bus, commands.GetPriceCommand)
+        command1 = commands.GetPriceCommand('pair')
+        command2 = commands.GetPriceCommand('other pair')
+        bus.on_next(command1)
+        bus.on_next(command2)
+        self.assertEqual(messages, [command1, command2])
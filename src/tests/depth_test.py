@@ -0,0 +1,53 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from btce.depth import OrderBook
+from tests.utils import dataprovider, use_dataproviders
+
+
+def _levels(*levels):
+    return [[Decimal(price), Decimal(amount)] for price, amount in levels]
+
+
+@use_dataproviders
+class OrderBookTest(TestCase):
+
+    def setUp(self):
+        self._book = OrderBook()
+        self._book.update(_levels((99, 1), (98, 2), (97, 3)), _levels((101, 1), (102, 2), (103, 3)))
+
+    def test_update(self):
+        self.assertEqual(self._book.bids.best, 99)
+        self.assertEqual(self._book.asks.best, 101)
+        self.assertEqual(self._book.bids.depth, 6)
+        self.assertEqual(self._book.asks.depth, 6)
+
+    @staticmethod
+    def provider_update_changes():
+        return (
+            (_levels((99, 1), (98, 2), (97, 3)), _levels((101, 1), (102, 2), (103, 3)), 0, 99, 101, 6, 6),
+            (_levels((99, 1), (98, 5), (97, 3)), _levels((101, 1), (102, 2), (103, 3)), 1, 99, 101, 9, 6),
+            (_levels((98, 2), (97, 3)), _levels((100, 4), (101, 1), (102, 2), (103, 3)), 2, 98, 100, 5, 10),
+            ((), (), 6, None, None, 0, 0),
+        )
+
+    @dataprovider('provider_update_changes')
+    def test_update_changes(self, bids, asks, changes, bid, ask, bid_depth, ask_depth):
+        self.assertEqual(self._book.update(bids, asks), changes)
+        self.assertEqual(self._book.bids.best, bid)
+        self.assertEqual(self._book.asks.best, ask)
+        self.assertEqual(self._book.bids.depth, bid_depth)
+        self.assertEqual(self._book.asks.depth, ask_depth)
+
+    @staticmethod
+    def provider_get_depth():
+        return (
+            (98, 102, 3, 3),
+            (97, 103, 6, 6),
+            (100, 100, 0, 0),
+        )
+
+    @dataprovider('provider_get_depth')
+    def test_get_depth(self, bid, ask, bid_depth, ask_depth):
+        self.assertEqual(self._book.bids.get_depth(Decimal(bid)), bid_depth)
+        self.assertEqual(self._book.asks.get_depth(Decimal(ask)), ask_depth)
@@ -0,0 +1,157 @@
+from argparse import ArgumentParser
+from collections import defaultdict, deque
+from decimal import Decimal
+from itertools import cycle
+import logging
+import os.path
+from tempfile import TemporaryDirectory
+
+from tornado.gen import coroutine, sleep
+from tornado.ioloop import IOLoop
+
+from btce import config, commands, events
+from btce.bus import Bus
+from btce.exchange import ExchangeConnector
+from btce.models import Currency, CurrencyPair, CURRENCY_USD
+from btce.stub import StubExchange
+
+PAIR_COUNTS = (1, 2, 5, 10, 20, 50)
+START_RATE = 10
+MAX_RATE = 10000
+DURATION = 2
+TICK = 0.001
+DRAIN_TIMEOUT = 2
+MAX_LOST_SHARE = 0.01
+MAX_P99_LATENCY = 1
+
+_ANSWERS = (
+    (commands.GetPriceCommand, events.PriceEvent),
+    (commands.GetActiveOrdersCommand, events.ActiveOrdersEvent),
+    (commands.GetCompletedOrdersCommand, events.CompletedOrdersEvent),
+)
+
+
+def _get_pairs(count):
+    return [CurrencyPair(Currency('C%s' % number, 5), CURRENCY_USD) for number in range(count)]
+
+
+def _get_percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else None
+
+
+class _LatencyRecorder:
+
+    def __init__(self, commands_bus, events_bus):
+        self._commands = commands_bus
+        self._sent = defaultdict(deque)
+        self.latencies = []
+        self.sent_count = 0
+        for command_class, event_class in _ANSWERS:
+            events_bus.get(event_class).subscribe(lambda event, command_class=command_class:
+                                                  self._on_event(command_class, event.pair))
+
+    def send(self, command):
+        self.sent_count += 1
+        self._sent[(type(command), command.pair)].append(IOLoop.current().time())
+        self._commands.on_next(command)
+
+    def _on_event(self, command_class, pair):
+        sent = self._sent[(command_class, pair)]
+        now = IOLoop.current().time()
+        while sent:
+            self.latencies.append(now - sent.popleft())
+
+    def get_lost_count(self):
+        return sum(len(sent) for sent in self._sent.values())
+
+
+class _Run:
+
+    def __init__(self, pair_count, latency, error_rate):
+        self._pairs = _get_pairs(pair_count)
+        self._exchange = StubExchange(dict((self._get_pair_name(pair), Decimal(100)) for pair in self._pairs),
+                                      {'usd': Decimal(1000)}, latency, error_rate)
+        config.EXCHANGE_SITE = 'http://127.0.0.1:%s' % self._exchange.listen()
+        self._events = Bus()
+        self._commands = Bus()
+        self._connector = ExchangeConnector(self._events, self._commands)
+        self._connector.init()
+
+    def _get_pair_name(self, pair):
+        return '%s_%s' % (pair.first.name.lower(), pair.second.name.lower())
+
+    @coroutine
+    def run(self, rate):
+        recorder = _LatencyRecorder(self._commands, self._events)
+        messages = cycle([command_class(pair) for pair in self._pairs for command_class, _ in _ANSWERS])
+        started = IOLoop.current().time()
+        while IOLoop.current().time() - started < DURATION:
+            while recorder.sent_count < rate * (IOLoop.current().time() - started):
+                recorder.send(next(messages))
+            yield sleep(TICK)
+        drain_started = IOLoop.current().time()
+        while recorder.get_lost_count() and IOLoop.current().time() - drain_started < DRAIN_TIMEOUT:
+            yield sleep(0.01)
+        return recorder
+
+    def stop(self):
+        self._connector.deinit()
+        self._exchange.stop()
+
+
+@coroutine
+def _run_latency(pair_count, latency, error_rate):
+    run = _Run(pair_count, latency, error_rate)
+    recorder = yield run.run(START_RATE)
+    run.stop()
+    return recorder
+
+
+@coroutine
+def _run_throughput(pair_count, latency, error_rate):
+    rate = START_RATE
+    sustainable_rate = None
+    while rate <= MAX_RATE:
+        run = _Run(pair_count, latency, error_rate)
+        recorder = yield run.run(rate)
+        run.stop()
+        p99 = _get_percentile(recorder.latencies, 0.99)
+        if recorder.get_lost_count() > recorder.sent_count * MAX_LOST_SHARE or p99 is None or p99 > MAX_P99_LATENCY:
+            break
+        sustainable_rate = rate
+        rate *= 2
+    return sustainable_rate
+
+
+@coroutine
+def _run(latency, error_rate):
+    print('%6s %10s %10s %10s %8s %14s' % ('pairs', 'p50, ms', 'p90, ms', 'p99, ms', 'lost', 'max commands/s'))
+    for pair_count in PAIR_COUNTS:
+        recorder = yield _run_latency(pair_count, latency, error_rate)
+        rate = yield _run_throughput(pair_count, latency, error_rate)
+        print('%6s %10.1f %10.1f %10.1f %8s %14s' % (pair_count, *(_get_percentile(recorder.latencies, share) * 1000
+                                                                  for share in (0.5, 0.9, 0.99)),
+                                                    recorder.get_lost_count(), rate))
+
+
+def run():
+    parser = ArgumentParser(description='Measure command to event latency against a local exchange stand-in')
+    parser.add_argument('--latency', type=float, default=0.005, help='exchange response latency, seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of failed exchange responses')
+    parser.add_argument('--keys', type=int, default=1, help='API keys to spread trade API requests over')
+    parser.add_argument('--rate-limit', action='store_true', help='apply the configured API rate limits')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    if not args.rate_limit:
+        config.API_PUBLIC_RATE = config.API_PRIVATE_RATE = None
+    with TemporaryDirectory() as directory:
+        config.DATA_DIR = directory
+        config.API_CREDENTIALS = [('key%s' % number, 'secret') for number in range(args.keys)]
+        with open(os.path.join(directory, 'nonce'), 'w') as store:
+            store.write('0')
+        IOLoop.current().run_sync(lambda: _run(args.latency, args.error_rate))
+
+
+if __name__ == '__main__':
+    run()
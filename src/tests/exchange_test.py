@@ -0,0 +1,189 @@
+import os.path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from tornado.concurrent import Future
+from tornado.gen import coroutine, moment, sleep
+from tornado.ioloop import IOLoop
+
+from btce import config
+from btce.exchange import _get_nonce_file, _NonceKeeper, _RequestScheduler, _TradeApiRouter
+from btce.ratelimit import TokenBucket
+
+
+class NonceKeeperTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self._store_file = os.path.join(self._directory.name, 'nonce')
+        with open(self._store_file, 'w') as store:
+            store.write('10')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _get_stored_nonce(self):
+        with open(self._store_file, 'r') as store:
+            return int(store.read())
+
+    def test_get(self):
+        keeper = _NonceKeeper(self._store_file)
+        self.assertEqual([keeper.get() for _ in range(3)], [11, 12, 13])
+
+    def test_get_reserves_block(self):
+        keeper = _NonceKeeper(self._store_file)
+        keeper.get()
+        self.assertEqual(self._get_stored_nonce(), 10 + _NonceKeeper.RESERVE_SIZE)
+
+    def test_get_reserves_next_block_when_exhausted(self):
+        keeper = _NonceKeeper(self._store_file)
+        for _ in range(_NonceKeeper.RESERVE_SIZE + 1):
+            nonce = keeper.get()
+        self.assertEqual(nonce, 11 + _NonceKeeper.RESERVE_SIZE)
+        self.assertEqual(self._get_stored_nonce(), 10 + 2 * _NonceKeeper.RESERVE_SIZE)
+
+    def test_get_after_restart(self):
+        _NonceKeeper(self._store_file).get()
+        keeper = _NonceKeeper(self._store_file)
+        self.assertEqual(keeper.get(), 11 + _NonceKeeper.RESERVE_SIZE)
+
+    def test_get_if_store_file_is_missing(self):
+        keeper = _NonceKeeper(os.path.join(self._directory.name, 'nonce-missing'))
+        self.assertEqual(keeper.get(), 1)
+
+    def test_resync(self):
+        keeper = _NonceKeeper(self._store_file)
+        keeper.get()
+        keeper.resync(50)
+        self.assertEqual(keeper.get(), 50)
+        self.assertEqual(self._get_stored_nonce(), 49 + _NonceKeeper.RESERVE_SIZE)
+        _NonceKeeper(self._store_file).get()
+        keeper.resync(5)
+        self.assertEqual(keeper.get(), 51)
+
+
+class RequestSchedulerTest(TestCase):
+
+    def setUp(self):
+        self._io_loop = IOLoop()
+        self._io_loop.make_current()
+        self._requests = []
+        self._responses = []
+
+    def tearDown(self):
+        self._io_loop.clear_current()
+        self._io_loop.close()
+
+    def _handle_request(self, method, params):
+        self._requests.append(method)
+        future = Future()
+        self._responses.append(future)
+        return future
+
+    def _run(self, func):
+        return self._io_loop.run_sync(coroutine(func))
+
+    def test_put_if_order_request_is_waiting(self):
+        scheduler = _RequestScheduler(self._handle_request)
+        def run():
+            scheduler.put('getInfo')
+            scheduler.put('TradeHistory')
+            scheduler.put('Trade', None, _RequestScheduler.PRIORITY_ORDER)
+            for _ in range(3):
+                self._responses[-1].set_result(None)
+                yield moment
+        self._run(run)
+        self.assertEqual(self._requests, ['getInfo', 'Trade', 'TradeHistory'])
+
+    def test_put_if_same_read_request_is_pending(self):
+        scheduler = _RequestScheduler(self._handle_request)
+        def run():
+            scheduler.put('getInfo')
+            first = scheduler.put('ActiveOrders', {'pair': 'btc_usd'})
+            second = scheduler.put('ActiveOrders', {'pair': 'btc_usd'})
+            self.assertIs(first, second)
+            for _ in range(2):
+                self._responses[-1].set_result(None)
+                yield moment
+        self._run(run)
+        self.assertEqual(self._requests, ['getInfo', 'ActiveOrders'])
+
+    def test_put_if_deadline_exceeded(self):
+        scheduler = _RequestScheduler(self._handle_request)
+        def run():
+            scheduler.put('getInfo')
+            future = scheduler.put('TradeHistory', None, _RequestScheduler.PRIORITY_READ, -1)
+            self._responses[-1].set_result(None)
+            yield moment
+            self.assertRaises(Exception, future.result)
+        self._run(run)
+        self.assertEqual(self._requests, ['getInfo'])
+
+    def test_put_if_request_failed(self):
+        scheduler = _RequestScheduler(self._handle_request)
+        scheduler.RETRY_BASE_DELAY = 0.01
+        def run():
+            future = scheduler.put('getInfo')
+            self._responses[-1].set_exception(Exception())
+            yield sleep(scheduler.RETRY_BASE_DELAY)
+            self._responses[-1].set_result('result')
+            self.assertEqual((yield future), 'result')
+        self._run(run)
+        self.assertEqual(self._requests, ['getInfo', 'getInfo'])
+
+    def test_put_if_rate_limited(self):
+        scheduler = _RequestScheduler(self._handle_request, bucket=TokenBucket(100, 2, 1, self._io_loop.time))
+        def run():
+            scheduler.put('getInfo')
+            scheduler.put('TradeHistory')
+            self._responses[-1].set_result(None)
+            yield moment
+            scheduler.put('Trade', None, _RequestScheduler.PRIORITY_ORDER)
+            yield moment
+            self.assertEqual(self._requests, ['getInfo', 'Trade'])
+            self._responses[-1].set_result(None)
+            yield sleep(0.03)
+            self.assertEqual(self._requests, ['getInfo', 'Trade', 'TradeHistory'])
+            self._responses[-1].set_result(None)
+        self._run(run)
+
+
+class _Connector:
+
+    def __init__(self, load):
+        self.load = load
+
+    def get_load(self):
+        return self.load
+
+
+class TradeApiRouterTest(TestCase):
+
+    def test_get_pinned(self):
+        connectors = [_Connector(0), _Connector(0)]
+        router = _TradeApiRouter(connectors)
+        self.assertEqual([router._get_pinned(pair) for pair in ('btc_usd', 'ltc_usd', 'eth_usd', 'btc_usd')],
+                         [connectors[0], connectors[1], connectors[0], connectors[0]])
+
+    def test_from_credentials_migrates_legacy_nonce_file(self):
+        with TemporaryDirectory() as directory, patch.object(config, 'DATA_DIR', directory):
+            with open(os.path.join(directory, 'nonce'), 'w') as store:
+                store.write('10')
+            _TradeApiRouter.from_credentials('http://127.0.0.1', [('key', 'secret')])
+            self.assertEqual(os.listdir(directory), [os.path.basename(_get_nonce_file('key'))])
+            self.assertEqual(_NonceKeeper(_get_nonce_file('key')).get(), 11)
+
+    def test_from_credentials_keeps_legacy_nonce_file_for_many_keys(self):
+        with TemporaryDirectory() as directory, patch.object(config, 'DATA_DIR', directory):
+            with open(os.path.join(directory, 'nonce'), 'w') as store:
+                store.write('10')
+            _TradeApiRouter.from_credentials('http://127.0.0.1', [('key0', 'secret'), ('key1', 'secret')])
+            self.assertEqual(os.listdir(directory), ['nonce'])
+
+    def test_get_least_loaded(self):
+        connectors = [_Connector(2), _Connector(1), _Connector(3)]
+        router = _TradeApiRouter(connectors)
+        self.assertIs(router._get_least_loaded(), connectors[1])
+        connectors[0].load = 0
+        self.assertIs(router._get_least_loaded(), connectors[0])
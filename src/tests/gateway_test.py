@@ -0,0 +1,101 @@
+import os.path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from tornado.gen import coroutine, sleep
+from tornado.ioloop import IOLoop
+
+from btce import commands, events
+from btce.bus import Bus
+from btce.gateway import Gateway, GatewayClient, WorkerPool
+from btce.models import CurrencyPair, CURRENCY_BTC, CURRENCY_LTC, CURRENCY_USD
+from btce.money import Money
+
+IPC_DELAY = 0.05
+
+
+def _exit_worker(path, number, pair_names):
+    pass
+
+
+class GatewayTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, 'gateway.sock')
+        self._io_loop = IOLoop()
+        self._io_loop.make_current()
+        self._pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        self._other_pair = CurrencyPair(CURRENCY_LTC, CURRENCY_USD)
+        self._events = Bus()
+        self._commands = Bus()
+        self._gateway = Gateway(self._path, self._events, self._commands, [self._pair, self._other_pair])
+        self._gateway.init()
+        self._worker_events = Bus()
+        self._worker_commands = Bus()
+        self._client = GatewayClient(self._path, [self._pair], self._worker_events, self._worker_commands)
+
+    def tearDown(self):
+        self._client.deinit()
+        self._gateway.deinit()
+        self._io_loop.clear_current()
+        self._io_loop.close(all_fds=True)
+        self._directory.cleanup()
+
+    def _run(self, func):
+        return self._io_loop.run_sync(coroutine(func))
+
+    def test_send_command(self):
+        received = []
+        self._commands.get(commands.GetPriceCommand, self._pair).subscribe(received.append)
+        def run():
+            yield self._client.init()
+            self._worker_commands.on_next(commands.GetPriceCommand(CurrencyPair(CURRENCY_BTC, CURRENCY_USD)))
+            yield sleep(IPC_DELAY)
+        self._run(run)
+        self.assertEqual(len(received), 1)
+
+    def test_send_event(self):
+        received = []
+        self._worker_events.get(events.PriceEvent).subscribe(lambda event: received.append((str(event.pair),
+                                                                                            event.value)))
+        self._worker_events.get(events.BalanceEvent, CURRENCY_USD).subscribe(lambda event: received.append(
+            event.value))
+        def run():
+            yield self._client.init()
+            yield sleep(IPC_DELAY)
+            self._events.on_next(events.PriceEvent(self._pair, Money(100, 0)))
+            self._events.on_next(events.PriceEvent(self._other_pair, Money(200, 0)))
+            self._events.on_next(events.BalanceEvent(CURRENCY_USD, Money(300, 0)))
+            yield sleep(IPC_DELAY)
+        self._run(run)
+        self.assertEqual(received, [('BTC/USD', 100), 300])
+
+    def test_disconnect_cancels_polls(self):
+        polls = []
+        self._commands.get(commands.PollCommand).subscribe(polls.append)
+        self._commands.get(commands.CancelPollCommand).subscribe(lambda command: polls.remove(command.poll_command))
+        def run():
+            yield self._client.init()
+            poll_command = commands.PollCommand(commands.GetBalanceCommand(), 1000, 1000)
+            self._worker_commands.on_next(poll_command)
+            self._worker_commands.on_next(commands.PollCommand(commands.GetPriceCommand(self._pair), 1000, 1000))
+            self._worker_commands.on_next(commands.CancelPollCommand(poll_command))
+            yield sleep(IPC_DELAY)
+            self.assertEqual(len(polls), 1)
+            self._client.deinit()
+            yield sleep(IPC_DELAY)
+        self._run(run)
+        self.assertEqual(polls, [])
+
+
+class WorkerPoolTest(TestCase):
+
+    def test_restart_stopped(self):
+        pool = WorkerPool('path', [['BTC/USD']], _exit_worker)
+        pool._start(0)
+        pool._processes[0].join()
+        pid = pool.get_pids()[0]
+        pool._restart_stopped()
+        self.assertNotEqual(pool.get_pids()[0], pid)
+        pool.deinit()
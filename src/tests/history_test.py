@@ -0,0 +1,47 @@
+import os.path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from btce.history import CompletedTradeTracker
+
+
+def _get_trades(*trade_ids):
+    return [(trade_id, 'trade') for trade_id in trade_ids]
+
+
+class CompletedTradeTrackerTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self._store_file = os.path.join(self._directory.name, 'trades')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_add_if_not_started(self):
+        tracker = CompletedTradeTracker(self._store_file)
+        self.assertEqual(tracker.add('pair', _get_trades(2, 1)), [])
+        self.assertEqual(tracker.get_cursor('pair'), 2)
+
+    def test_add_if_started_without_trades(self):
+        tracker = CompletedTradeTracker(self._store_file)
+        self.assertEqual(tracker.add('pair', []), [])
+        self.assertEqual(tracker.get_cursor('pair'), 0)
+        self.assertEqual(tracker.add('pair', _get_trades(1)), _get_trades(1))
+
+    def test_add(self):
+        tracker = CompletedTradeTracker(self._store_file)
+        tracker.add('pair', _get_trades(1))
+        self.assertEqual(tracker.add('pair', _get_trades(1, 2, 3)), _get_trades(2, 3))
+        self.assertEqual(tracker.get_cursor('pair'), 3)
+
+    def test_add_if_restarted(self):
+        CompletedTradeTracker(self._store_file).add('pair', _get_trades(1))
+        tracker = CompletedTradeTracker(self._store_file)
+        self.assertEqual(tracker.get_cursor('pair'), 1)
+        self.assertEqual(tracker.add('pair', _get_trades(2)), _get_trades(2))
+
+    def test_add_if_too_many_seen_trades(self):
+        tracker = CompletedTradeTracker(self._store_file)
+        tracker.add('pair', _get_trades(*range(CompletedTradeTracker.SEEN_TRADES_MAX_COUNT + 10)))
+        self.assertEqual(len(tracker._seen_trades['pair'][0]), CompletedTradeTracker.SEEN_TRADES_MAX_COUNT)
@@ -0,0 +1,163 @@
+from argparse import ArgumentParser
+from datetime import datetime
+import logging
+import os.path
+from random import Random
+from tempfile import TemporaryDirectory
+import time
+
+from rx.concurrency import HistoricalScheduler
+from tornado.gen import coroutine, sleep
+from tornado.ioloop import IOLoop
+
+from btce import commands, events
+from btce.bus import Bus
+from btce.gateway import Gateway, GatewayClient, WorkerPool
+from btce.ipc import Codec
+from btce.trader import Trader
+from tests.trader_benchmark import _get_events, _get_options, _get_rss
+
+WORKER_COUNTS = (1, 2, 4, 8)
+PAIR_COUNT = 100
+ROUNDS = 50
+PING_COUNT = 200
+MARKER = datetime(2000, 1, 1)
+READY_TIMEOUT = 30
+
+
+def _run_worker(path, number, pair_names):
+    logging.disable(logging.WARNING)
+    trading = [options for options in _get_options(PAIR_COUNT) if str(options.pair) in pair_names]
+    event_stream = Bus()
+    command_stream = Bus()
+    io_loop = IOLoop.current()
+    client = GatewayClient(path, [options.pair for options in trading], event_stream, command_stream, io_loop.stop)
+    io_loop.run_sync(client.init)
+    (event_stream.get(events.TimeEvent)
+        .filter(lambda event: event.value == MARKER)
+        .subscribe(lambda event: command_stream.on_next(commands.GetServerTimeCommand())))
+    scheduler = HistoricalScheduler(datetime(2017, 1, 1))
+    traders = [Trader(options, event_stream, command_stream, None, scheduler) for options in trading]
+    for trader in traders:
+        trader.init()
+    io_loop.start()
+
+
+class _Acks:
+
+    def __init__(self, command_stream):
+        self.count = 0
+        command_stream.get(commands.GetServerTimeCommand).subscribe(lambda command: self._on_ack())
+
+    def _on_ack(self):
+        self.count += 1
+
+    @coroutine
+    def wait(self, count, timeout=READY_TIMEOUT):
+        started = time.perf_counter()
+        while self.count < count:
+            if time.perf_counter() - started > timeout:
+                raise Exception('workers did not answer in %s s' % timeout)
+            yield sleep(0.0005)
+
+
+@coroutine
+def _run_case(directory, worker_count, messages):
+    path = os.path.join(directory, 'gateway-%s.sock' % worker_count)
+    event_stream = Bus()
+    command_stream = Bus()
+    trading = _get_options(PAIR_COUNT)
+    gateway = Gateway(path, event_stream, command_stream, [options.pair for options in trading])
+    gateway.init()
+    shards = [[str(options.pair) for options in trading[number::worker_count]] for number in range(worker_count)]
+    pool = WorkerPool(path, shards, _run_worker)
+    pool.init()
+    acks = _Acks(command_stream)
+    started = time.perf_counter()
+    while acks.count < worker_count:
+        if time.perf_counter() - started > READY_TIMEOUT:
+            raise Exception('workers did not start in %s s' % READY_TIMEOUT)
+        acks.count = 0
+        event_stream.on_next(events.TimeEvent(MARKER))
+        yield sleep(0.1)
+    yield sleep(0.2)
+    round_trips = []
+    for _ in range(PING_COUNT):
+        acks.count = 0
+        ping_started = time.perf_counter()
+        event_stream.on_next(events.TimeEvent(MARKER))
+        yield acks.wait(worker_count)
+        round_trips.append(time.perf_counter() - ping_started)
+    acks.count = 0
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    for message in messages:
+        event_stream.on_next(message)
+    event_stream.on_next(events.TimeEvent(MARKER))
+    yield acks.wait(worker_count)
+    wall_time, cpu_time = time.perf_counter() - wall_started, time.process_time() - cpu_started
+    pool.deinit()
+    gateway.deinit()
+    round_trips.sort()
+    return {
+        'workers': worker_count,
+        'rtt_p50_us': round_trips[len(round_trips) // 2] * 10 ** 6,
+        'rtt_p99_us': round_trips[int(len(round_trips) * 0.99)] * 10 ** 6,
+        'events_per_second': len(messages) / wall_time,
+        'gateway_cpu_per_event_us': cpu_time / len(messages) * 10 ** 6,
+    }
+
+
+def _run_in_process(trading, messages):
+    event_stream = Bus()
+    command_stream = Bus()
+    scheduler = HistoricalScheduler(datetime(2017, 1, 1))
+    traders = [Trader(options, event_stream, command_stream, None, scheduler) for options in trading]
+    for trader in traders:
+        trader.init()
+    started = time.perf_counter()
+    for message in messages:
+        event_stream.on_next(message)
+    wall_time = time.perf_counter() - started
+    for trader in traders:
+        trader.deinit()
+    return len(messages) / wall_time
+
+
+def _measure_codec(trading, messages):
+    codec = Codec([options.pair for options in trading])
+    started = time.perf_counter()
+    encoded = [codec.encode(message) for message in messages]
+    encode_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for data in encoded:
+        codec.decode(data)
+    decode_time = time.perf_counter() - started
+    return (encode_time / len(messages) * 10 ** 6, decode_time / len(messages) * 10 ** 6,
+            sum(map(len, encoded)) / len(encoded))
+
+
+def run():
+    parser = ArgumentParser(description='Measure gateway to worker IPC overhead and throughput')
+    parser.add_argument('--workers', type=lambda value: [int(item) for item in value.split(',')],
+                        default=WORKER_COUNTS, help='comma separated worker counts')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    trading = _get_options(PAIR_COUNT)
+    messages = _get_events(trading, ROUNDS, Random(args.seed))
+    encode_us, decode_us, size = _measure_codec(trading, messages)
+    print('%s events over %s pairs, cpu count %s, rss %.1f MB' % (len(messages), PAIR_COUNT, os.cpu_count(),
+                                                               _get_rss() / 2 ** 20))
+    print('codec: encode %.1f us, decode %.1f us, %.0f bytes per message' % (encode_us, decode_us, size))
+    print('in process: %.0f events/s' % _run_in_process(trading, messages))
+    print('%7s %12s %12s %12s %18s' % ('workers', 'rtt p50, us', 'rtt p99, us', 'events/s', 'gateway cpu/event, us'))
+    with TemporaryDirectory() as directory:
+        for worker_count in args.workers:
+            result = IOLoop.current().run_sync(lambda: _run_case(directory, worker_count, messages))
+            print('%7s %12.0f %12.0f %12.0f %18.1f' % (result['workers'], result['rtt_p50_us'], result['rtt_p99_us'],
+                                                       result['events_per_second'],
+                                                       result['gateway_cpu_per_event_us']))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import TestCase
+
+from tornado.concurrent import Future
+
+from btce import commands, events
+from btce.ipc import Codec, FrameReader, FRAME_HEADER
+from btce.models import Candle, CurrencyPair, Order, Trade, CURRENCY_BTC, CURRENCY_USD
+from btce.money import Money
+from tests.utils import dataprovider, use_dataproviders
+
+
+class _Stream:
+
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def read_bytes(self, size, partial=False):
+        future = Future()
+        future.set_result(self._chunks.pop(0))
+        return future
+
+
+@use_dataproviders
+class CodecTest(TestCase):
+
+    def setUp(self):
+        self._pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        self._codec = Codec([self._pair])
+
+    @staticmethod
+    def provider_encode():
+        return (
+            (None,),
+            (True,),
+            (0,),
+            (-1,),
+            (2 ** 70,),
+            (-2 ** 70,),
+            ('строка',),
+            (Decimal('-1.2300'),),
+            (Money(-12345, 3),),
+            (datetime(2017, 1, 2, 3, 4, 5, 6),),
+            (timedelta(minutes=5),),
+            ([1, [None, 'a']],),
+        )
+
+    @dataprovider('provider_encode')
+    def test_encode(self, value):
+        result = self._codec.decode(self._codec.encode(value))
+        self.assertEqual(result, value)
+        self.assertIs(type(result), type(value))
+
+    def test_encode_pair(self):
+        self.assertIs(self._codec.decode(self._codec.encode(CurrencyPair(CURRENCY_BTC, CURRENCY_USD))), self._pair)
+        self.assertIs(self._codec.decode(self._codec.encode(CURRENCY_USD)), CURRENCY_USD)
+
+    def test_encode_command(self):
+        command = commands.PollCommand(commands.CreateSellOrderCommand(self._pair, Decimal('0.1'), Money(1000, 3)),
+                                       10000, 5000)
+        result = self._codec.decode(self._codec.encode(command))
+        self.assertIsInstance(result, commands.PollCommand)
+        self.assertEqual((result.interval, result.start_period), (10000, 5000))
+        self.assertIsInstance(result.command, commands.CreateSellOrderCommand)
+        self.assertIs(result.command.pair, self._pair)
+        self.assertEqual((result.command.amount, result.command.price), (Decimal('0.1'), 1))
+
+    def test_encode_event(self):
+        completed = datetime(2017, 1, 1)
+        event = events.CompletedOrdersEvent(self._pair, [Order(1, Order.TYPE_BUY, Money(1, 6), Money(2, 3), None,
+                                                               completed)])
+        result = self._codec.decode(self._codec.encode(event))
+        self.assertIs(result.pair, self._pair)
+        order = result.orders[0]
+        self.assertEqual((order.id, order.type, order.amount, order.price, order.created, order.completed),
+                         (1, Order.TYPE_BUY, Money(1, 6), Money(2, 3), None, completed))
+
+    def test_encode_models(self):
+        time = datetime(2017, 1, 1)
+        trade = self._codec.decode(self._codec.encode(Trade(5, Order.TYPE_SELL, Money(1, 0), Money(2, 0), time)))
+        candle = self._codec.decode(self._codec.encode(Candle(time, 1, 2, 3, 4, 5)))
+        self.assertEqual((trade.id, trade.time), (5, time))
+        self.assertEqual((candle.started, candle.close, candle.volume), (time, 4, 5))
+
+    def test_encode_unknown(self):
+        with self.assertRaises(TypeError):
+            self._codec.encode(object())
+
+
+class FrameReaderTest(TestCase):
+
+    def _run(self, future):
+        return future.result()
+
+    def test_read(self):
+        data = b''.join(FRAME_HEADER.pack(len(frame)) + frame for frame in (b'a', b'bc', b'def'))
+        reader = FrameReader(_Stream([data[:3], data[3:7], data[7:]]))
+        self.assertEqual(self._run(reader.read()), [b'a'])
+        self.assertEqual(self._run(reader.read()), [b'bc', b'def'])
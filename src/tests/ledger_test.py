@@ -0,0 +1,53 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from btce.ledger import BalanceLedger
+from btce.models import CURRENCY_BTC, CURRENCY_USD
+from btce.money import Money
+from tests.utils import dataprovider, use_dataproviders
+
+
+@use_dataproviders
+class BalanceLedgerTest(TestCase):
+
+    def setUp(self):
+        self._ledger = BalanceLedger()
+        self._ledger.update(CURRENCY_USD, Money(100000, 3))
+
+    @staticmethod
+    def provider_can_afford():
+        return (
+            (0, Decimal(100), True),
+            (0, Decimal('100.001'), False),
+            (Decimal(40), Decimal(60), True),
+            (Decimal(40), Decimal('60.5'), False),
+        )
+
+    @dataprovider('provider_can_afford')
+    def test_can_afford(self, reserved, amount, expected):
+        self._ledger.reserve(CURRENCY_USD, reserved)
+        self.assertEqual(self._ledger.can_afford(CURRENCY_USD, amount), expected)
+
+    def test_can_afford_if_unknown(self):
+        self.assertFalse(self._ledger.can_afford(CURRENCY_BTC, Decimal(1)))
+
+    def test_release(self):
+        self._ledger.reserve(CURRENCY_USD, Decimal(30))
+        self._ledger.reserve(CURRENCY_USD, Decimal(20))
+        self._ledger.release(CURRENCY_USD, Decimal(30))
+        self.assertEqual(self._ledger.get_available(CURRENCY_USD), 80)
+        self._ledger.release(CURRENCY_USD, Decimal(20))
+        self.assertEqual(self._ledger.get_reserved(CURRENCY_USD), 0)
+
+    def test_update(self):
+        self.assertFalse(self._ledger.update(CURRENCY_USD, Money(100, 0)))
+        self.assertTrue(self._ledger.update(CURRENCY_USD, Money(90, 0)))
+        self.assertEqual(self._ledger.get_balance(CURRENCY_USD), 90)
+
+    def test_reconcile(self):
+        version = self._ledger.version
+        self._ledger.update(CURRENCY_BTC, Money(2, 0))
+        drifted = self._ledger.reconcile({CURRENCY_USD: Money(95, 0), CURRENCY_BTC: Money(1, 0)}, version)
+        self.assertEqual(drifted, [CURRENCY_USD])
+        self.assertEqual((self._ledger.get_balance(CURRENCY_USD), self._ledger.get_balance(CURRENCY_BTC)), (95, 2))
+        self.assertEqual(self._ledger.reconcile({CURRENCY_BTC: Money(1, 0)}, self._ledger.version), [CURRENCY_BTC])
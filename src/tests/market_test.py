@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from btce import events
+from btce.bus import Bus
+from btce.market import CandleBuilder, MarketData, TradeBuffer
+from btce.models import CurrencyPair, Order, Trade, CURRENCY_BTC, CURRENCY_USD
+from btce.money import Money
+from tests.utils import dataprovider, use_dataproviders
+
+
+def _get_trade(trade_id, price, amount=1, seconds=0):
+    return Trade(trade_id, Order.TYPE_SELL, Money(amount, 0), Money(price, 0),
+                 datetime(2017, 1, 1) + timedelta(seconds=seconds))
+
+
+@use_dataproviders
+class TradeBufferTest(TestCase):
+
+    @staticmethod
+    def provider_append():
+        return (
+            (0, [], None),
+            (2, [1, 2], 2),
+            (3, [1, 2, 3], 3),
+            (5, [3, 4, 5], 5),
+        )
+
+    @dataprovider('provider_append')
+    def test_append(self, count, expected_ids, expected_last_id):
+        trade_buffer = TradeBuffer(3, 6, 3)
+        for trade_id in range(1, count + 1):
+            trade_buffer.append(_get_trade(trade_id, 100))
+        self.assertEqual([trade.id for trade in trade_buffer], expected_ids)
+        self.assertEqual(len(trade_buffer), len(expected_ids))
+        self.assertEqual(trade_buffer.last_id, expected_last_id)
+
+    def test_append_keeps_values(self):
+        trade_buffer = TradeBuffer(3, 6, 3)
+        trade = _get_trade(1, 100, 2, 30)
+        trade_buffer.append(trade)
+        result = list(trade_buffer)[0]
+        self.assertEqual((result.type, result.amount, result.price, result.time),
+                         (trade.type, trade.amount, trade.price, trade.time))
+
+    def test_get_volume(self):
+        trade_buffer = TradeBuffer(3, 6, 3)
+        for trade_id in range(1, 5):
+            trade_buffer.append(_get_trade(trade_id, 100, trade_id, trade_id * 10))
+        self.assertEqual(trade_buffer.get_volume(datetime(2017, 1, 1, 0, 0, 30)), 7)
+        self.assertEqual(trade_buffer.get_volume(datetime(2017, 1, 1)), 9)
+
+
+class CandleBuilderTest(TestCase):
+
+    def test_add(self):
+        candle_builder = CandleBuilder(timedelta(minutes=1))
+        closed = [candle_builder.add(_get_trade(trade_id, price, 1, seconds))
+                  for trade_id, price, seconds in ((1, 100, 0), (2, 105, 10), (3, 95, 20), (4, 101, 50), (5, 110, 60))]
+        self.assertEqual(closed[:4], [None] * 4)
+        self.assertEqual((closed[4].started, closed[4].open, closed[4].high, closed[4].low, closed[4].close,
+                          closed[4].volume), (datetime(2017, 1, 1), 100, 105, 95, 101, 4))
+        candle = candle_builder.get_candle()
+        self.assertEqual((candle.started, candle.open, candle.volume), (datetime(2017, 1, 1, 0, 1), 110, 1))
+
+    def test_add_if_late(self):
+        candle_builder = CandleBuilder(timedelta(minutes=1))
+        candle_builder.add(_get_trade(1, 100, 1, 60))
+        self.assertIsNone(candle_builder.add(_get_trade(2, 90, 1, 0)))
+        self.assertEqual(candle_builder.get_candle().low, 100)
+
+
+class MarketDataTest(TestCase):
+
+    def test_add_trades(self):
+        pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        event_stream = Bus()
+        market_data = MarketData([pair], event_stream, Bus())
+        candles = []
+        event_stream.get(events.CandleEvent, pair).subscribe(candles.append)
+        market_data.init()
+        event_stream.on_next(events.TradesEvent(pair, [_get_trade(1, 100), _get_trade(2, 101, 1, 61)]))
+        market_data.deinit()
+        self.assertEqual([(event.period, event.is_closed) for event in candles], [
+            (timedelta(minutes=1), True),
+            (timedelta(minutes=1), False),
+            (timedelta(minutes=5), False),
+            (timedelta(hours=1), False),
+        ])
+        self.assertEqual([trade.id for trade in market_data.get_trades(pair)], [1, 2])
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from btce.bus import Bus
+from btce.events import BalanceEvent
+from btce.metrics import Counter, Gauge, Histogram, Registry
+from btce.models import CURRENCY_USD
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        self._registry = Registry()
+
+    def test_format_counter(self):
+        counter = Counter('requests_total', 'Requests', ('method',), registry=self._registry)
+        counter.inc('getInfo')
+        counter.inc('getInfo', amount=2)
+        counter.inc('Trade "x"')
+        self.assertEqual(self._registry.format(), '# HELP requests_total Requests\n'
+                                                  '# TYPE requests_total counter\n'
+                                                  'requests_total{method="Trade \\"x\\""} 1\n'
+                                                  'requests_total{method="getInfo"} 3\n')
+
+    def test_format_gauge(self):
+        gauge = Gauge('queue_depth', 'Queue depth', registry=self._registry)
+        gauge.set(5)
+        self.assertEqual(self._registry.format(), '# HELP queue_depth Queue depth\n'
+                                                  '# TYPE queue_depth gauge\n'
+                                                  'queue_depth 5\n')
+
+    def test_format_histogram(self):
+        histogram = Histogram('duration_seconds', 'Duration', ('method',), (0.1, 1), registry=self._registry)
+        histogram.observe(0.05, 'Trade')
+        histogram.observe(0.5, 'Trade')
+        histogram.observe(5, 'Trade')
+        self.assertEqual(self._registry.format(), '# HELP duration_seconds Duration\n'
+                                                  '# TYPE duration_seconds histogram\n'
+                                                  'duration_seconds_bucket{method="Trade",le="0.1"} 1\n'
+                                                  'duration_seconds_bucket{method="Trade",le="1"} 2\n'
+                                                  'duration_seconds_bucket{method="Trade",le="+Inf"} 3\n'
+                                                  'duration_seconds_sum{method="Trade"} 5.55\n'
+                                                  'duration_seconds_count{method="Trade"} 3\n')
+
+    def test_bus_counts_messages(self):
+        counter = Counter('events_total', 'Events', ('type', 'key'), registry=self._registry)
+        Bus(counter).on_next(BalanceEvent(CURRENCY_USD, 1))
+        self.assertEqual(counter.get('BalanceEvent', 'USD'), 1)
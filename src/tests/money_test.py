@@ -0,0 +1,65 @@
+from decimal import Decimal
+from random import Random
+from unittest import TestCase
+
+from btce.money import Money, add_margin, is_price_jumped
+from tests.utils import dataprovider, use_dataproviders
+
+
+def _quantize(value, places):
+    return value.quantize(Decimal('10') ** -places)
+
+
+@use_dataproviders
+class MoneyTest(TestCase):
+
+    @staticmethod
+    def provider_from_decimal():
+        return (
+            (Decimal('100.1235'), 3, '100.124'),
+            (Decimal('100.1245'), 3, '100.124'),
+            (Decimal('-0.0015'), 3, '-0.002'),
+            (Decimal('7'), 2, '7.00'),
+        )
+
+    @dataprovider('provider_from_decimal')
+    def test_from_decimal(self, value, places, expected):
+        self.assertEqual(str(Money.from_decimal(value, places)), expected)
+
+    def test_compare_with_decimal(self):
+        money = Money.from_decimal(Decimal('1.5'), 3)
+        self.assertEqual(money, Decimal('1.50'))
+        self.assertEqual(hash(money), hash(Decimal('1.5')))
+        self.assertTrue(Decimal(1) < money <= 2)
+        self.assertEqual(Decimal('0.5') * money + 1, Decimal('1.75'))
+
+    @staticmethod
+    def provider_hash():
+        return (
+            (0, 0),
+            (15, 1),
+            (-1, 0),
+            (-2, 0),
+            (-1500, 3),
+            (123456789, 8),
+            (10 ** 30 + 7, 70),
+        )
+
+    @dataprovider('provider_hash')
+    def test_hash(self, units, places):
+        self.assertEqual(hash(Money(units, places)), hash(Decimal('%se-%s' % (units, places))))
+        self.assertEqual(hash(Money(units * 1000, places + 3)), hash(Money(units, places)))
+
+    def test_rounds_as_decimal(self):
+        random = Random(0)
+        for _ in range(10000):
+            places = random.randint(0, 8)
+            price = _quantize(Decimal(random.uniform(1, 100000)), places)
+            margin = Decimal(random.randint(-2000, 2000)) / 10000 + _quantize(Decimal(random.uniform(-0.01, 0.01)), 4)
+            jump = Decimal(random.randint(1, 100)) / 1000
+            previous = _quantize(price * (1 + Decimal(random.uniform(-0.2, 0.2))), places)
+            money_price, money_previous = Money.from_decimal(price, places), Money.from_decimal(previous, places)
+            self.assertEqual(str(add_margin(money_price, margin, places)),
+                             str(_quantize(price + price * margin, places)))
+            self.assertEqual(is_price_jumped(money_previous, money_price, Money.from_number(jump)),
+                             not abs(price - previous) / previous < jump)
@@ -0,0 +1,68 @@
+from datetime import datetime
+from unittest import TestCase
+
+from btce.models import Order
+from btce.money import Money
+from btce.orders import ActiveOrderIndex
+from tests.utils import dataprovider, use_dataproviders
+
+
+def _get_order(order_id, price, amount=1, order_type=Order.TYPE_SELL, day=1):
+    return Order(order_id, order_type, Money(amount, 0), Money(price, 0), datetime(2017, 1, day), None)
+
+
+@use_dataproviders
+class ActiveOrderIndexTest(TestCase):
+
+    def setUp(self):
+        self._index = ActiveOrderIndex([_get_order(1, 110), _get_order(2, 90, order_type=Order.TYPE_BUY),
+                                        _get_order(3, 100, day=2)])
+
+    def _get_ids(self):
+        return [order.id for order in self._index]
+
+    def test_add(self):
+        self._index.add(_get_order(4, 95))
+        self._index.add(_get_order(1, 80))
+        self.assertEqual(self._get_ids(), [1, 2, 4, 3])
+
+    def test_remove(self):
+        self.assertEqual(self._index.remove(3).id, 3)
+        self.assertIsNone(self._index.remove(3))
+        self.assertEqual(self._get_ids(), [2, 1])
+
+    @staticmethod
+    def provider_fill():
+        return (
+            (None, 1, True, 4),
+            (None, 5, True, None),
+            (Money(2, 0), 1, False, 5),
+            (Money(2, 0), 3, True, 4),
+        )
+
+    @dataprovider('provider_fill')
+    def test_fill(self, filled, amount, expected, expected_amount):
+        self._index.add(_get_order(4, 120, 5), filled)
+        self.assertEqual(self._index.fill(4, Money(amount, 0)), expected)
+        order = self._index.get(4)
+        self.assertEqual(None if order is None else order.amount, expected_amount)
+
+    def test_reconcile(self):
+        version = self._index.version
+        self._index.add(_get_order(4, 120))
+        self._index.remove(1)
+        drift = self._index.reconcile([_get_order(1, 110), _get_order(2, 90, 2, Order.TYPE_BUY), _get_order(5, 130)],
+                                      version)
+        self.assertEqual(drift, 3)
+        self.assertEqual(self._get_ids(), [2, 4, 5])
+        self.assertEqual(self._index.get(2).amount, 2)
+        self.assertEqual(self._index.reconcile([_get_order(2, 90, 2, Order.TYPE_BUY)], self._index.version), 2)
+
+    def test_find(self):
+        self._index.add(_get_order(4, 100, order_type=Order.TYPE_BUY))
+        self.assertEqual(self._index.find(Order.TYPE_BUY, Money(100, 0)).id, 4)
+        self.assertEqual(self._index.find(Order.TYPE_SELL, Money(100, 0)).id, 3)
+        self.assertIsNone(self._index.find(Order.TYPE_BUY, Money(110, 0)))
+
+    def test_get_outdated(self):
+        self.assertEqual([order.id for order in self._index.get_outdated(datetime(2017, 1, 2))], [1, 2])
@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from rx import testing
+
+from btce import commands
+from btce.bus import Bus
+from btce.polling import PollScheduler
+
+
+class PollSchedulerTest(TestCase):
+
+    def setUp(self):
+        self._scheduler = testing.TestScheduler()
+        self._commands = Bus()
+        self._poll_scheduler = PollScheduler(self._commands, self._scheduler)
+        self._poll_scheduler.init()
+        self._polls = []
+        self._commands.get(commands.GetCompletedOrdersCommand).subscribe(
+            lambda command: self._polls.append((self._scheduler.clock, command.pair)))
+
+    def tearDown(self):
+        self._poll_scheduler.deinit()
+
+    def _register(self, pair, interval=10000, start_period=10000):
+        poll_command = commands.PollCommand(commands.GetCompletedOrdersCommand(pair), interval, start_period)
+        self._commands.on_next(poll_command)
+        return poll_command
+
+    def _run(self, until):
+        self._scheduler.advance_to(until)
+
+    def test_register(self):
+        self._register('pair')
+        self._run(25000)
+        self.assertEqual(self._polls, [(1, 'pair'), (10000, 'pair'), (20000, 'pair')])
+
+    def test_register_if_many_pairs(self):
+        for pair in range(10):
+            self._register(pair)
+        self._run(9999)
+        times = sorted(time for time, pair in self._polls)
+        self.assertEqual(len(times), 10)
+        self.assertGreater(min(second - first for first, second in zip(times, times[1:])), 500)
+
+    def test_register_if_same_command(self):
+        self._register('pair', 10000)
+        self._register('pair', 5000)
+        self._run(12000)
+        self.assertEqual([time for time, pair in self._polls], [1, 5000, 10000])
+
+    def test_register_if_short_start_period(self):
+        self._register('first')
+        self._register('second', 10000, 1000)
+        self._run(15000)
+        self.assertEqual([time for time, pair in self._polls if pair == 'second'], [619, 6180])
+
+    def test_unregister(self):
+        poll_command = self._register('pair')
+        self._run(5000)
+        self._commands.on_next(commands.CancelPollCommand(poll_command))
+        self._run(25000)
+        self.assertEqual(self._polls, [(1, 'pair')])
+
+    def test_register_if_batched_command(self):
+        prices = []
+        self._commands.get(commands.GetPriceCommand).subscribe(lambda command: prices.append(self._scheduler.clock))
+        self._register('first')
+        for pair in range(3):
+            self._commands.on_next(commands.PollCommand(commands.GetPriceCommand(pair), 10000, 10000))
+        self._run(25000)
+        self.assertEqual(prices, [6181, 6181, 6181, 16180, 16180, 16180])
+
+    def test_get_rate(self):
+        self._register('first', 10000)
+        self._register('second', 5000)
+        for pair in range(3):
+            self._commands.on_next(commands.PollCommand(commands.GetPriceCommand(pair), 2000, 2000))
+        self.assertAlmostEqual(self._poll_scheduler.get_rate((commands.GetCompletedOrdersCommand,)), 0.3)
+        self.assertEqual(self._poll_scheduler.get_rate((commands.GetPriceCommand,)), 0.5)
+
+    def test_set_stretch(self):
+        self._register('pair')
+        self._poll_scheduler.set_stretch((commands.GetCompletedOrdersCommand,), 2)
+        self._run(45000)
+        self.assertEqual([time for time, pair in self._polls], [1, 20000, 40000])
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from tornado.ioloop import IOLoop
+
+from btce.ratelimit import TokenBucket
+from tests.utils import dataprovider, use_dataproviders
+
+
+class _Clock:
+
+    def __init__(self):
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+
+@use_dataproviders
+class TokenBucketTest(TestCase):
+
+    def setUp(self):
+        self._clock = _Clock()
+        self._bucket = TokenBucket(2, 4, 2, self._clock)
+
+    @staticmethod
+    def provider_take():
+        return (
+            (False, 2),
+            (True, 4),
+        )
+
+    @dataprovider('provider_take')
+    def test_take(self, is_reserved, expected_count):
+        count = 0
+        while self._bucket.take(is_reserved):
+            count += 1
+        self.assertEqual(count, expected_count)
+
+    def test_take_after_refill(self):
+        while self._bucket.take(True):
+            pass
+        self.assertEqual(self._bucket.get_delay(True), 0.5)
+        self.assertEqual(self._bucket.get_delay(), 1.5)
+        self._clock.time = 1.5
+        self.assertTrue(self._bucket.take())
+        self._clock.time = 100
+        self.assertEqual(self._bucket.get_tokens(), 4)
+
+    def test_acquire(self):
+        io_loop = IOLoop()
+        bucket = TokenBucket(100, 1, 0, io_loop.time)
+        try:
+            self.assertEqual(io_loop.run_sync(bucket.acquire), 0)
+            self.assertGreater(io_loop.run_sync(bucket.acquire), 0)
+        finally:
+            io_loop.close()
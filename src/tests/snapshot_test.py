@@ -0,0 +1,28 @@
+from decimal import Decimal
+import os.path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from btce.models import TraderState
+from btce.snapshot import SnapshotKeeper
+
+
+class SnapshotKeeperTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self._store_file = os.path.join(self._directory.name, 'snapshot')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_load_if_no_snapshot(self):
+        self.assertEqual(SnapshotKeeper(self._store_file).load(), {})
+
+    def test_load(self):
+        keeper = SnapshotKeeper(self._store_file)
+        keeper.init({'BTC/USD': TraderState(Decimal('100.5'), Decimal('99'), {'BTC': Decimal('0.01')})})
+        keeper.deinit()
+        state = SnapshotKeeper(self._store_file).load()['BTC/USD']
+        self.assertEqual((state.price, state.jump_price, state.balances),
+                         (Decimal('100.5'), Decimal('99'), {'BTC': Decimal('0.01')}))
@@ -0,0 +1,58 @@
+from datetime import datetime
+from decimal import Decimal
+import os.path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from btce import events
+from btce.bus import Bus
+from btce.models import Order
+from btce.storage import SqliteBackend, Storage
+
+
+class StorageTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, 'btce.sqlite')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _get_backend(self):
+        backend = SqliteBackend(self._path)
+        backend.init()
+        return backend
+
+    def _store(self, *messages):
+        bus = Bus()
+        storage = Storage(SqliteBackend(self._path), bus)
+        storage.init()
+        for message in messages:
+            bus.on_next(message)
+        storage.deinit()
+
+    def test_price(self):
+        self._store(events.PriceEvent('pair', Decimal('1.234')), events.PriceEvent('other pair', Decimal('2')))
+        prices = self._get_backend().get_prices('pair')
+        self.assertEqual([value for value, seen in prices], [Decimal('1.234')])
+
+    def test_completed_orders(self):
+        completed = datetime(2017, 1, 1, 12)
+        order = Order(1, Order.TYPE_BUY, Decimal('0.5'), Decimal('100.001'), None, completed)
+        self._store(events.ActiveOrdersEvent('pair', [Order(2, Order.TYPE_SELL, Decimal(1), Decimal(1), completed, None)]),
+                    events.CompletedOrdersEvent('pair', [order]))
+        orders = self._get_backend().get_completed_orders('pair')
+        self.assertEqual(orders, [(1, Order.TYPE_BUY, Decimal('0.5'), Decimal('100.001'), completed)])
+
+    def test_active_orders(self):
+        created = datetime(2017, 1, 1, 12)
+        first = Order(1, Order.TYPE_SELL, Decimal(1), Decimal(110), created, None)
+        second = Order(2, Order.TYPE_BUY, Decimal(1), Decimal(90), created, None)
+        self._store(events.ActiveOrdersEvent('pair', [first]),
+                    events.ActiveOrdersEvent('pair', [second, first]),
+                    events.ActiveOrdersEvent('pair', [Order(2, Order.TYPE_BUY, Decimal('0.5'), Decimal(90), created,
+                                                            None), first]))
+        cursor = self._get_backend()._connection.cursor()
+        cursor.execute('SELECT id, amount FROM orders ORDER BY seen, id')
+        self.assertEqual(list(cursor), [(1, '1'), (2, '1'), (2, '0.5')])
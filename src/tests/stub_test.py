@@ -0,0 +1,298 @@
+from decimal import Decimal
+import os.path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from tornado.gen import coroutine, sleep
+from tornado.ioloop import IOLoop
+
+from btce import metrics
+from btce.bus import Bus
+from btce.commands import GetBalanceCommand, GetPriceCommand
+from btce.common import MAIN_THREAD
+from btce.events import ActiveOrdersEvent, BalanceEvent, CompletedOrdersEvent, PriceEvent, TradesEvent
+from btce.exchange import ExchangeConnector, _NonceKeeper, _PublicApiConnector, _TradeApiConnector, \
+    _TradeApiRouter
+from btce.history import CompletedTradeTracker
+from btce.models import CurrencyPair, Order, CURRENCY_BTC, CURRENCY_ETH, CURRENCY_LTC, CURRENCY_USD
+from btce.stub import StubExchange
+
+
+class StubExchangeTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        with open(os.path.join(self._directory.name, 'nonce'), 'w') as store:
+            store.write('0')
+        self._pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        self._io_loop = IOLoop()
+        self._io_loop.make_current()
+        self._exchange = StubExchange({'btc_usd': Decimal(100)}, {'btc': Decimal(1), 'usd': Decimal(100)},
+                                      secret='secret')
+        site = 'http://127.0.0.1:%s' % self._exchange.listen()
+        self._public_api = _PublicApiConnector(site)
+        self._trade_api = _TradeApiConnector(site, 'key', 'secret')
+        self._trade_api._nonce_keeper = _NonceKeeper(os.path.join(self._directory.name, 'nonce'))
+
+    def tearDown(self):
+        self._exchange.stop()
+        self._io_loop.clear_current()
+        self._io_loop.close(all_fds=True)
+        self._directory.cleanup()
+
+    def _run(self, func):
+        return self._io_loop.run_sync(coroutine(func))
+
+    def test_get_prices(self):
+        def run():
+            return (yield self._public_api.get_prices(['btc_usd']))
+        self.assertEqual(self._run(run), {'btc_usd': Decimal(100)})
+
+    def test_get_balances_if_nonce_is_out_of_sync(self):
+        self._exchange._nonces['key'] = 50
+        def run():
+            return (yield self._trade_api.get_balances())
+        self.assertEqual(self._run(run)['btc'], Decimal(1))
+        self.assertEqual(self._exchange._nonces['key'], 51)
+
+    def test_create_order(self):
+        def run():
+            result = yield self._trade_api.create_order('sell', 'btc_usd', Decimal('0.5'), Decimal(110))
+            self.assertEqual((result['order_id'], result['received'], result['remains']), (1, 0, Decimal('0.5')))
+            self.assertEqual(result['funds']['btc'], Decimal('0.5'))
+            orders = yield self._trade_api.get_active_orders(self._pair)
+            self.assertEqual([(order.type, order.price) for order in orders], [(Order.TYPE_SELL, Decimal(110))])
+            self._exchange.set_price('btc_usd', Decimal(110))
+            trades = yield self._trade_api.get_completed_orders(self._pair)
+            self.assertEqual([(trade_id, order.type, order.amount) for trade_id, order in trades],
+                             [(1, Order.TYPE_SELL, Decimal('0.5'))])
+            self.assertEqual((yield self._trade_api.get_active_orders(self._pair)), [])
+            self.assertEqual((yield self._trade_api.get_balances())['usd'], Decimal(155))
+        self._run(run)
+
+    def test_cancel_order(self):
+        def run():
+            yield self._trade_api.create_order('buy', 'btc_usd', Decimal(1), Decimal(90))
+            funds = yield self._trade_api.cancel_order(1)
+            self.assertEqual(funds['usd'], Decimal(100))
+        self._run(run)
+
+    def test_get_completed_orders_if_no_trades(self):
+        self._exchange.no_trades = True
+        def run():
+            yield self._trade_api.create_order('sell', 'btc_usd', Decimal('0.5'), Decimal(90))
+            return (yield self._trade_api.get_completed_orders(self._pair))
+        self.assertEqual(self._run(run), [])
+
+
+class ExchangeConnectorTest(TestCase):
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        with open(os.path.join(self._directory.name, 'nonce'), 'w') as store:
+            store.write('0')
+        self._pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        self._io_loop = IOLoop()
+        self._io_loop.make_current()
+        self._exchange = StubExchange({'btc_usd': Decimal(100)}, {'btc': Decimal(10), 'usd': Decimal(100)})
+        site = 'http://127.0.0.1:%s' % self._exchange.listen()
+        self._events = Bus()
+        self._commands = Bus()
+        self._connector = ExchangeConnector(self._events, self._commands)
+        self._connector._public_api = _PublicApiConnector(site)
+        self._connector._trade_api = _TradeApiRouter([_TradeApiConnector(site, 'key', 'secret',
+                                                                         os.path.join(self._directory.name, 'nonce'))])
+        self._connector._trade_tracker = CompletedTradeTracker(os.path.join(self._directory.name, 'trades'))
+
+    def tearDown(self):
+        self._exchange.stop()
+        self._io_loop.clear_current()
+        self._io_loop.close(all_fds=True)
+        self._directory.cleanup()
+
+    def test_get_completed_orders_by_pages(self):
+        pages = []
+        self._events.get(CompletedOrdersEvent, self._pair).subscribe(lambda event: pages.append(len(event.orders)))
+        def run():
+            yield self._connector._trade_api.create_order('sell', 'btc_usd', Decimal(1), Decimal(90))
+            yield self._connector._get_completed_orders(self._pair)
+            for _ in range(5):
+                yield self._connector._trade_api.create_order('sell', 'btc_usd', Decimal(1), Decimal(90))
+            yield self._connector._get_completed_orders(self._pair)
+        with patch.object(_TradeApiConnector, 'TRADE_HISTORY_PAGE_SIZE', 2):
+            self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(pages, [0, 2, 2, 1])
+
+    def test_get_completed_orders_if_first_poll_is_empty(self):
+        completed = []
+        self._events.get(CompletedOrdersEvent, self._pair).subscribe(
+            lambda event: completed.append([order.id for order in event.orders]))
+        def run():
+            yield self._connector._get_completed_orders(self._pair)
+            yield self._connector._trade_api.create_order('sell', 'btc_usd', Decimal(1), Decimal(110))
+            self._exchange.set_price('btc_usd', Decimal(110))
+            yield self._connector._get_completed_orders(self._pair)
+        self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(completed, [[], [1]])
+
+    def test_active_orders(self):
+        active_orders = []
+        self._events.get(ActiveOrdersEvent, self._pair).subscribe(
+            lambda event: active_orders.append([(order.id, order.price) for order in event.orders]))
+        drift_count = metrics.ACTIVE_ORDER_DRIFT.get(str(self._pair))
+        def run():
+            yield self._connector._get_balances()
+            yield self._connector._create_sell_order(self._pair, Decimal(1), Decimal(120))
+            yield self._connector._create_sell_order(self._pair, Decimal(1), Decimal(110))
+            yield self._connector._create_sell_order(self._pair, Decimal(1), Decimal(90))
+            yield self._connector._cancel_order(1)
+            yield self._connector._trade_api.create_order('buy', 'btc_usd', Decimal(1), Decimal(80))
+            yield self._connector._get_active_orders(self._pair)
+        self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(active_orders, [[(1, 120)], [(2, 110), (1, 120)], [(2, 110)], [(4, 80), (2, 110)]])
+        self.assertEqual(metrics.ACTIVE_ORDER_DRIFT.get(str(self._pair)), drift_count + 1)
+
+    def test_balances(self):
+        balances = []
+        self._events.get(BalanceEvent, CURRENCY_USD).subscribe(lambda event: balances.append(event.value))
+        unaffordable_count = metrics.ORDERS_UNAFFORDABLE.get(str(self._pair))
+        drift_count = metrics.BALANCE_DRIFT.get('BTC')
+        def run():
+            yield self._connector._get_balances()
+            first = self._connector._create_buy_order(self._pair, Decimal(1), Decimal(60))
+            yield self._connector._create_buy_order(self._pair, Decimal(1), Decimal(50))
+            yield first
+            self.assertEqual(self._exchange.request_count, 2)
+            self._exchange.set_price('btc_usd', Decimal(60))
+            yield self._connector._cancel_order(1)
+            yield self._connector._get_balances()
+        self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(balances, [100, 40, 40])
+        self.assertEqual(metrics.ORDERS_UNAFFORDABLE.get(str(self._pair)), unaffordable_count + 1)
+        self.assertEqual(metrics.BALANCE_DRIFT.get('BTC'), drift_count + 1)
+
+    def test_get_prices_in_batches(self):
+        pairs = [self._pair, CurrencyPair(CURRENCY_LTC, CURRENCY_USD), CurrencyPair(CURRENCY_ETH, CURRENCY_USD)]
+        self._exchange.set_price('ltc_usd', Decimal(5))
+        self._exchange.set_price('eth_usd', Decimal(10))
+        requests = []
+        get_ticker = self._exchange.get_ticker
+        self._exchange.get_ticker = lambda names: requests.append(sorted(names)) or get_ticker(names)
+        prices = []
+        for pair in pairs:
+            self._events.get(PriceEvent, pair).subscribe(lambda event: prices.append((str(event.pair), event.value)))
+        def run():
+            for _ in range(3):
+                for pair in pairs:
+                    self._commands.on_next(GetPriceCommand(pair))
+                yield sleep(self._connector.BATCH_WINDOW * 3 / 1000)
+        with patch.object(MAIN_THREAD, 'loop', self._io_loop):
+            subscription = self._connector._subscribe_for_get_price_command()
+            try:
+                self._io_loop.run_sync(coroutine(run))
+            finally:
+                subscription.dispose()
+        self.assertEqual(requests, [['btc_usd', 'eth_usd', 'ltc_usd']] * 3)
+        self.assertEqual(sorted(prices), sorted([(str(pair), price) for pair, price in zip(pairs, (100, 5, 10))] * 3))
+
+    def test_get_balances_if_commands_overlap(self):
+        balances = []
+        self._events.get(BalanceEvent, CURRENCY_USD).subscribe(lambda event: balances.append(event.value))
+        subscription = self._connector._subscribe_for_get_balance_command()
+        def run():
+            for _ in range(5):
+                self._commands.on_next(GetBalanceCommand())
+            yield self._connector._balance_request
+        try:
+            self._io_loop.run_sync(coroutine(run))
+        finally:
+            subscription.dispose()
+        self.assertEqual(self._exchange.request_count, 1)
+        self.assertEqual(balances, [100])
+        self.assertIsNone(self._connector._balance_request)
+
+    def test_get_balances_after_error(self):
+        balances = []
+        self._events.get(BalanceEvent, CURRENCY_USD).subscribe(lambda event: balances.append(event.value))
+        call_get_info = self._exchange._call_getInfo
+        errors = ['server error']
+        def run():
+            yield self._connector._get_balances()
+            self.assertIsNone(self._connector._balance_request)
+            yield self._connector._get_balances()
+        with patch.object(self._exchange, '_call_getInfo',
+                          lambda params: (None, errors.pop()) if errors else call_get_info(params)):
+            self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(self._exchange.request_count, 2)
+        self.assertEqual(balances, [100])
+
+    def test_create_order_if_balances_are_unknown(self):
+        def run():
+            yield self._connector._create_sell_order(self._pair, Decimal(1), Decimal(120))
+            yield self._connector._get_balances()
+            yield self._connector._create_sell_order(self._pair, Decimal(1), Decimal(120))
+        self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(self._exchange.request_count, 2)
+        self.assertEqual([order.id for order in self._connector._get_active_order_index(self._pair)], [1])
+
+    def test_get_trades(self):
+        trades = []
+        self._events.get(TradesEvent, self._pair).subscribe(lambda event: trades.append([trade.id for trade in
+                                                                                          event.trades]))
+        def run():
+            self._exchange.add_public_trade('btc_usd', 'ask', Decimal(1), Decimal(100))
+            self._exchange.add_public_trade('btc_usd', 'bid', Decimal(2), Decimal(101))
+            yield self._connector._get_trades({self._pair})
+            yield self._connector._get_trades({self._pair})
+            self._exchange.add_public_trade('btc_usd', 'ask', Decimal(1), Decimal(99))
+            yield self._connector._get_trades({self._pair})
+        self._io_loop.run_sync(coroutine(run))
+        self.assertEqual(trades, [[1, 2], [3]])
+
+
+class ApiConnectorTest(TestCase):
+
+    def setUp(self):
+        self._io_loop = IOLoop()
+        self._io_loop.make_current()
+        self._exchange = StubExchange({'btc_usd': Decimal(100)})
+        self._site = 'http://127.0.0.1:%s' % self._exchange.listen()
+
+    def tearDown(self):
+        self._exchange.stop()
+        self._io_loop.clear_current()
+        self._io_loop.close(all_fds=True)
+
+    def _run(self, func):
+        return self._io_loop.run_sync(coroutine(func))
+
+    def test_http_clients(self):
+        public_api = _PublicApiConnector(self._site)
+        trade_api = _TradeApiConnector(self._site, 'key', 'secret')
+        self.assertIsNot(public_api._http_client, trade_api._http_client)
+        self.assertEqual(len(trade_api._http_client._curls), 1)
+
+    def test_connect_reuses_connection(self):
+        public_api = _PublicApiConnector(self._site)
+        new_count = metrics.API_CONNECTIONS.get('public', 'ticker', 'new')
+        reused_count = metrics.API_CONNECTIONS.get('public', 'ticker', 'reused')
+        def run():
+            yield public_api.connect()
+            for _ in range(3):
+                yield public_api.get_prices(['btc_usd'])
+        self._run(run)
+        self.assertEqual(metrics.API_CONNECTIONS.get('public', 'ticker', 'new'), new_count)
+        self.assertEqual(metrics.API_CONNECTIONS.get('public', 'ticker', 'reused'), reused_count + 3)
+
+    def test_get_depths(self):
+        public_api = _PublicApiConnector(self._site)
+        self._exchange.set_depth('btc_usd', [[Decimal(99), Decimal(1)]], [[Decimal(101), Decimal(2)]])
+        depths = self._run(lambda: (yield public_api.get_depths(['btc_usd', 'ltc_usd'])))
+        self.assertEqual(depths, {'btc_usd': ([[99, 1]], [[101, 2]])})
+
+    def test_connect_if_unavailable(self):
+        self._exchange.stop()
+        public_api = _PublicApiConnector('http://127.0.0.1:1')
+        self._run(public_api.connect)
+        self.assertTrue(public_api.is_idle(0))
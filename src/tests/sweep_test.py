@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import TestCase
+
+import numpy
+
+from btce.models import CurrencyPair, Order, TradingOptions, CURRENCY_BTC, CURRENCY_USD
+from btce.sweep import get_grid, get_jumping_price_indexes, get_new_prices, get_price_arrays, run_sweep
+
+
+class SweepTest(TestCase):
+
+    def test_get_jumping_price_indexes(self):
+        prices = numpy.array([100, 101, 104, 106, 105, 110, 99, 98, 97], dtype=float)
+        self.assertEqual(get_jumping_price_indexes(prices, 0.05), [3, 6])
+
+    def test_get_new_prices(self):
+        prices = numpy.array([100, 200], dtype=float)
+        jitters = numpy.array([0, 0.01])
+        self.assertEqual(get_new_prices(Order.TYPE_SELL, prices, 0.1, jitters, 3).tolist(), [110, 222])
+        self.assertEqual(get_new_prices(Order.TYPE_BUY, prices, 0.1, jitters, 3).tolist(), [90, 178])
+
+    def test_run_sweep(self):
+        pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        options = TradingOptions(pair, Decimal('0.01'), Decimal(0), Decimal('0.01'), Decimal('0.1'), Decimal('0.05'))
+        started = datetime(2017, 1, 1)
+        prices = [100] * 10 + [110] * 10 + [95] * 10 + [120] * 10
+        ticks = [(started + timedelta(seconds=10 * number), str(pair), Decimal(price))
+                 for number, price in enumerate(prices)]
+        results = run_sweep([options], get_price_arrays(ticks, [str(pair)]),
+                            {CURRENCY_BTC: Decimal(1), CURRENCY_USD: Decimal(100)}, CURRENCY_USD,
+                            get_grid([Decimal('0.01'), Decimal('0.5')], [Decimal(0)], [Decimal('0.05')]), workers=1)
+        self.assertEqual([result.margin for result in results], [0.5, 0.01])
+        self.assertEqual([result.fill_count for result in results], [0, 4])
+        self.assertEqual(results[0].pnl, 20)
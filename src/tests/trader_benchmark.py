@@ -0,0 +1,158 @@
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from decimal import Decimal
+import gc
+import json
+import logging
+import platform
+from random import Random
+import resource
+import subprocess
+import sys
+import time
+
+from rx.concurrency import HistoricalScheduler
+
+from btce import config, events
+from btce.bus import Bus
+from btce.models import Currency, CurrencyPair, Order, TradingOptions, CURRENCY_USD
+from btce.money import Money
+from btce.trader import Trader
+
+TRADER_COUNTS = (1, 10, 50, 100, 200)
+ROUNDS = 200
+COMPLETED_ORDER_SHARE = 0.1
+PRICE_STEP = 0.01
+REGRESSION_THRESHOLD = 0.1
+
+
+def _get_options(count):
+    return [TradingOptions(CurrencyPair(Currency('P%s' % number, 5), CURRENCY_USD), config.DEFAULT_OVERALL_MARGIN,
+                           config.DEFAULT_MARGIN_JITTER, Decimal('0.1'), Decimal('0.1'), config.DEFAULT_JUMPING_PRICE)
+            for number in range(count)]
+
+
+def _get_events(trading, rounds, random):
+    started = datetime(2017, 1, 1)
+    prices = dict((options.pair, 100.0) for options in trading)
+    messages = []
+    for number in range(rounds):
+        messages.append(events.TimeEvent(started + timedelta(seconds=10 * number)))
+        messages.append(events.BalanceEvent(CURRENCY_USD, Money.from_decimal(10000 + number, CURRENCY_USD.places)))
+        for options in trading:
+            pair = options.pair
+            prices[pair] *= 1 + random.uniform(-PRICE_STEP, PRICE_STEP)
+            price = Money.from_decimal(Decimal(prices[pair]), pair.second.places)
+            messages.append(events.PriceEvent(pair, price))
+            messages.append(events.BalanceEvent(pair.first, Money.from_decimal(100 + number, pair.first.places)))
+            orders = []
+            if random.random() < COMPLETED_ORDER_SHARE:
+                order_type = random.choice((Order.TYPE_SELL, Order.TYPE_BUY))
+                amount = Money.from_decimal(options.deal_amount, pair.first.places)
+                orders.append(Order(number, order_type, amount, price, None, messages[0].value))
+            messages.append(events.CompletedOrdersEvent(pair, orders))
+    return messages
+
+
+def _get_rss():
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _run_case(trader_count, rounds, seed):
+    trading = _get_options(trader_count)
+    messages = _get_events(trading, rounds, Random(seed))
+    event_stream = Bus()
+    command_stream = Bus()
+    scheduler = HistoricalScheduler(datetime(2017, 1, 1))
+    gc.collect()
+    rss_before = _get_rss()
+    traders = [Trader(options, event_stream, command_stream, None, scheduler) for options in trading]
+    for trader in traders:
+        trader.init()
+    rss_after = _get_rss()
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    for message in messages:
+        event_stream.on_next(message)
+    wall_time, cpu_time = time.perf_counter() - wall_started, time.process_time() - cpu_started
+    rss_peak = _get_rss()
+    for trader in traders:
+        trader.deinit()
+    return {
+        'traders': trader_count,
+        'events': len(messages),
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'events_per_second': len(messages) / wall_time,
+        'cpu_per_event_us': cpu_time / len(messages) * 10 ** 6,
+        'rss_bytes': rss_peak,
+        'rss_per_trader_bytes': (rss_after - rss_before) // trader_count,
+    }
+
+
+def _get_version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=config.SRC_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results, baseline):
+    baseline_results = dict((result['traders'], result) for result in baseline['results'])
+    regressions = []
+    for result in results['results']:
+        before = baseline_results.get(result['traders'])
+        if before is None:
+            continue
+        change = result['events_per_second'] / before['events_per_second'] - 1
+        print('%4s traders: %10.0f -> %10.0f events/s (%+.1f%%)' % (result['traders'], before['events_per_second'],
+                                                                    result['events_per_second'], change * 100))
+        if change < -REGRESSION_THRESHOLD:
+            regressions.append(result['traders'])
+    return regressions
+
+
+def run():
+    parser = ArgumentParser(description='Measure Trader pipeline throughput over a synthetic pair universe')
+    parser.add_argument('--traders', type=lambda value: [int(item) for item in value.split(',')],
+                        default=TRADER_COUNTS, help='comma separated trader counts')
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help='price ticks per pair')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file to write results to')
+    parser.add_argument('--baseline', help='JSON file with previous results to compare with')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    results = {
+        'version': _get_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'rounds': args.rounds,
+        'results': [],
+    }
+    print('%7s %8s %12s %14s %10s %14s' % ('traders', 'events', 'events/s', 'cpu/event, us', 'rss, MB',
+                                           'per trader, KB'))
+    for trader_count in args.traders:
+        result = _run_case(trader_count, args.rounds, args.seed)
+        results['results'].append(result)
+        print('%7s %8s %12.0f %14.1f %10.1f %14.1f' % (trader_count, result['events'], result['events_per_second'],
+                                                       result['cpu_per_event_us'], result['rss_bytes'] / 2 ** 20,
+                                                       result['rss_per_trader_bytes'] / 2 ** 10))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline:
+            regressions = _compare(results, json.load(baseline))
+        if regressions:
+            print('Throughput regressed by more than %.0f%% for %s traders' % (REGRESSION_THRESHOLD * 100,
+                                                                              ', '.join(map(str, regressions))))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from decimal import Decimal
 import operator
 from unittest import TestCase
@@ -5,8 +6,11 @@ from unittest import TestCase
 from mox3.mox import Mox
 from rx import Observable
 
-from btce import events
-from btce.models import Order, TradingOptions, CurrencyPair, CURRENCY_BTC, CURRENCY_USD
+from btce import commands, events
+from btce.bus import Bus
+from btce.models import Order, TradingOptions, CurrencyPair, TraderState, CURRENCY_BTC, CURRENCY_USD
+from btce.money import Money
+from btce.orders import ActiveOrderIndex
 from btce.trader import Trader
 from btce.utils import get_data_packed as d
 from tests.utils import dataprovider, use_dataproviders
@@ -24,7 +28,7 @@ class TraderTest(TestCase):
     @staticmethod
     def provider_get_balance():
         return (
-            (('event',), None),
+            ((), None),
             ((events.BalanceEvent('currency', 'value'),), d(balance='value', change=Decimal(0))),
             ((events.BalanceEvent('currency', 1), events.BalanceEvent('currency', 2)), d(balance=2, change=1)),
         )
@@ -32,21 +36,37 @@ class TraderTest(TestCase):
     @dataprovider('provider_get_balance')
     def test_get_balance(self, input_data, expected):
         trader = Trader(None, None, None)
-        result = list(trader._get_balance(Observable.from_iterable(input_data), 'currency').to_blocking())
+        result = list(trader._get_balance(Observable.from_iterable(input_data)).to_blocking())
         self.assertEqual(result[-1] if result else None, expected)
 
+    @staticmethod
+    def provider_get_jump_base_price():
+        return (
+            (None, (100, 104), 100),
+            (None, (100, 106), 106),
+            (100, (104,), 100),
+            (100, (106,), 106),
+        )
+
+    @dataprovider('provider_get_jump_base_price')
+    def test_get_jump_base_price(self, jump_price, input_data, expected):
+        options = TradingOptions(CurrencyPair(CURRENCY_BTC, CURRENCY_USD), 1, 1, None, None, Decimal('0.05'))
+        trader = Trader(options, None, None, TraderState(jump_price=jump_price))
+        result = list(trader._get_jump_base_price(Observable.from_iterable(input_data)).to_blocking())
+        self.assertEqual(result[-1], expected)
+
     @staticmethod
     def provider_get_completed_orders_singly():
         return (
-            (('event',), None),
-            ((events.CompletedOrdersEvent('pair', (1,)), events.CompletedOrdersEvent('pair', (1,))), None),
-            ((events.CompletedOrdersEvent('pair', (1,)), events.CompletedOrdersEvent('pair', (1, 2, 3))), 3),
+            ((), None),
+            ((events.CompletedOrdersEvent('pair', ()),), None),
+            ((events.CompletedOrdersEvent('pair', (1,)), events.CompletedOrdersEvent('pair', (2, 3))), 3),
         )
 
     @dataprovider('provider_get_completed_orders_singly')
     def test_get_completed_orders_singly(self, input_data, expected):
         trader = Trader(None, None, None)
-        result = list(trader._get_completed_orders_singly(Observable.from_iterable(input_data), 'pair').to_blocking())
+        result = list(trader._get_completed_orders_singly(Observable.from_iterable(input_data)).to_blocking())
         self.assertEqual(result[-1] if result else None, expected)
 
     @staticmethod
@@ -80,3 +100,50 @@ class TraderTest(TestCase):
         trader = Trader(options, None, None)
         price = trader._get_new_price(order_type, 100)
         self.assertTrue(compare_function(price, 100))
+
+    @staticmethod
+    def provider_get_price_outside_spread():
+        return (
+            (None, Order.TYPE_SELL, '100', '100'),
+            (('99', '101'), Order.TYPE_SELL, '100', '100'),
+            (('99', '101'), Order.TYPE_SELL, '98', '99.001'),
+            (('99', '101'), Order.TYPE_BUY, '100', '100'),
+            (('99', '101'), Order.TYPE_BUY, '102', '100.999'),
+            ((None, None), Order.TYPE_BUY, '102', '102'),
+        )
+
+    @dataprovider('provider_get_price_outside_spread')
+    def test_get_price_outside_spread(self, spread, order_type, price, expected):
+        pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        trader = Trader(TradingOptions(pair, 1, 1, None, None, None), None, None)
+        if spread is not None:
+            bid, ask = (None if value is None else Money.from_number(Decimal(value)) for value in spread)
+            trader._depth = events.DepthEvent(pair, bid, ask, Money(0, 6), Money(0, 6))
+        self.assertEqual(trader._get_price_outside_spread(order_type, Money.from_number(Decimal(price))),
+                         Decimal(expected))
+
+    def test_create_order_if_duplicate(self):
+        pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        command_stream = Bus()
+        created = []
+        command_stream.get(commands.CreateSellOrderCommand).subscribe(lambda command: created.append(command.price))
+        trader = Trader(TradingOptions(pair, 1, 1, None, None, None), None, command_stream)
+        trader._active_orders = ActiveOrderIndex([Order(1, Order.TYPE_SELL, Money(1, 0), Money(110, 0), None, None)])
+        trader._create_sell_order(Money(1, 0), Money(110, 0), Trader.REASON_PRICE_JUMP)
+        trader._create_sell_order(Money(1, 0), Money(111, 0), Trader.REASON_PRICE_JUMP)
+        self.assertEqual(created, [111])
+
+    def test_cancel_outdated_orders(self):
+        pair = CurrencyPair(CURRENCY_BTC, CURRENCY_USD)
+        command_stream = Bus()
+        cancelled = []
+        command_stream.get(commands.CancelOrderCommand).subscribe(lambda command: cancelled.append(command.order_id))
+        trader = Trader(TradingOptions(pair, 1, 1, None, None, None), None, command_stream)
+        now = datetime(2017, 3, 1)
+        trader._active_orders = ActiveOrderIndex([
+            Order(1, Order.TYPE_SELL, Money(1, 0), Money(110, 0), now - timedelta(days=40), None),
+            Order(2, Order.TYPE_BUY, Money(1, 0), Money(90, 0), now - timedelta(days=1), None),
+        ])
+        trader._cancel_outdated_orders(now)
+        trader._cancel_outdated_orders(now)
+        self.assertEqual(cancelled, [1])
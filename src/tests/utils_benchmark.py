@@ -0,0 +1,58 @@
+from collections import namedtuple
+from timeit import timeit
+
+from btce.utils import get_data_packed
+
+NUMBER = 100000
+
+
+def _get_data_packed_uncached(*spec, **kwargs):
+    if not spec:
+        properties = ('is_packed',) + tuple(sorted(kwargs.keys()))
+        return namedtuple('Data', properties)(is_packed=True, **kwargs)
+    def _wrapper(*args):
+        names = list(spec)
+        params = list(args)
+        kwargs = {}
+        while names:
+            name = names.pop(0)
+            if not params:
+                raise Exception('cannot match names and args: %s, %s' % (spec, args))
+            arg = params.pop(0)
+            if hasattr(arg, 'is_packed'):
+                if hasattr(arg, name):
+                    kwargs[name] = getattr(arg, name)
+                    params.insert(0, arg)
+                else:
+                    names.insert(0, name)
+            elif isinstance(arg, tuple):
+                kwargs[name] = arg[0]
+                params.insert(0, arg[1:])
+            else:
+                kwargs[name] = arg
+        return _get_data_packed_uncached(**kwargs)
+    return _wrapper
+
+
+def _get_cases(d):
+    factory = d('time', 'price')
+    packed = d(balance=1, change=2)
+    nested_factory = d('balance', 'change', 'price')
+    return (
+        ('kwargs', lambda: d(balance=1, change=2)),
+        ('factory', lambda: factory(1, 2)),
+        ('factory with packed args', lambda: nested_factory(packed, 3)),
+    )
+
+
+def run():
+    number = NUMBER // 10
+    for (name, before), (_, after) in zip(_get_cases(_get_data_packed_uncached), _get_cases(get_data_packed)):
+        before_cost = timeit(before, number=number) / number * 10 ** 6
+        after_cost = timeit(after, number=NUMBER) / NUMBER * 10 ** 6
+        print('%-26s before %8.2f us/call, after %6.2f us/call (x%.0f)' % (name, before_cost, after_cost,
+                                                                          before_cost / after_cost))
+
+
+if __name__ == '__main__':
+    run()
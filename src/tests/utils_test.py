@@ -31,3 +31,7 @@ class UtilsTest(TestCase):
     def test_get_data_packed_if_factory_and_packed_params_and_cannot_match(self):
         factory = get_data_packed('foo', 'bar')
         self.assertRaises(Exception, factory, get_data_packed(baz=1), 2)
+
+    def test_get_data_packed_reuses_class(self):
+        factory = get_data_packed('foo', 'bar')
+        self.assertIs(type(factory(1, 2)), type(get_data_packed(bar=3, foo=4)))
@@ -1,27 +1,68 @@
-from rx.subjects import Subject
+from argparse import ArgumentParser
+import os.path
 
-from btce import config
+from btce import config, metrics
+from btce.bus import Bus
 from btce.common import get_logger
 from btce.exchange import ExchangeConnector
+from btce.gateway import Gateway, WorkerPool
+from btce.market import MarketData
+from btce.metrics import MetricsServer
+from btce.snapshot import SnapshotKeeper
+from btce.storage import Storage, get_backend
 from btce.trader import Trader
 
 
 logger = get_logger(__name__)
 
 
+def _get_shards(worker_count):
+    return [[str(options.pair) for options in config.TRADING[number::worker_count]] for number in range(worker_count)]
+
+
 if __name__ == '__main__':
-    event_stream = Subject()
-    command_stream = Subject()
+    parser = ArgumentParser(description='Run traders against the exchange')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='run traders in this many worker processes behind a gateway, sharded by pair')
+    args = parser.parse_args()
+    metrics_server = MetricsServer()
+    if config.METRICS_PORT is not None:
+        metrics_server.init()
+    event_stream = Bus(metrics.EVENTS)
+    command_stream = Bus()
     connector = ExchangeConnector(event_stream, command_stream)
     connector.init()
+    storage = Storage(get_backend(), event_stream)
+    storage.init()
+    market_data = MarketData([options.pair for options in config.TRADING], event_stream, command_stream)
+    market_data.init()
+    gateway = Gateway(config.GATEWAY_PATH, event_stream, command_stream,
+                      [options.pair for options in config.TRADING])
+    worker_pool = WorkerPool(config.GATEWAY_PATH, _get_shards(args.workers))
+    snapshot_keeper = SnapshotKeeper(os.path.join(config.DATA_DIR, 'snapshot'))
     traders = []
-    for options in config.TRADING:
-        trader = Trader(options, event_stream, command_stream)
-        trader.init()
-        traders.append(trader)
+    if args.workers:
+        gateway.init()
+        worker_pool.init()
+    else:
+        states = snapshot_keeper.load()
+        for options in config.TRADING:
+            trader = Trader(options, event_stream, command_stream, states.get(str(options.pair)))
+            trader.init()
+            traders.append(trader)
+        snapshot_keeper.init(dict((str(options.pair), trader.get_state())
+                                  for options, trader in zip(config.TRADING, traders)))
     try:
         connector.run()
     except:
         for trader in traders:
             trader.deinit()
+        if args.workers:
+            worker_pool.deinit()
+            gateway.deinit()
+        else:
+            snapshot_keeper.deinit()
+        market_data.deinit()
+        storage.deinit()
         connector.deinit()
+        metrics_server.deinit()